@@ -1,13 +1,16 @@
 import os
-from flask import Flask
+from flask import Flask, flash, redirect, request, url_for
 from .extensions import db, migrate, login_manager, bcrypt, limiter
 from .models.user import User 
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
 
     # --- Configuración ---
     app.config.from_object('app.configs.config.Config')
+    # Valores que pisan los del entorno (por ejemplo, la base en memoria de `flask benchmark`)
+    if config:
+        app.config.update(config)
 
     # --- Inicializar Extensiones ---
     db.init_app(app)
@@ -16,10 +19,25 @@ def create_app():
     bcrypt.init_app(app)
     limiter.init_app(app)
 
+    # --- Servicios ---
+    # agenda, estadisticas, reportes y notificaciones se suscriben a los cambios de Turno al importarse;
+    # recordatorios registra su tarea en la cola de trabajos
+    from .services import cambios_turnos, agenda, estadisticas, reportes, identidad, contrasenas, versiones, notificaciones, recordatorios, instrumentacion
+    cambios_turnos.init_app(app)
+    identidad.init_app(app)
+    versiones.init_app(app)
+    instrumentacion.init_app(app)
+
+    @app.errorhandler(contrasenas.HashingOcupado)
+    def hashing_ocupado(error):
+        app.logger.warning('bcrypt saturado: %s', error)
+        flash('El servidor está ocupado, inténtalo de nuevo en unos segundos.', 'warning')
+        return redirect(request.referrer or url_for('main.index'))
+
     # --- Configuración de Flask-Login ---
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return identidad.cargar_usuario(int(user_id))
 
     @login_manager.unauthorized_handler
     def unauthorized():
@@ -34,6 +52,7 @@ def create_app():
         from .routes.doctor_routes import doctor_bp
         from .routes.admin_routes import admin_bp
         from .routes.api_routes import api_bp
+        from .routes.notificacion_routes import noti_bp
 
         app.register_blueprint(main_bp)
         app.register_blueprint(auth_bp)
@@ -41,6 +60,11 @@ def create_app():
         app.register_blueprint(doctor_bp)
         app.register_blueprint(admin_bp)
         app.register_blueprint(api_bp)
+        app.register_blueprint(noti_bp)
+
+    # --- Comandos de consola (flask ...) ---
+    from .commands import register_commands
+    register_commands(app)
 
     return app
 
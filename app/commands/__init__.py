@@ -0,0 +1,21 @@
+def register_commands(app):
+    """Registra los comandos `flask <grupo> ...` de la aplicación."""
+    from .benchmark import benchmark
+    from .carga import carga, seed
+    from .contrasenas import contrasenas_cli
+    from .estadisticas import estadisticas_cli
+    from .excepciones import excepciones_cli
+    from .exportacion import exportar_cli
+    from .importacion import importar_cli
+    from .trabajos import trabajos_cli, worker
+
+    app.cli.add_command(contrasenas_cli)
+    app.cli.add_command(estadisticas_cli)
+    app.cli.add_command(excepciones_cli)
+    app.cli.add_command(exportar_cli)
+    app.cli.add_command(importar_cli)
+    app.cli.add_command(trabajos_cli)
+    app.cli.add_command(worker)
+    app.cli.add_command(seed)
+    app.cli.add_command(carga)
+    app.cli.add_command(benchmark)
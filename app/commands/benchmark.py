@@ -0,0 +1,79 @@
+import json
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.services import benchmarks
+
+
+def _baseline_por_defecto():
+    return os.path.join(os.path.dirname(current_app.root_path), 'benchmarks', 'baseline.json')
+
+
+@click.command('benchmark')
+@click.option('--filtro', '-k', default=None, help='Sólo los casos cuyo nombre contiene este texto.')
+@click.option('--rondas', default=7, show_default=True, help='Rondas por caso (se compara la mejor).')
+@click.option('--baseline', 'ruta_baseline', default=None, type=click.Path(dir_okay=False),
+              help='JSON de referencia [benchmarks/baseline.json].')
+@click.option('--umbral', default=0.25, show_default=True,
+              help='Empeoramiento relativo que cuenta como regresión (0.25 = 25 %).')
+@click.option('--json', 'salida', type=click.File('w'), help='Guarda el resultado como JSON.')
+@click.option('--guardar-baseline', is_flag=True, help='Guarda el resultado como nueva baseline.')
+@click.option('--listar', is_flag=True, help='Lista los casos y sale.')
+@with_appcontext
+def benchmark(filtro, rondas, ruta_baseline, umbral, salida, guardar_baseline, listar):
+    """Micro-benchmarks de agenda y páginas sobre un dataset fijo.
+
+    Siembra una base SQLite en memoria (siempre la misma), mide cada caso y
+    lo compara con la baseline: sale con código 1 si alguno empeoró más que
+    --umbral. La base de DATABASE_URL no se toca.
+    """
+    if listar:
+        for nombre in benchmarks.nombres():
+            click.echo(nombre)
+        return
+    ruta_baseline = ruta_baseline or _baseline_por_defecto()
+
+    click.echo('Sembrando el dataset de benchmarks en memoria ...')
+    app = benchmarks.crear_app()
+    resultado = benchmarks.correr(app, filtro=filtro, rondas=rondas, avisar=lambda nombre: click.echo(f'  {nombre}'))
+    if not resultado['casos']:
+        raise click.ClickException(f'Ningún caso coincide con {filtro!r}.')
+    if salida is not None:
+        json.dump(resultado, salida, indent=2, ensure_ascii=False)
+
+    base = None
+    if os.path.exists(ruta_baseline):
+        with open(ruta_baseline, encoding='utf-8') as archivo:
+            base = json.load(archivo)
+
+    if base is None:
+        click.echo(f"{'caso':<36} {'mejor':>12} {'mediana':>12}")
+        for nombre, medicion in resultado['casos'].items():
+            click.echo(f"{nombre:<36} {medicion['mejor_us']:>12.1f} {medicion['mediana_us']:>12.1f}")
+        click.echo(f'Tiempos en µs por llamada. No hay baseline en {ruta_baseline}.')
+        regresiones = []
+    else:
+        filas = benchmarks.comparar(resultado, base, umbral)
+        click.echo(f"{'caso':<36} {'baseline':>12} {'actual':>12} {'cambio':>8}  estado")
+        for f in filas:
+            base_us = f'{f["base_us"]:.1f}' if f['base_us'] is not None else '-'
+            cambio = f'{f["cambio"]:+.1%}' if f['cambio'] is not None else '-'
+            click.echo(f"{f['caso']:<36} {base_us:>12} {f['actual_us']:>12.1f} {cambio:>8}  {f['estado']}")
+        click.echo(f'Tiempos en µs por llamada (mejor de {rondas} rondas), umbral {umbral:.0%}.')
+        if base.get('entorno') != resultado['entorno']:
+            click.echo('Aviso: la baseline se midió en otro entorno '
+                       f"({base.get('entorno')}); los tiempos no son comparables del todo.")
+        regresiones = [f['caso'] for f in filas if f['estado'] == 'regresion']
+
+    if guardar_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(ruta_baseline)), exist_ok=True)
+        with open(ruta_baseline, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+            archivo.write('\n')
+        click.echo(f'Baseline guardada en {ruta_baseline}.')
+    elif regresiones:
+        click.echo(f'Regresiones: {", ".join(regresiones)}', err=True)
+        raise SystemExit(1)
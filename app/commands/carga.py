@@ -0,0 +1,145 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.user import User
+from app.services import carga as harness
+from app.services import sembrado
+
+
+@click.command('seed')
+@click.option('--doctores', default=2000, show_default=True, help='Doctores a crear.')
+@click.option('--pacientes', default=200000, show_default=True, help='Pacientes a crear.')
+@click.option('--turnos', default=2000000, show_default=True, help='Turnos a crear (pasados y futuros).')
+@click.option('--dias-pasados', default=365, show_default=True, help='Días hacia atrás con turnos.')
+@click.option('--dias-futuros', default=60, show_default=True, help='Días hacia adelante con turnos.')
+@click.option('--prefijo', default='seed', show_default=True, help='Prefijo de los emails (una corrida por prefijo).')
+@click.option('--password', default='seed1234', show_default=True, help='Contraseña de todos los usuarios creados.')
+@click.option('--semilla', default=42, show_default=True, help='Semilla del generador (mismos datos con la misma semilla).')
+@with_appcontext
+def seed(doctores, pacientes, turnos, dias_pasados, dias_futuros, prefijo, password, semilla):
+    """Carga una clínica sintética para pruebas de carga y benchmarks."""
+    inicio = time.perf_counter()
+    try:
+        creados = sembrado.sembrar(
+            doctores, pacientes, turnos, prefijo=prefijo, password=password,
+            dias_pasados=dias_pasados, dias_futuros=dias_futuros, semilla=semilla, avisar=click.echo
+        )
+    except sembrado.YaSembrado as e:
+        raise click.ClickException(f'{e} Usá otro --prefijo.')
+    click.echo(
+        f"Listo en {time.perf_counter() - inicio:.1f} s: {creados['doctores']} doctores "
+        f"({creados['horarios']} bloques), {creados['pacientes']} pacientes, {creados['turnos']} turnos, "
+        f"{creados['estadisticas']} filas de estadísticas."
+    )
+    click.echo(f'Usuarios: {sembrado.email(prefijo, "paciente", 0)} ... contraseña {password!r}')
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _esperar(url, proceso, segundos=30):
+    limite = time.monotonic() + segundos
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise click.ClickException('gunicorn terminó antes de arrancar.')
+        try:
+            urllib.request.urlopen(url + '/auth/login', timeout=2).close()
+            return
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.3)
+    raise click.ClickException('gunicorn no respondió a tiempo.')
+
+
+def _levantar_gunicorn(workers, threads):
+    """gunicorn local sobre la misma base, sin límites de tasa que frenen la carga."""
+    puerto = _puerto_libre()
+    entorno = dict(os.environ, LIMITE_LOGIN='100000 per second', LIMITE_RESERVA='100000 per second',
+                   LIMITE_CONSULTA_HORARIOS='100000 per second', DB_HILOS=str(threads))
+    proceso = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--worker-class', 'gthread',
+         '--threads', str(threads), '--bind', f'127.0.0.1:{puerto}', '--log-level', 'warning', 'wsgi:app'],
+        cwd=os.path.dirname(current_app.root_path), env=entorno
+    )
+    url = f'http://127.0.0.1:{puerto}'
+    try:
+        _esperar(url, proceso)
+    except click.ClickException:
+        proceso.terminate()
+        raise
+    return url, proceso
+
+
+@click.command('carga')
+@click.option('--url', default=None, help='Servidor ya levantado (si no, se levanta gunicorn local).')
+@click.option('--clientes', '-c', default=20, show_default=True, help='Sesiones concurrentes.')
+@click.option('--duracion', '-d', default=60, show_default=True, help='Segundos de carga.')
+@click.option('--doctores-pct', default=10, show_default=True, help='Porcentaje de clientes que son doctores.')
+@click.option('--prefijo', default='seed', show_default=True, help='Prefijo de los usuarios de `flask seed`.')
+@click.option('--password', default='seed1234', show_default=True)
+@click.option('--workers', default=4, show_default=True, help='Workers de gunicorn (sin --url).')
+@click.option('--threads', default=16, show_default=True, help='Hilos por worker de gunicorn (sin --url).')
+@click.option('--json', 'salida', type=click.File('w'), help='Guarda el resultado como JSON.')
+@with_appcontext
+def carga(url, clientes, duracion, doctores_pct, prefijo, password, workers, threads, salida):
+    """Prueba de carga sobre las rutas reales con usuarios de `flask seed`.
+
+    Reporta pedidos, errores, pedidos por segundo y latencias p50/p95/p99
+    por endpoint. La base es la de DATABASE_URL (SQLite o Postgres).
+    """
+    patron = f'{prefijo}.%@{sembrado.DOMINIO}'
+    cantidad_doctores = round(clientes * doctores_pct / 100)
+    usuarios = []
+    for rol, cantidad in (('doctor', cantidad_doctores), ('paciente', clientes - cantidad_doctores)):
+        emails = db.session.scalars(
+            select(User.email).where(User.email.like(patron), User.rol == rol).order_by(func.random()).limit(cantidad)
+        ).all()
+        usuarios.extend((email, rol) for email in emails)
+    doctor_ids = db.session.scalars(
+        select(Doctor.id).join(User, User.id == Doctor.user_id).where(User.email.like(patron))
+    ).all()
+    db.session.remove()
+    if not usuarios or not doctor_ids:
+        raise click.ClickException(f'No hay usuarios con el prefijo {prefijo!r}: corré `flask seed` primero.')
+
+    proceso = None
+    if url is None:
+        url, proceso = _levantar_gunicorn(workers, threads)
+        click.echo(f'gunicorn en {url} ({workers} workers x {threads} hilos)')
+    try:
+        click.echo(f'{len(usuarios)} clientes durante {duracion} s contra {url} ...')
+        resultados, segundos = harness.correr(url, usuarios, doctor_ids, len(usuarios), duracion, password)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    filas = resultados.resumen(segundos)
+    click.echo(f"{'endpoint':<20} {'pedidos':>8} {'errores':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for f in filas:
+        click.echo(
+            f"{f['endpoint']:<20} {f['pedidos']:>8} {f['errores']:>8} {f['rps']:>8} "
+            f"{f['p50']:>8} {f['p95']:>8} {f['p99']:>8} {f['max']:>8}"
+        )
+    total = sum(f['pedidos'] for f in filas)
+    click.echo(f'Total: {total} pedidos en {segundos:.1f} s ({total / segundos:.1f} req/s). Tiempos en ms.')
+    if salida is not None:
+        json.dump({
+            'url': url, 'base': db.engine.dialect.name, 'clientes': len(usuarios), 'segundos': round(segundos, 2),
+            'endpoints': filas, 'codigos': resultados.codigos(),
+        }, salida, indent=2, ensure_ascii=False)
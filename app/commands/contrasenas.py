@@ -0,0 +1,31 @@
+import os
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from app.services import contrasenas
+
+contrasenas_cli = AppGroup('contrasenas', help='Hash de contraseñas (bcrypt).')
+
+
+@contrasenas_cli.command('rendimiento')
+@click.option('--cantidad', '-n', default=40, show_default=True, help='Hashes a calcular.')
+@click.option('--workers', '-w', type=int, default=None, help='Procesos (default: HASH_POOL_WORKERS).')
+@click.option('--rounds', '-r', type=int, default=None, help='Costo (default: BCRYPT_LOG_ROUNDS).')
+def rendimiento(cantidad, workers, rounds):
+    """Mide hashes por segundo para dimensionar HASH_POOL_WORKERS."""
+    if workers is None:
+        workers = current_app.config['HASH_POOL_WORKERS']
+    if rounds is None:
+        rounds = current_app.config['BCRYPT_LOG_ROUNDS']
+    r = contrasenas.medir_rendimiento(cantidad, workers, rounds)
+    click.echo(
+        f"costo {r['rounds']}, {r['workers']} procesos: {r['por_segundo']:.1f} hashes/s "
+        f"({r['ms_por_hash']:.0f} ms por hash, {r['cantidad']} en {r['segundos']:.2f} s)"
+    )
+    # Cada worker de gunicorn tiene su propio pool
+    click.echo(
+        f'Procesos de bcrypt en el host: workers de gunicorn x HASH_POOL_WORKERS; '
+        f'conviene no pasar de {os.cpu_count()} núcleos.'
+    )
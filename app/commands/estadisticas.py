@@ -0,0 +1,13 @@
+import click
+from flask.cli import AppGroup
+
+from app.services import estadisticas
+
+estadisticas_cli = AppGroup('estadisticas', help='Contadores agregados de turnos.')
+
+
+@estadisticas_cli.command('reconstruir')
+def reconstruir():
+    """Recalcula estadisticas_diarias desde la tabla turnos."""
+    filas = estadisticas.reconstruir()
+    click.echo(f'Estadísticas reconstruidas: {filas} filas.')
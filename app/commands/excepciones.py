@@ -0,0 +1,63 @@
+import csv
+import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import or_
+
+from app.extensions import db
+from app.models.excepcion import Excepcion
+from app.services import agenda, excepciones
+
+excepciones_cli = AppGroup('excepciones', help='Feriados y excepciones de la agenda.')
+
+
+def _leer_fecha(texto):
+    try:
+        return datetime.date.fromisoformat(texto.strip())
+    except ValueError:
+        raise click.BadParameter(f'Fecha inválida: {texto!r} (se espera AAAA-MM-DD)')
+
+
+@excepciones_cli.command('feriados')
+@click.argument('fechas', nargs=-1)
+@click.option('--archivo', type=click.File('r', encoding='utf-8-sig'),
+              help='CSV con columnas fecha y motivo.')
+def feriados(fechas, archivo):
+    """Agrega feriados para todos los doctores: FECHA[:MOTIVO]..."""
+    pedidos = []
+    for texto in fechas:
+        fecha, _, motivo = texto.partition(':')
+        pedidos.append((_leer_fecha(fecha), motivo))
+    if archivo is not None:
+        for fila in csv.DictReader(archivo):
+            pedidos.append((_leer_fecha(fila.get('fecha') or ''), fila.get('motivo')))
+    if not pedidos:
+        raise click.UsageError('Indicá al menos una fecha o un --archivo.')
+
+    agregados = excepciones.agregar_feriados(pedidos)
+    if agregados:
+        agenda.registrar_cambio_general()
+    db.session.commit()
+    excepciones.invalidar()
+    click.echo(f'{agregados} feriados agregados, {len(pedidos) - agregados} ya existían.')
+
+
+@excepciones_cli.command('listar')
+@click.option('--doctor', 'doctor_id', type=int, help='Sólo las de este doctor (y los feriados).')
+def listar(doctor_id):
+    """Excepciones y feriados que todavía no pasaron."""
+    desde = datetime.datetime.combine(datetime.date.today(), datetime.time())
+    query = Excepcion.query.filter(Excepcion.fin > desde)
+    if doctor_id is not None:
+        query = query.filter(or_(Excepcion.doctor_id == doctor_id, Excepcion.doctor_id.is_(None)))
+    lista = query.order_by(Excepcion.inicio, Excepcion.id).all()
+    if not lista:
+        click.echo('No hay excepciones.')
+    for excepcion in lista:
+        datos = excepcion.to_dict()
+        quien = 'todos' if datos['global'] else f'doctor {excepcion.doctor_id}'
+        horas = f" {datos['hora_inicio'] or '00:00'}-{datos['hora_fin'] or '24:00'}" \
+            if datos['hora_inicio'] or datos['hora_fin'] else ''
+        rango = datos['fecha'] if datos['hasta'] == datos['fecha'] else f"{datos['fecha']} a {datos['hasta']}"
+        click.echo(f"{rango}{horas}  {quien:<12} {datos['motivo'] or ''}")
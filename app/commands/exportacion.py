@@ -0,0 +1,24 @@
+import click
+from flask.cli import AppGroup
+
+from app.services import exportacion
+
+exportar_cli = AppGroup('exportar', help='Exportación de datos.')
+
+
+@exportar_cli.command('turnos')
+@click.option('--formato', '-f', type=click.Choice(sorted(exportacion.FORMATOS)), default='csv', show_default=True)
+@click.option('--desde', help='Fecha inicial (YYYY-MM-DD).')
+@click.option('--hasta', help='Fecha final inclusive (YYYY-MM-DD).')
+@click.option('--doctor', 'doctor_id', type=int, help='Id del doctor.')
+@click.option('--especialidad', 'especialidad_id', type=int, help='Id de la especialidad.')
+@click.option('--estado', type=click.Choice(exportacion.ESTADOS))
+@click.option('--salida', '-o', type=click.File('w', encoding='utf-8'), default='-', help='Archivo (default: stdout).')
+def turnos(formato, salida, **opciones):
+    """Exporta turnos con nombres de doctor y paciente, en streaming."""
+    try:
+        filtros = exportacion.leer_filtros(opciones)
+    except exportacion.FiltroInvalido as e:
+        raise click.BadParameter(str(e))
+    for bloque in exportacion.generar(formato, filtros):
+        salida.write(bloque)
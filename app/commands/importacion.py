@@ -0,0 +1,38 @@
+import os
+
+import click
+from flask.cli import AppGroup
+
+from app.services import importacion
+
+importar_cli = AppGroup('importar', help='Alta masiva de usuarios desde CSV.')
+
+
+def _importar(archivo, rol, lote, workers):
+    if workers is None:
+        workers = os.cpu_count() or 1
+    try:
+        resultado = importacion.importar(archivo, rol, tamano_lote=lote, workers=workers)
+    except importacion.ArchivoInvalido as e:
+        raise click.ClickException(str(e))
+    for linea, mensaje in sorted(resultado.errores):
+        click.echo(f'línea {linea}: {mensaje}', err=True)
+    click.echo(f'{resultado.creados} creados, {len(resultado.errores)} con errores.')
+
+
+@importar_cli.command('pacientes')
+@click.argument('archivo', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--lote', default=importacion.TAMANO_LOTE, show_default=True, help='Filas por transacción.')
+@click.option('--workers', '-w', type=int, default=None, help='Procesos para bcrypt (default: todos los núcleos).')
+def pacientes(archivo, lote, workers):
+    """Importa pacientes: name, email, password, dni, telefono, obra_social."""
+    _importar(archivo, 'paciente', lote, workers)
+
+
+@importar_cli.command('doctores')
+@click.argument('archivo', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--lote', default=importacion.TAMANO_LOTE, show_default=True, help='Filas por transacción.')
+@click.option('--workers', '-w', type=int, default=None, help='Procesos para bcrypt (default: todos los núcleos).')
+def doctores(archivo, lote, workers):
+    """Importa doctores: name, email, password, dni, telefono, especialidad, matricula."""
+    _importar(archivo, 'doctor', lote, workers)
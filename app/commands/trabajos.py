@@ -0,0 +1,84 @@
+import signal
+import time
+
+import click
+from flask.cli import AppGroup, with_appcontext
+
+from app.extensions import db
+from app.services import recordatorios, trabajos
+
+trabajos_cli = AppGroup('trabajos', help='Cola de trabajos en segundo plano.')
+
+
+def _programar():
+    """Tareas periódicas: rescatar trabajos colgados, encolar recordatorios y
+    borrar los trabajos viejos."""
+    rescatados = trabajos.recuperar_colgados()
+    encolados = recordatorios.programar()
+    trabajos.limpiar()
+    db.session.commit()
+    return rescatados, encolados
+
+
+@click.command('worker')
+@click.option('--lote', type=int, help='Trabajos por vuelta (default: TRABAJOS_LOTE).')
+@click.option('--intervalo', type=float, default=5.0, show_default=True,
+              help='Segundos de espera cuando no hay trabajos.')
+@click.option('--programar-cada', type=float, default=60.0, show_default=True,
+              help='Segundos entre programaciones de recordatorios (0 = no programar).')
+@click.option('--tipo', 'tipos', multiple=True, help='Procesar sólo estos tipos.')
+@click.option('--una-vez', is_flag=True, help='Vaciar la cola una vez y salir.')
+@with_appcontext
+def worker(lote, intervalo, programar_cada, tipos, una_vez):
+    """Procesa la cola de trabajos (recordatorios, etc.) hasta recibir SIGTERM."""
+    detener = []
+    signal.signal(signal.SIGTERM, lambda *_: detener.append(True))
+    click.echo(f'Worker {trabajos.nombre_trabajador()} - tipos: {", ".join(tipos or trabajos.tipos_registrados())}')
+
+    proxima_programacion = 0.0
+    try:
+        while not detener:
+            if programar_cada and time.monotonic() >= proxima_programacion:
+                rescatados, encolados = _programar()
+                if rescatados or encolados:
+                    click.echo(f'Rescatados: {rescatados}, recordatorios encolados: {encolados}')
+                proxima_programacion = time.monotonic() + programar_cada
+
+            hechos, fallidos = trabajos.procesar(lote, tipos=tipos or None)
+            if hechos or fallidos:
+                click.echo(f'Hechos: {hechos}, fallidos: {fallidos}')
+            elif una_vez:
+                break
+            else:
+                time.sleep(intervalo)
+            # Sesión limpia por vuelta, como en un request
+            db.session.remove()
+    except KeyboardInterrupt:
+        pass
+    click.echo('Worker detenido.')
+
+
+@trabajos_cli.command('estado')
+def estado():
+    """Cantidad de trabajos por tipo y estado."""
+    filas = trabajos.resumen()
+    if not filas:
+        click.echo('La cola está vacía.')
+    for tipo, estado_trabajo, cantidad in filas:
+        click.echo(f'{tipo:<25} {estado_trabajo:<10} {cantidad:>8}')
+
+
+@trabajos_cli.command('programar')
+def programar():
+    """Encola ahora los recordatorios pendientes."""
+    rescatados, encolados = _programar()
+    click.echo(f'Rescatados: {rescatados}, recordatorios encolados: {encolados}')
+
+
+@trabajos_cli.command('limpiar')
+@click.option('--dias', type=int, help='Antigüedad mínima (default: TRABAJOS_RETENCION_DIAS).')
+def limpiar(dias):
+    """Borra los trabajos terminados bien hace más de ``--dias``."""
+    borrados = trabajos.limpiar(dias)
+    db.session.commit()
+    click.echo(f'Trabajos borrados: {borrados}')
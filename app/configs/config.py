@@ -1,8 +1,11 @@
 import os
 
+from .motor import opciones_motor, perfil_por_defecto
+
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
 # Esta es la ruta de respaldo (fallback)
 DEFAULT_DB_PATH = os.path.join(BASE_DIR, 'instance', 'database.sqlite')
+DEFAULT_RATELIMIT_PATH = os.path.join(BASE_DIR, 'instance', 'ratelimit.sqlite')
 
 class Config:
 
@@ -13,4 +16,97 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f'sqlite:///{DEFAULT_DB_PATH}'
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
- 
\ No newline at end of file
+
+    # Pool de conexiones por perfil (ver configs/motor.py). DB_HILOS tiene
+    # que coincidir con --threads de gunicorn; DB_POOL_SIZE, DB_MAX_OVERFLOW,
+    # DB_POOL_RECYCLE y DB_POOL_TIMEOUT pisan los valores del perfil.
+    DB_PERFIL = os.environ.get('DB_PERFIL') or perfil_por_defecto(SQLALCHEMY_DATABASE_URI)
+    DB_HILOS = int(os.environ.get('DB_HILOS', 16))
+    SQLALCHEMY_ENGINE_OPTIONS = opciones_motor(
+        DB_PERFIL, SQLALCHEMY_DATABASE_URI, DB_HILOS,
+        pool_size=int(os.environ['DB_POOL_SIZE']) if os.environ.get('DB_POOL_SIZE') else None,
+        max_overflow=int(os.environ['DB_MAX_OVERFLOW']) if os.environ.get('DB_MAX_OVERFLOW') else None,
+        pool_recycle=int(os.environ['DB_POOL_RECYCLE']) if os.environ.get('DB_POOL_RECYCLE') else None,
+        pool_timeout=float(os.environ['DB_POOL_TIMEOUT']) if os.environ.get('DB_POOL_TIMEOUT') else None,
+    )
+
+    # Rate limiting compartido por todos los workers del host (un archivo
+    # SQLite, ver app/services/limites.py). "memory://" vuelve a contar por worker.
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or f'iturnito+sqlite:///{DEFAULT_RATELIMIT_PATH}'
+    LIMITE_LOGIN = os.environ.get('LIMITE_LOGIN', '10 per minute;50 per hour')
+    LIMITE_RESERVA = os.environ.get('LIMITE_RESERVA', '10 per minute')
+    LIMITE_CONSULTA_HORARIOS = os.environ.get('LIMITE_CONSULTA_HORARIOS', '120 per minute')
+
+    # Cache de agenda (segundos). Cada worker tiene su propia copia, la
+    # ocupación usa un TTL corto para que los cambios de otros workers
+    # se vean rápido.
+    AGENDA_PLANTILLA_TTL = int(os.environ.get('AGENDA_PLANTILLA_TTL', 300))
+    AGENDA_OCUPACION_TTL = int(os.environ.get('AGENDA_OCUPACION_TTL', 5))
+    # Contadores del dashboard del doctor
+    DOCTOR_DASHBOARD_TTL = int(os.environ.get('DOCTOR_DASHBOARD_TTL', 30))
+    # Reportes del admin, por combinación de filtros
+    REPORTES_TTL = int(os.environ.get('REPORTES_TTL', 300))
+    # Máximo de días que se pueden pedir de una vez a /doctor/api/disponibilidad
+    AGENDA_RANGO_MAX_DIAS = int(os.environ.get('AGENDA_RANGO_MAX_DIAS', 93))
+    # Búsqueda de primeros turnos libres: días hacia adelante y máximo de resultados
+    PRIMEROS_TURNOS_DIAS = int(os.environ.get('PRIMEROS_TURNOS_DIAS', 60))
+    PRIMEROS_TURNOS_MAX = int(os.environ.get('PRIMEROS_TURNOS_MAX', 50))
+    # Cache del navegador para /doctor/api/horarios (segundos): max-age sin
+    # preguntar y stale-while-revalidate revalidando en segundo plano
+    HORARIOS_MAX_AGE = int(os.environ.get('HORARIOS_MAX_AGE', 5))
+    HORARIOS_STALE = int(os.environ.get('HORARIOS_STALE', 30))
+    # Eventos en vivo de la pantalla de reserva (SSE). Cada conexión abierta
+    # ocupa un hilo del worker: EVENTOS_MAX_CONEXIONES tiene que quedar por
+    # debajo de los --threads de gunicorn. Las conexiones se cierran solas a
+    # los EVENTOS_DURACION_MAX segundos y el navegador reconecta.
+    EVENTOS_DIR = os.environ.get('EVENTOS_DIR', '')  # vacío = <tmp>/iturnito-eventos
+    EVENTOS_MAX_CONEXIONES = int(os.environ.get('EVENTOS_MAX_CONEXIONES', 8))
+    EVENTOS_MAX_COLA = int(os.environ.get('EVENTOS_MAX_COLA', 100))
+    EVENTOS_KEEPALIVE = int(os.environ.get('EVENTOS_KEEPALIVE', 15))
+    EVENTOS_DURACION_MAX = int(os.environ.get('EVENTOS_DURACION_MAX', 300))
+ 
+    # Cache de usuarios entre requests (segundos, 0 = desactivado). Cambios
+    # de perfil o contraseña lo invalidan en el worker que los procesa; los
+    # demás workers se enteran al vencer el TTL.
+    IDENTIDAD_CACHE_TTL = int(os.environ.get('IDENTIDAD_CACHE_TTL', 0))
+    # Conteo de notificaciones no leídas por usuario (segundos). Igual que
+    # el anterior: otro worker puede mostrar el número viejo hasta que vence.
+    NOTIFICACIONES_TTL = int(os.environ.get('NOTIFICACIONES_TTL', 60))
+
+    # Cola de trabajos (flask worker). Los reintentos esperan
+    # BACKOFF_BASE * 2^(intento-1) segundos, hasta BACKOFF_MAX; un trabajo en
+    # curso por más de TRABAJOS_TIMEOUT se da por perdido y vuelve a la cola.
+    TRABAJOS_LOTE = int(os.environ.get('TRABAJOS_LOTE', 50))
+    TRABAJOS_MAX_INTENTOS = int(os.environ.get('TRABAJOS_MAX_INTENTOS', 5))
+    TRABAJOS_BACKOFF_BASE = int(os.environ.get('TRABAJOS_BACKOFF_BASE', 30))
+    TRABAJOS_BACKOFF_MAX = int(os.environ.get('TRABAJOS_BACKOFF_MAX', 3600))
+    TRABAJOS_TIMEOUT = int(os.environ.get('TRABAJOS_TIMEOUT', 600))
+    TRABAJOS_RETENCION_DIAS = int(os.environ.get('TRABAJOS_RETENCION_DIAS', 7))
+    RECORDATORIO_ANTICIPACION_HORAS = int(os.environ.get('RECORDATORIO_ANTICIPACION_HORAS', 24))
+    # Quién manda los mensajes ("modulo:Clase") y, para el remitente de
+    # archivo, dónde los deja (vacío = instance/envios)
+    REMITENTE = os.environ.get('REMITENTE', 'app.services.remitentes:RemitenteArchivo')
+    ENVIOS_DIR = os.environ.get('ENVIOS_DIR', '')
+
+    # Instrumentación de SQL (ver app/services/instrumentacion.py): header
+    # Server-Timing con consultas y tiempo por request y warning de N+1 desde
+    # SQL_N1_UMBRAL repeticiones. SQL_LAZY_RAISE hace fallar las cargas
+    # perezosas de relaciones: sólo para desarrollo y pruebas.
+    SQL_INSTRUMENTACION = os.environ.get('SQL_INSTRUMENTACION', '').lower() in ('1', 'true', 'si')
+    SQL_N1_UMBRAL = int(os.environ.get('SQL_N1_UMBRAL', 5))
+    SQL_LAZY_RAISE = os.environ.get('SQL_LAZY_RAISE', '').lower() in ('1', 'true', 'si')
+
+    # Paginación de listados (admin, API)
+    PAGINA_DEFAULT = int(os.environ.get('PAGINA_DEFAULT', 50))
+    PAGINA_MAX = int(os.environ.get('PAGINA_MAX', 200))
+
+    # Contraseñas (ver app/services/contrasenas.py). Cambiar el costo no
+    # invalida los hashes guardados: se regeneran en el próximo login.
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    HASH_POOL_WORKERS = int(os.environ.get('HASH_POOL_WORKERS', 2))
+    HASH_COLA_MAX = int(os.environ.get('HASH_COLA_MAX', 16))
+    HASH_TIMEOUT = float(os.environ.get('HASH_TIMEOUT', 10))
+
+    # Filas por archivo en la importación desde el panel de admin; los
+    # archivos más grandes se cargan con `flask importar ...`
+    IMPORTACION_MAX_FILAS_WEB = int(os.environ.get('IMPORTACION_MAX_FILAS_WEB', 200))
@@ -0,0 +1,82 @@
+from sqlalchemy.engine import make_url
+
+# Perfiles del engine de SQLAlchemy (SQLALCHEMY_ENGINE_OPTIONS).
+#
+# Cada worker de gunicorn tiene su propio pool y cada hilo del worker usa
+# como mucho una conexión por request, así que el pool se dimensiona con
+# los hilos por worker (DB_HILOS, igual a --threads de gunicorn):
+#
+# - sqlite-local: archivo local, conexiones baratas. Sin pre-ping; el
+#   timeout de sqlite3 espera el lock de escritura en vez de fallar.
+# - postgres-directo: conexión directa al servidor. Pre-ping y reciclado
+#   para no usar conexiones que el servidor o un firewall cortaron
+#   mientras estaban ociosas.
+# - postgres-pgbouncer: detrás de pgbouncer en modo transacción. El pool
+#   de verdad lo lleva pgbouncer: acá una conexión por hilo (que a
+#   pgbouncer le cuesta poco), sin desborde, con reciclado corto y sin
+#   sentencias preparadas del lado del servidor.
+
+PERFILES = ('sqlite-local', 'postgres-directo', 'postgres-pgbouncer')
+
+
+def perfil_por_defecto(uri):
+    """Perfil que corresponde a ``uri`` si no se eligió uno con DB_PERFIL."""
+    return 'sqlite-local' if make_url(uri).get_backend_name() == 'sqlite' else 'postgres-directo'
+
+
+def opciones_motor(perfil, uri, hilos, pool_size=None, max_overflow=None, pool_recycle=None, pool_timeout=None):
+    """SQLALCHEMY_ENGINE_OPTIONS para ``perfil``; los demás argumentos, si no
+    son None, pisan el valor del perfil."""
+    from app.services.pool import PoolMedido
+
+    if perfil not in PERFILES:
+        raise ValueError(f'DB_PERFIL desconocido: {perfil!r} (opciones: {", ".join(PERFILES)})')
+    url = make_url(uri)
+    hilos = max(1, hilos)
+
+    if perfil == 'sqlite-local':
+        if url.get_backend_name() != 'sqlite':
+            raise ValueError('El perfil sqlite-local necesita una DATABASE_URL de SQLite')
+        if url.database in (None, '', ':memory:'):
+            # En memoria el pool tiene que ser el de una sola conexión que
+            # elige SQLAlchemy; no hay nada que dimensionar
+            return {}
+        opciones = {
+            'pool_size': hilos,
+            'max_overflow': 0,
+            'pool_timeout': 30,
+            'pool_recycle': -1,
+            'pool_pre_ping': False,
+            'connect_args': {'timeout': 15},
+        }
+    elif perfil == 'postgres-directo':
+        opciones = {
+            'pool_size': hilos,
+            'max_overflow': max(2, hilos // 4),
+            'pool_timeout': 10,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+            'connect_args': {'connect_timeout': 10},
+        }
+    else:
+        connect_args = {'connect_timeout': 10}
+        if url.get_driver_name() == 'psycopg':
+            # psycopg 3 prepara las sentencias repetidas en el servidor, y en
+            # modo transacción la conexión del servidor cambia entre
+            # transacciones. psycopg2 no prepara nada.
+            connect_args['prepare_threshold'] = None
+        opciones = {
+            'pool_size': hilos,
+            'max_overflow': 0,
+            'pool_timeout': 10,
+            'pool_recycle': 300,
+            'pool_pre_ping': True,
+            'connect_args': connect_args,
+        }
+
+    for clave, valor in (('pool_size', pool_size), ('max_overflow', max_overflow),
+                         ('pool_recycle', pool_recycle), ('pool_timeout', pool_timeout)):
+        if valor is not None:
+            opciones[clave] = valor
+    opciones['poolclass'] = PoolMedido
+    return opciones
@@ -5,11 +5,15 @@ from flask_bcrypt import Bcrypt
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
+# Registra el esquema iturnito+sqlite:// para RATELIMIT_STORAGE_URI
+from .services import limites
+
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
 bcrypt = Bcrypt()
-limiter = Limiter(key_func=get_remote_address, storage_uri="memory://")
+# El storage se toma de RATELIMIT_STORAGE_URI (ver configs/config.py)
+limiter = Limiter(key_func=get_remote_address)
 
 # Configuración de Flask-Login
 # A dónde redirigir si un usuario anónimo intenta acceder a una ruta protegida
@@ -5,4 +5,9 @@ from .doctor import Doctor
 from .configuracion_horario import ConfiguracionHorario
 from .horario_disponible import HorarioDisponible
 from .turno import Turno
-
+from .estadistica_diaria import EstadisticaDiaria
+from .version_tabla import VersionTabla
+from .version_agenda import VersionAgenda
+from .notificacion import Notificacion
+from .trabajo import Trabajo
+from .excepcion import Excepcion
@@ -26,6 +26,9 @@ class Doctor(db.Model):
     # Relación 1-a-1 con ConfiguracionHorario
     configuracion = db.relationship('ConfiguracionHorario', back_populates='doctor', uselist=False, cascade="all, delete-orphan")
 
+    # Relación 1-a-Muchos con Excepcion (las generales no tienen doctor)
+    excepciones = db.relationship('Excepcion', back_populates='doctor', lazy=True, cascade="all, delete-orphan")
+
     def __repr__(self):
         return f'<Doctor {self.user.name if self.user else self.id}>'
 
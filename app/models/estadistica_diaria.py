@@ -0,0 +1,31 @@
+from ..extensions import db
+
+class EstadisticaDiaria(db.Model):
+    """Contador de turnos por día, doctor y estado.
+
+    Se mantiene en la misma transacción que cada alta o cambio de estado
+    de un Turno (ver app/services/estadisticas.py), así los dashboards
+    leen totales ya agregados en lugar de recorrer toda la tabla turnos.
+    """
+    __tablename__ = 'estadisticas_diarias'
+    __table_args__ = (
+        db.UniqueConstraint('fecha', 'doctor_id', 'estado', name='uq_estadisticas_diarias_fecha_doctor_estado'),
+        db.Index('ix_estadisticas_diarias_estado_fecha', 'estado', 'fecha'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, nullable=False)
+    estado = db.Column(db.String(20), nullable=False)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    # Anticipación de la reserva: suma de minutos entre creado_en y
+    # fecha_hora, y cuántos turnos la tienen (los viejos no tienen creado_en)
+    anticipacion_minutos = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    anticipacion_turnos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # --- Claves Externas ---
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctores.id'), nullable=False)
+    # Copia de Doctor.especialidad_id al momento de registrar el turno
+    especialidad_id = db.Column(db.Integer, db.ForeignKey('especialidades.id'), nullable=True, index=True)
+
+    def __repr__(self):
+        return f'<EstadisticaDiaria {self.fecha} DrID: {self.doctor_id} {self.estado}={self.cantidad}>'
@@ -0,0 +1,39 @@
+from ..extensions import db
+import datetime
+
+class Excepcion(db.Model):
+    """Intervalo [inicio, fin) en el que un doctor no atiende (vacaciones,
+    congresos...). Con ``doctor_id`` NULL vale para todos: feriados.
+    """
+    __tablename__ = 'excepciones'
+    __table_args__ = (
+        # Excepciones de un doctor (y las generales, doctor_id NULL) que
+        # terminan después de una fecha: la consulta de solapamiento
+        db.Index('ix_excepciones_doctor_fin', 'doctor_id', 'fin'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    inicio = db.Column(db.DateTime, nullable=False)
+    fin = db.Column(db.DateTime, nullable=False)
+    motivo = db.Column(db.String(200), nullable=True)
+
+    # --- Claves Externas ---
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctores.id', ondelete='CASCADE'), nullable=True)
+
+    # --- Relaciones ---
+    doctor = db.relationship('Doctor', back_populates='excepciones')
+
+    def to_dict(self):
+        ultimo = self.fin - datetime.timedelta(microseconds=1)
+        return {
+            'id': self.id,
+            'fecha': self.inicio.date().isoformat(),
+            'hasta': ultimo.date().isoformat(),
+            'hora_inicio': self.inicio.strftime('%H:%M') if self.inicio.time() != datetime.time() else None,
+            'hora_fin': self.fin.strftime('%H:%M') if self.fin.time() != datetime.time() else None,
+            'motivo': self.motivo,
+            'global': self.doctor_id is None,
+        }
+
+    def __repr__(self):
+        return f'<Excepcion {self.id} DrID: {self.doctor_id} {self.inicio} - {self.fin}>'
@@ -3,6 +3,9 @@ import datetime
 
 class HorarioDisponible(db.Model):
     __tablename__ = 'horarios_disponibles'
+    __table_args__ = (
+        db.Index('ix_horarios_disponibles_doctor_dia', 'doctor_id', 'dia_semana'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
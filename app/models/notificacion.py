@@ -0,0 +1,39 @@
+from ..extensions import db
+import datetime
+
+class Notificacion(db.Model):
+    """Aviso para un usuario (turno reservado, cancelado, completado...).
+
+    Se crean en la misma transacción que el cambio del turno (ver
+    app/services/notificaciones.py).
+    """
+    __tablename__ = 'notificaciones'
+    __table_args__ = (
+        # Bandeja del usuario: no leídas primero por fecha, y el conteo de no leídas
+        db.Index('ix_notificaciones_user_leida_creado', 'user_id', 'leida', 'creado_en'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(30), nullable=False)
+    titulo = db.Column(db.String(150), nullable=False)
+    mensaje = db.Column(db.Text, nullable=True)
+    leida = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
+    creado_en = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+
+    # --- Claves Externas ---
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    turno_id = db.Column(db.Integer, db.ForeignKey('turnos.id', ondelete='SET NULL'), nullable=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'titulo': self.titulo,
+            'mensaje': self.mensaje,
+            'leida': self.leida,
+            'creado_en': self.creado_en.isoformat(timespec='seconds'),
+            'turno_id': self.turno_id,
+        }
+
+    def __repr__(self):
+        return f'<Notificacion {self.id} User: {self.user_id} {self.tipo}>'
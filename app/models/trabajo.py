@@ -0,0 +1,38 @@
+from ..extensions import db
+import datetime
+import json
+
+class Trabajo(db.Model):
+    """Tarea en segundo plano (recordatorios, limpiezas...).
+
+    La toma ``flask worker`` marcándola con un UPDATE condicional, así dos
+    workers nunca procesan la misma (ver app/services/trabajos.py).
+    ``clave`` evita encolar dos veces lo mismo (por ejemplo, el recordatorio
+    de un turno).
+    """
+    __tablename__ = 'trabajos'
+    __table_args__ = (
+        # Los próximos trabajos a tomar y los que quedaron colgados
+        db.Index('ix_trabajos_estado_disponible', 'estado', 'disponible_en'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    datos = db.Column(db.Text, nullable=False, default='{}')
+    clave = db.Column(db.String(200), nullable=True, unique=True)
+    estado = db.Column(db.String(20), nullable=False, default='pendiente')  # pendiente, en_curso, hecho, fallido
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=5)
+    disponible_en = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+    tomado_por = db.Column(db.String(100), nullable=True)
+    tomado_en = db.Column(db.DateTime, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    creado_en = db.Column(db.DateTime, nullable=False, default=datetime.datetime.now)
+    terminado_en = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def parametros(self):
+        return json.loads(self.datos or '{}')
+
+    def __repr__(self):
+        return f'<Trabajo {self.id} {self.tipo} {self.estado}>'
@@ -3,6 +3,20 @@ import datetime
 
 class Turno(db.Model):
     __tablename__ = 'turnos'
+    __table_args__ = (
+        # Agenda del doctor por fecha y estado (dashboard, mis turnos, slots)
+        db.Index('ix_turnos_doctor_fecha_estado', 'doctor_id', 'fecha_hora', 'estado'),
+        # Turnos del paciente ordenados por fecha
+        db.Index('ix_turnos_paciente_fecha', 'paciente_id', 'fecha_hora'),
+        # Listados globales por fecha (admin)
+        db.Index('ix_turnos_fecha_hora', 'fecha_hora'),
+        # Sólo los turnos que ocupan un slot: el índice que usa la búsqueda de horarios libres
+        db.Index(
+            'ix_turnos_doctor_fecha_activos', 'doctor_id', 'fecha_hora',
+            postgresql_where=db.text("estado IN ('pendiente', 'confirmado')"),
+            sqlite_where=db.text("estado IN ('pendiente', 'confirmado')"),
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     fecha_hora = db.Column(db.DateTime, nullable=False)
@@ -10,6 +24,9 @@ class Turno(db.Model):
     modalidad = db.Column(db.String(50), default='presencial')
     observaciones = db.Column(db.Text, nullable=True)  # Notas del paciente al reservar
     notas_doctor = db.Column(db.Text, nullable=True)   # Notas del médico
+    # Momento de la reserva (anticipación en reportes). NULL en los turnos
+    # cargados antes de que existiera la columna.
+    creado_en = db.Column(db.DateTime, nullable=True, default=datetime.datetime.now)
 
     # --- Claves Externas ---
     doctor_id = db.Column(db.Integer, db.ForeignKey('doctores.id'), nullable=False)
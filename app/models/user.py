@@ -1,4 +1,5 @@
-from ..extensions import db, bcrypt
+from ..extensions import db
+from ..services import contrasenas
 from flask_login import UserMixin
 
 class User(db.Model, UserMixin):
@@ -16,11 +17,16 @@ class User(db.Model, UserMixin):
     paciente_perfil = db.relationship('Paciente', back_populates='user', uselist=False)
     doctor_perfil = db.relationship('Doctor', back_populates='user', uselist=False)
 
+    # bcrypt corre en el pool de app/services/contrasenas.py
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = contrasenas.hashear(password)
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return contrasenas.verificar(self.password_hash, password)
+
+    def necesita_rehash(self):
+        """True si el hash se generó con otro costo que BCRYPT_LOG_ROUNDS."""
+        return contrasenas.necesita_rehash(self.password_hash)
 
     def __repr__(self):
         return f'<User {self.name} ({self.rol})>'
@@ -0,0 +1,25 @@
+import datetime
+
+from ..extensions import db
+
+class VersionAgenda(db.Model):
+    """Contador de cambios de la agenda de un doctor en un día.
+
+    Se incrementa en la misma transacción que las reservas, cancelaciones y
+    cambios de turnos de ese día (ver app/services/agenda.py). La fila con
+    ``fecha == VersionAgenda.HORARIO`` cambia con el horario semanal del
+    doctor y afecta a todos sus días; la de ``doctor_id == VersionAgenda.TODOS``
+    cambia con los feriados, que afectan a todos los doctores. Sin clave
+    foránea: borrar un doctor también incrementa contadores en el mismo flush.
+    """
+    __tablename__ = 'versiones_agenda'
+
+    HORARIO = datetime.date(1, 1, 1)
+    TODOS = 0
+
+    doctor_id = db.Column(db.Integer, primary_key=True)
+    fecha = db.Column(db.Date, primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VersionAgenda DrID: {self.doctor_id} {self.fecha}={self.version}>'
@@ -0,0 +1,16 @@
+from ..extensions import db
+
+class VersionTabla(db.Model):
+    """Contador de cambios de una tabla.
+
+    Se incrementa en la misma transacción que cualquier alta, baja o
+    modificación de la tabla (ver app/services/versiones.py) y sirve para
+    armar los ETag de la API sin consultar los datos.
+    """
+    __tablename__ = 'versiones_tablas'
+
+    tabla = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VersionTabla {self.tabla}={self.version}>'
@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, current_app, Response, stream_with_context, jsonify
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
-from sqlalchemy import or_, func, distinct
+from sqlalchemy import or_
 import datetime
+import io
+import os
 
 # --- Importaciones de Modelos y DB ---
 from app.models.doctor import Doctor
@@ -10,11 +12,55 @@ from app.models.user import User
 from app.models.especialidad import Especialidad
 from app.models.paciente import Paciente
 from app.models.turno import Turno
+from app.services import contrasenas, estadisticas, exportacion, importacion, pool, reportes
+from app.services.fechas import rango_dia
+from app.services.paginacion import paginar, por_pagina_desde_request, CursorInvalido
 from app import db 
 
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+ESTADOS_TURNO = ['pendiente', 'confirmado', 'completado', 'cancelado']
+
+
+def _paginar_listado(query, columnas, descendente=False):
+    """Aplica la paginación por cursor (?despues= / ?antes=) de los listados."""
+    try:
+        return paginar(
+            query, columnas,
+            despues=request.args.get('despues') or None,
+            antes=request.args.get('antes') or None,
+            por_pagina=por_pagina_desde_request(),
+            descendente=descendente
+        )
+    except CursorInvalido:
+        abort(400)
+
+
+def _importar_csv(rol, titulo, volver):
+    """Formulario y procesamiento de la importación CSV de ``rol``."""
+    resultado = None
+    if request.method == 'POST':
+        archivo = request.files.get('archivo')
+        if not archivo or not archivo.filename:
+            flash('Selecciona un archivo CSV.', 'danger')
+            return redirect(request.url)
+        # Se lee en streaming; utf-8-sig descarta el BOM que agrega Excel
+        lineas = io.TextIOWrapper(archivo.stream, encoding='utf-8-sig', newline='')
+        try:
+            resultado = importacion.importar(
+                lineas, rol, max_filas=current_app.config['IMPORTACION_MAX_FILAS_WEB']
+            )
+        except (importacion.ArchivoInvalido, UnicodeDecodeError) as e:
+            flash(f'No se pudo leer el archivo: {e}', 'danger')
+            return redirect(request.url)
+        if resultado.creados:
+            flash(f'Se crearon {resultado.creados} usuarios.', 'success')
+        if resultado.errores:
+            flash(f'{len(resultado.errores)} filas no se importaron.', 'danger')
+    return render_template('admin/importar.html', titulo=titulo, volver=volver,
+                           columnas=importacion.COLUMNAS[rol], resultado=resultado)
+
 # --- Seguridad para todo el Blueprint de Admin ---
 @admin_bp.before_request
 @login_required
@@ -34,23 +80,18 @@ def dashboard():
     total_pacientes = Paciente.query.count()
     total_especialidades = Especialidad.query.count()
     
+    # 2 a 4 se leen de los contadores ya agregados (estadisticas_diarias)
+    # en lugar de recorrer la tabla turnos.
+
     # 2. Turnos Hoy (de todo el sistema)
     today = datetime.date.today()
-    turnos_hoy_admin = Turno.query.filter(func.date(Turno.fecha_hora) == today).count()
+    turnos_hoy_admin = estadisticas.turnos_del_dia(today)
 
     # 3. Turnos por Estado (Gráfico/Lista)
-    turnos_por_estado = db.session.query(
-        Turno.estado, func.count(Turno.id)
-    ).group_by(Turno.estado).all()
+    turnos_por_estado = estadisticas.turnos_por_estado()
 
     # 4. Especialidades Más Solicitadas (Gráfico/Lista)
-    especialidades_populares = db.session.query(
-        Especialidad.nombre, func.count(Turno.id).label('total_turnos')
-    ).join(Doctor, Turno.doctor_id == Doctor.id)\
-     .join(Especialidad, Doctor.especialidad_id == Especialidad.id)\
-     .group_by(Especialidad.nombre)\
-     .order_by(func.count(Turno.id).desc())\
-     .limit(5).all()
+    especialidades_populares = estadisticas.especialidades_populares(limite=5)
 
     # 5. Actividad Reciente (Últimos 5 turnos creados)
     actividad_reciente = Turno.query.options(
@@ -73,7 +114,8 @@ def dashboard():
 # --- Gestión de Doctores (Completo) ---
 @admin_bp.route('/doctores', methods=['GET'])
 def doctores_index():
-    doctores = Doctor.query.join(User).filter(User.rol == 'doctor').options(joinedload(Doctor.user), joinedload(Doctor.especialidad)).all()
+    query = Doctor.query.join(User).filter(User.rol == 'doctor').options(joinedload(Doctor.user), joinedload(Doctor.especialidad))
+    doctores = _paginar_listado(query, [Doctor.id])
     return render_template('admin/doctores/index.html', doctores=doctores)
 
 @admin_bp.route('/doctores/crear', methods=['GET'])
@@ -105,6 +147,10 @@ def doctores_guardar():
     flash('Doctor creado exitosamente.', 'success')
     return redirect(url_for('admin.doctores_index'))
 
+@admin_bp.route('/doctores/importar', methods=['GET', 'POST'])
+def doctores_importar():
+    return _importar_csv('doctor', 'Importar Doctores', 'admin.doctores_index')
+
 @admin_bp.route('/doctores/<int:doctor_id>/editar', methods=['GET'])
 def doctores_editar(doctor_id):
     doctor = Doctor.query.get_or_404(doctor_id)
@@ -202,7 +248,8 @@ def especialidades_eliminar(esp_id):
 # --- Gestión de Pacientes (Completo) ---
 @admin_bp.route('/pacientes', methods=['GET'])
 def pacientes_index():
-    pacientes = Paciente.query.join(User).filter(User.rol == 'paciente').options(joinedload(Paciente.user)).all()
+    query = Paciente.query.join(User).filter(User.rol == 'paciente').options(joinedload(Paciente.user))
+    pacientes = _paginar_listado(query, [Paciente.id])
     return render_template('admin/pacientes/index.html', pacientes=pacientes)
 
 @admin_bp.route('/pacientes/crear', methods=['GET'])
@@ -232,6 +279,10 @@ def pacientes_guardar():
     flash('Paciente creado exitosamente.', 'success')
     return redirect(url_for('admin.pacientes_index'))
 
+@admin_bp.route('/pacientes/importar', methods=['GET', 'POST'])
+def pacientes_importar():
+    return _importar_csv('paciente', 'Importar Pacientes', 'admin.pacientes_index')
+
 @admin_bp.route('/pacientes/<int:pac_id>/editar', methods=['GET'])
 def pacientes_editar(pac_id):
     paciente = Paciente.query.get_or_404(pac_id)
@@ -281,15 +332,114 @@ def pacientes_eliminar(pac_id):
 # --- Gestión de Turnos (Completo) ---
 @admin_bp.route('/turnos')
 def turnos_index():
-    turnos = Turno.query.options(
+    query = Turno.query.options(
         joinedload(Turno.doctor).joinedload(Doctor.user),
         joinedload(Turno.paciente).joinedload(Paciente.user)
-    ).order_by(Turno.fecha_hora.desc()).all()
-    return render_template('admin/turnos/index.html', turnos=turnos) 
-
-# --- Gestión de Reportes (Placeholder) ---
+    )
+
+    # --- Filtros ---
+    filtros = {
+        'doctor_id': request.args.get('doctor_id', type=int),
+        'paciente_dni': (request.args.get('paciente_dni') or '').strip(),
+        'estado': request.args.get('estado') or '',
+        'desde': request.args.get('desde') or '',
+        'hasta': request.args.get('hasta') or '',
+    }
+    if filtros['doctor_id']:
+        query = query.filter(Turno.doctor_id == filtros['doctor_id'])
+    if filtros['paciente_dni']:
+        query = query.join(Paciente, Turno.paciente_id == Paciente.id)\
+                     .join(User, Paciente.user_id == User.id)\
+                     .filter(User.dni == filtros['paciente_dni'])
+    if filtros['estado'] in ESTADOS_TURNO:
+        query = query.filter(Turno.estado == filtros['estado'])
+    try:
+        desde = datetime.date.fromisoformat(filtros['desde']) if filtros['desde'] else None
+        hasta = datetime.date.fromisoformat(filtros['hasta']) if filtros['hasta'] else None
+    except ValueError:
+        flash('Rango de fechas inválido.', 'danger')
+        return redirect(url_for('admin.turnos_index'))
+    if desde:
+        query = query.filter(Turno.fecha_hora >= rango_dia(desde)[0])
+    if hasta:
+        query = query.filter(Turno.fecha_hora < rango_dia(hasta)[1])
+
+    turnos = _paginar_listado(query, [Turno.fecha_hora, Turno.id], descendente=True)
+
+    doctores = db.session.query(Doctor.id, User.name).join(User, Doctor.user_id == User.id).order_by(User.name).all()
+    return render_template('admin/turnos/index.html', turnos=turnos, filtros=filtros,
+                           doctores=doctores, estados=ESTADOS_TURNO)
+
+@admin_bp.route('/turnos/exportar')
+def turnos_exportar():
+    """Descarga en streaming (CSV o NDJSON) de los turnos filtrados."""
+    formato = request.args.get('formato', 'csv')
+    if formato not in exportacion.FORMATOS:
+        abort(400)
+    try:
+        filtros = exportacion.leer_filtros(request.args)
+    except exportacion.FiltroInvalido as e:
+        flash(f'Filtro inválido: {e}', 'danger')
+        return redirect(url_for('admin.turnos_index'))
+    nombre = f"turnos-{datetime.date.today().isoformat()}.{formato}"
+    # Sin Content-Length: gunicorn lo envía con Transfer-Encoding: chunked
+    return Response(
+        stream_with_context(exportacion.generar(formato, filtros)),
+        mimetype=exportacion.FORMATOS[formato],
+        headers={'Content-Disposition': f'attachment; filename="{nombre}"'}
+    )
+
+# --- Reportes ---
 @admin_bp.route('/reportes')
 def reportes_index():
-    # Placeholder - La lógica de reportes puede ser compleja
-    return render_template('admin/reportes/index.html')
+    filtros = reportes.Filtros.por_defecto()
+    try:
+        if request.args.get('desde'):
+            filtros.desde = datetime.date.fromisoformat(request.args['desde'])
+        if request.args.get('hasta'):
+            filtros.hasta = datetime.date.fromisoformat(request.args['hasta'])
+        filtros = reportes.Filtros(
+            filtros.desde, filtros.hasta,
+            especialidad_id=request.args.get('especialidad_id', type=int),
+            doctor_id=request.args.get('doctor_id', type=int)
+        )
+    except ValueError:
+        flash('Rango de fechas inválido.', 'danger')
+        return redirect(url_for('admin.reportes_index'))
 
+    especialidades = Especialidad.query.order_by(Especialidad.nombre).all()
+    doctores = db.session.query(Doctor.id, User.name).join(User, Doctor.user_id == User.id).order_by(User.name).all()
+    return render_template(
+        'admin/reportes/index.html',
+        filtros=filtros, especialidades=especialidades, doctores=doctores,
+        resumen=reportes.resumen(filtros),
+        por_doctor_mes=reportes.turnos_por_doctor_mes(filtros),
+        tasas=reportes.tasas_por_doctor(filtros),
+        ingresos=reportes.ingresos_por_mes(filtros)
+    )
+
+
+# --- Pool de conexiones ---
+@admin_bp.route('/api/pool', methods=['GET', 'POST'])
+def estado_pool():
+    """Ocupación y esperas del pool del worker que contesta (con POST, además,
+    pone las esperas en cero). Cada worker tiene su pool: conviene pedirlo varias veces."""
+    datos = pool.estadisticas(db.engine, current_app.config['SQLALCHEMY_ENGINE_OPTIONS'].get('max_overflow'))
+    datos.update(perfil=current_app.config['DB_PERFIL'], pid=os.getpid())
+    if request.method == 'POST':
+        pool.reiniciar()
+    return jsonify(datos)
+
+
+# --- Hash de contraseñas ---
+@admin_bp.route('/api/contrasenas')
+def estado_contrasenas():
+    """Hashes, verificaciones y tiempo promedio de bcrypt en el worker que
+    contesta, desde que arrancó. Como con el pool, cada worker lleva los suyos."""
+    datos = contrasenas.estadisticas()
+    datos.update(
+        procesos=current_app.config['HASH_POOL_WORKERS'],
+        rounds=current_app.config['BCRYPT_LOG_ROUNDS'],
+        pid=os.getpid()
+    )
+    return jsonify(datos)
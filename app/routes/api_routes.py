@@ -1,37 +1,219 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, abort, current_app
 from flask_login import login_required
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
+from werkzeug.exceptions import HTTPException
+import datetime
+
+from app.models.doctor import Doctor
+from app.models.especialidad import Especialidad
+from app.models.user import User
+from app.services import agenda, excepciones, primeros_turnos, versiones
+from app.services.paginacion import paginar, por_pagina_desde_request, CursorInvalido
+from app.services.limites import clave_usuario_o_ip
+from app.extensions import limiter
+from app import db
 
 # Prefijo /api. La protección @login_required es opcional
 # dependiendo de si tu API es pública o privada.
 api_bp = Blueprint('api', __name__, url_prefix='/api')
-api_bp.before_request(login_required) # Protegemos todas las rutas de API
+
+@api_bp.before_request
+@login_required
+def proteger_api():
+    # Protegemos todas las rutas de API
+    pass
+
+# Todas las respuestas llevan un ETag calculado con la versión de las tablas
+# de las que salen (ver app/services/versiones.py): si nada cambió se
+# contesta 304 sin consultar los datos.
+#
+# Los listados aceptan ?campos=id,nombre para elegir campos y se paginan
+# por cursor con ?por_pagina=, ?despues= y ?antes=.
+
+
+@api_bp.errorhandler(HTTPException)
+def error_json(error):
+    return jsonify({'error': error.description}), error.code
+
+
+def _campos(disponibles):
+    """Campos pedidos en ?campos= (todos si no se pide ninguno)."""
+    pedidos = [c.strip() for c in request.args.get('campos', '').split(',') if c.strip()]
+    if not pedidos:
+        return list(disponibles)
+    desconocidos = [c for c in pedidos if c not in disponibles]
+    if desconocidos:
+        abort(400, description=f"Campos desconocidos: {', '.join(desconocidos)}")
+    return pedidos
+
+
+def _listado(query, columnas, serializar, campos):
+    """Página de ``query`` serializada como {items, siguiente, anterior}."""
+    try:
+        pagina = paginar(
+            query, columnas,
+            despues=request.args.get('despues') or None,
+            antes=request.args.get('antes') or None,
+            por_pagina=por_pagina_desde_request()
+        )
+    except CursorInvalido:
+        abort(400, description='Cursor inválido')
+    items = []
+    for fila in pagina:
+        datos = serializar(fila)
+        items.append({campo: datos[campo] for campo in campos})
+    return jsonify({'items': items, 'siguiente': pagina.siguiente, 'anterior': pagina.anterior})
+
+
+# --- Especialidades ---
+
+CAMPOS_ESPECIALIDAD = ('id', 'nombre', 'cantidad_doctores')
+
 
 @api_bp.route('/especialidades', methods=['GET'])
 def api_especialidades():
-    # Lógica para buscar especialidades...
-    especialidades = [
-        {"id": 1, "nombre": "Cardiología"},
-        {"id": 2, "nombre": "Dermatología"}
-    ] # Placeholder
-    return jsonify(especialidades)
+    campos = _campos(CAMPOS_ESPECIALIDAD)
+
+    def generar():
+        query = db.session.query(
+            Especialidad.id, Especialidad.nombre, func.count(Doctor.id).label('cantidad_doctores')
+        ).outerjoin(Doctor, Doctor.especialidad_id == Especialidad.id)\
+         .group_by(Especialidad.id, Especialidad.nombre)
+        return _listado(query, [Especialidad.nombre, Especialidad.id], lambda fila: dict(fila._mapping), campos)
+
+    etag = versiones.etag_de_request(['especialidades', 'doctores'])
+    return versiones.respuesta_condicional(etag, generar)
+
+
+# --- Doctores ---
+
+CAMPOS_DOCTOR = (
+    'id', 'name', 'matricula', 'especialidad_id',
+    'duracion_turno', 'modalidad', 'precio_consulta', 'dias_semana',
+)
+
+
+def _doctor_a_dict(doctor):
+    config = doctor.configuracion
+    return {
+        'id': doctor.id,
+        'name': doctor.user.name,
+        'matricula': doctor.matricula,
+        'especialidad_id': doctor.especialidad_id,
+        'duracion_turno': config.duracion_turno if config else agenda.DURACION_DEFAULT,
+        'modalidad': config.modalidad if config else None,
+        'precio_consulta': config.precio_consulta if config else None,
+        'dias_semana': sorted({h.dia_semana for h in doctor.horarios_disponibles}),
+    }
+
 
 @api_bp.route('/especialidad/<int:especialidad_id>/doctores', methods=['GET'])
 def api_doctores_por_especialidad(especialidad_id):
-   # Lógica para buscar doctores...
-    doctores = [
-        {"id": 1, "name": "Dr. Juan Pérez"},
-        {"id": 2, "name": "Dra. Ana Gómez"}
-    ] # Placeholder
-    return jsonify(doctores)
+    campos = _campos(CAMPOS_DOCTOR)
+
+    def generar():
+        if db.session.get(Especialidad, especialidad_id) is None:
+            abort(404)
+        # Usuario y configuración en el mismo SELECT, los horarios en uno
+        # más para toda la página
+        query = Doctor.query.filter(Doctor.especialidad_id == especialidad_id).options(
+            joinedload(Doctor.user),
+            joinedload(Doctor.configuracion),
+            selectinload(Doctor.horarios_disponibles)
+        )
+        return _listado(query, [Doctor.id], _doctor_a_dict, campos)
+
+    etag = versiones.etag_de_request(
+        ['especialidades', 'doctores', 'users', 'configuracion_horarios', 'horarios_disponibles']
+    )
+    return versiones.respuesta_condicional(etag, generar)
+
+
+# --- Horarios disponibles ---
 
 @api_bp.route('/doctor/<int:doctor_id>/horarios-disponibles', methods=['GET'])
 def api_horarios_disponibles(doctor_id):
-   # Lógica para buscar horarios...
-    horarios = [
-        {"fecha": "2025-11-20", "hora": "10:00"},
-        {"fecha": "2025-11-20", "hora": "10:30"}
-    ] # Placeholder
-    return jsonify(horarios)
+    """Slots libres desde ?desde= (hoy por defecto) durante ?dias= días (7)."""
+    hoy = datetime.date.today()
+    try:
+        desde = datetime.date.fromisoformat(request.args['desde']) if request.args.get('desde') else hoy
+    except ValueError:
+        abort(400, description='Fecha inválida')
+    dias = request.args.get('dias', 7, type=int)
+    if not 1 <= dias <= current_app.config['AGENDA_RANGO_MAX_DIAS']:
+        abort(400, description='Cantidad de días fuera de rango')
+    desde = max(desde, hoy)
+    hasta = desde + datetime.timedelta(days=dias - 1)
+
+    if db.session.get(Doctor, doctor_id) is None:
+        abort(404)
+    version = agenda.version_horario(doctor_id)
+    plantilla = agenda.obtener_plantilla(doctor_id, version)
+    intervalos = excepciones.intervalos_de(doctor_id, version)
+    now = datetime.datetime.now()
+    # Los slots de hoy van venciendo: si el rango incluye hoy el ETag
+    # cambia con cada minuto. Los turnos entran por las versiones de la
+    # agenda del doctor en esos días (no por la de toda la tabla), y la
+    # plantilla y las excepciones por si este worker todavía tiene en
+    # cache unas anteriores a un cambio.
+    momento = now.strftime('%Y-%m-%dT%H:%M') if desde == hoy else hoy.isoformat()
+    etag = versiones.etag_de_request(
+        ['horarios_disponibles', 'configuracion_horarios', 'excepciones'],
+        momento, agenda.version_rango([doctor_id], desde, hasta), plantilla.huella(), intervalos.huella()
+    )
+
+    def generar():
+        disponibilidad = agenda.disponibilidad_rango(doctor_id, desde, hasta, now=now, version=version)
+        return jsonify([
+            {'fecha': fecha, 'hora': slot['hora']}
+            for fecha, dia in sorted(disponibilidad.items())
+            for slot in dia['horarios']
+        ])
+
+    return versiones.respuesta_condicional(etag, generar)
+
+
+# --- Primeros turnos libres ---
+
+@api_bp.route('/primeros-turnos', methods=['GET'])
+@limiter.limit(lambda: current_app.config['LIMITE_CONSULTA_HORARIOS'], key_func=clave_usuario_o_ip)
+def api_primeros_turnos():
+    """Los ?cantidad= (10) primeros slots libres entre los doctores que
+    cumplen ?especialidad_id=, ?modalidad=, ?precio_min= y ?precio_max=."""
+    cantidad = request.args.get('cantidad', 10, type=int)
+    if not 1 <= cantidad <= current_app.config['PRIMEROS_TURNOS_MAX']:
+        abort(400, description='Cantidad fuera de rango')
+    filtros = dict(
+        especialidad_id=request.args.get('especialidad_id', type=int),
+        modalidad=request.args.get('modalidad') or None,
+        precio_min=request.args.get('precio_min', type=float),
+        precio_max=request.args.get('precio_max', type=float),
+    )
+    now = datetime.datetime.now()
+    dias = current_app.config['PRIMEROS_TURNOS_DIAS']
+    doctor_ids = primeros_turnos.doctores_candidatos(**filtros)
+    # Los resultados van venciendo con la hora, así que el ETag también.
+    # De los turnos sólo importan los de los doctores candidatos en los
+    # días de la búsqueda: las versiones de sus agendas.
+    etag = versiones.etag_de_request(
+        ['doctores', 'users', 'horarios_disponibles', 'configuracion_horarios', 'excepciones'],
+        now.strftime('%Y-%m-%dT%H:%M'),
+        agenda.version_rango(doctor_ids, now.date(), now.date() + datetime.timedelta(days=dias - 1))
+    )
 
-# ... (El resto de rutas de API seguiría el mismo patrón)
+    def generar():
+        slots = primeros_turnos.primeros_libres(doctor_ids, cantidad, now=now, dias=dias)
+        nombres = dict(db.session.query(Doctor.id, User.name).join(User, User.id == Doctor.user_id)
+                       .filter(Doctor.id.in_({doctor_id for doctor_id, _ in slots})).all()) if slots else {}
+        return jsonify([
+            {
+                'doctor_id': doctor_id,
+                'doctor': nombres.get(doctor_id),
+                'fecha': fecha_hora.date().isoformat(),
+                'hora': fecha_hora.strftime('%H:%M'),
+            }
+            for doctor_id, fecha_hora in slots
+        ])
 
+    return versiones.respuesta_condicional(etag, generar)
@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
 from flask_login import login_user, logout_user, current_user
 from ..models.user import User
 from ..models.paciente import Paciente 
@@ -8,6 +8,7 @@ auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
 # --- RUTAS DE LOGIN ---
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@limiter.limit(lambda: current_app.config['LIMITE_LOGIN'], methods=['POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('main.dashboard'))
@@ -20,6 +21,10 @@ def login():
         user = User.query.filter_by(email=email).first()
 
         if user and user.check_password(password):
+            if user.necesita_rehash():
+                # Cambió BCRYPT_LOG_ROUNDS: se aprovecha que tenemos la contraseña
+                user.set_password(password)
+                db.session.commit()
             login_user(user, remember=remember)
             flash('Inicio de sesión exitoso', 'success')
             return redirect(url_for('main.dashboard'))
@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template, jsonify, request, flash, redirect, url_for
+from flask import Blueprint, render_template, jsonify, request, flash, redirect, url_for, current_app, Response, stream_with_context
 from flask_login import login_required, current_user
 import datetime
 import json
-from sqlalchemy import or_, func, cast, Date, distinct
+import time
+from sqlalchemy import or_, cast, Date, distinct
 from sqlalchemy.orm import joinedload
 
 # --- Importaciones de Modelos y DB ---
@@ -12,6 +13,10 @@ from app.models.turno import Turno
 from app.models.paciente import Paciente
 from app.models.user import User
 from app.models.doctor import Doctor
+from app.services import agenda, estadisticas, excepciones, reportes, versiones, eventos_agenda
+from app.services.fechas import entre, rango_dia, rango_semana
+from app.services.limites import clave_usuario_o_ip
+from app.extensions import limiter
 from app import db
 
 # --- 1. DEFINICIÓN DEL BLUEPRINT ---
@@ -22,7 +27,7 @@ doctor_bp = Blueprint('doctor', __name__, url_prefix='/doctor')
 @doctor_bp.before_request
 @login_required
 def check_doctor_role():
-    if request.endpoint not in ['doctor.obtener_horarios']:
+    if request.endpoint not in ['doctor.obtener_horarios', 'doctor.obtener_disponibilidad', 'doctor.eventos_horarios']:
         if not current_user.is_authenticated or current_user.rol != 'doctor':
             flash('Acceso no autorizado.', 'danger')
             return redirect(url_for('main.index'))
@@ -33,22 +38,8 @@ def check_doctor_role():
 @doctor_bp.route('/dashboard')
 def dashboard():
     """Dashboard específico del doctor con estadísticas."""
-    doctor_id = current_user.doctor_perfil.id
-    today = datetime.date.today()
-    start_of_week = today - datetime.timedelta(days=today.weekday())
-    end_of_week = start_of_week + datetime.timedelta(days=6)
-    
-    turnos_hoy_count = Turno.query.filter(Turno.doctor_id == doctor_id, func.date(Turno.fecha_hora) == today).count()
-    turnos_semana_count = Turno.query.filter(Turno.doctor_id == doctor_id, Turno.fecha_hora.between(datetime.datetime.combine(start_of_week, datetime.time.min), datetime.datetime.combine(end_of_week, datetime.time.max))).count()
-    turnos_pendientes_count = Turno.query.filter(Turno.doctor_id == doctor_id, Turno.estado == 'pendiente', Turno.fecha_hora >= datetime.datetime.now()).count()
-    pacientes_count = db.session.query(func.count(distinct(Turno.paciente_id))).filter_by(doctor_id=doctor_id).scalar()
-
-    stats = {
-        'turnos_hoy': turnos_hoy_count,
-        'turnos_semana': turnos_semana_count,
-        'turnos_pendientes': turnos_pendientes_count,
-        'pacientes': pacientes_count
-    }
+    # Una sola consulta agregada, cacheada por doctor unos segundos
+    stats = estadisticas.resumen_doctor(current_user.doctor_perfil.id)
     return render_template('doctor/dashboard.html', stats=stats)
 
 
@@ -71,14 +62,9 @@ def mis_turnos():
     if fecha_str:
         fecha_obj = datetime.date.fromisoformat(fecha_str)
         if vista == 'dia':
-            query = query.filter(db.func.date(Turno.fecha_hora) == fecha_obj)
+            query = query.filter(entre(Turno.fecha_hora, rango_dia(fecha_obj)))
         else: # vista == 'semana'
-            inicio_semana = fecha_obj - datetime.timedelta(days=fecha_obj.weekday())
-            fin_semana = inicio_semana + datetime.timedelta(days=6)
-            query = query.filter(Turno.fecha_hora.between(
-                datetime.datetime.combine(inicio_semana, datetime.time.min),
-                datetime.datetime.combine(fin_semana, datetime.time.max)
-            ))
+            query = query.filter(entre(Turno.fecha_hora, rango_semana(fecha_obj)))
     else:
         if estado == 'todos' or estado == 'pendiente':
              query = query.filter(Turno.estado == 'pendiente', Turno.fecha_hora >= datetime.datetime.now())
@@ -96,7 +82,8 @@ def horarios():
         db.session.add(config_obj)
         db.session.commit()
     config_json = json.dumps(config_obj.to_dict())
-    horarios_db = HorarioDisponible.query.filter_by(doctor_id=doctor_id).all()
+    horarios_db = HorarioDisponible.query.filter_by(doctor_id=doctor_id)\
+        .order_by(HorarioDisponible.hora_inicio, HorarioDisponible.id).all()
     bloques_por_dia = {i: [] for i in range(7)}
     for h in horarios_db:
         if 0 <= h.dia_semana <= 6:
@@ -180,33 +167,32 @@ def guardar_configuracion():
     config.duracion_turno = int(data.get('duracion_turno', 30))
     config.modalidad = data.get('modalidad', 'presencial')
     config.precio_consulta = float(data.get('precio_consulta', 0))
+    agenda.registrar_cambio_horario(config.doctor_id)
     db.session.commit()
+    agenda.invalidar_doctor(config.doctor_id)
+    reportes.invalidar()
     return jsonify({'success': True, 'message': 'Configuración guardada'})
 
 @doctor_bp.route('/api/guardar-horarios', methods=['POST'])
 def guardar_horarios():
     doctor_id = current_user.doctor_perfil.id
-    data = request.json
-    MAPA_DIAS_STR_INT = {'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5, 'domingo': 6}
+    data = request.json or {}
     try:
-        HorarioDisponible.query.filter_by(doctor_id=doctor_id).delete()
-        nuevos_horarios = []
-        for dia in data.get('horarios', []):
-            if dia.get('activo'):
-                dia_int = MAPA_DIAS_STR_INT.get(dia.get('codigo'))
-                if dia_int is None: continue
-                for bloque in dia.get('bloques', []):
-                    if not bloque.get('inicio') or not bloque.get('fin'):
-                        continue
-                    hora_inicio_obj = datetime.time.fromisoformat(bloque.get('inicio'))
-                    hora_fin_obj = datetime.time.fromisoformat(bloque.get('fin'))
-                    if hora_fin_obj <= hora_inicio_obj:
-                        continue 
-                    nuevo_bloque = HorarioDisponible(dia_semana=dia_int, hora_inicio=hora_inicio_obj, hora_fin=hora_fin_obj, doctor_id=doctor_id)
-                    nuevos_horarios.append(nuevo_bloque)
-        db.session.add_all(nuevos_horarios)
+        # Se guardan sólo las diferencias, con los bloques solapados o
+        # contiguos ya fusionados
+        semana = agenda.leer_semana(data.get('horarios', []))
+        dias = agenda.guardar_semana(doctor_id, semana)
         db.session.commit()
-        return jsonify({'success': True, 'message': 'Horarios guardados'})
+        if dias:
+            agenda.invalidar_doctor(doctor_id)
+        return jsonify({
+            'success': True,
+            'message': 'Horarios guardados' if dias else 'No hubo cambios',
+            'dias_modificados': [agenda.DIAS_SEMANA[dia] for dia in dias],
+        })
+    except agenda.HorarioInvalido as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
         db.session.rollback()
         print(f"Error al guardar horarios: {e}")
@@ -214,61 +200,139 @@ def guardar_horarios():
 
 @doctor_bp.route('/api/obtener-excepciones', methods=['GET'])
 def obtener_excepciones():
-    return jsonify({'excepciones': []}) 
+    """Excepciones del doctor y feriados generales que todavía no pasaron."""
+    lista = excepciones.listar(current_user.doctor_perfil.id)
+    return jsonify({'excepciones': [e.to_dict() for e in lista]})
 
 @doctor_bp.route('/api/guardar-excepciones', methods=['POST'])
 def guardar_excepciones():
-    return jsonify({'success': True, 'message': 'Excepciones no implementadas'})
+    doctor_id = current_user.doctor_perfil.id
+    data = request.json or {}
+    try:
+        excepciones.reemplazar(doctor_id, data.get('excepciones') or [])
+        agenda.registrar_cambio_horario(doctor_id)
+        db.session.commit()
+        excepciones.invalidar(doctor_id)
+        return jsonify({'success': True, 'message': 'Excepciones guardadas'})
+    except excepciones.ExcepcionInvalida as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error al guardar excepciones: {e}")
+        return jsonify({'success': False, 'message': 'Error al guardar excepciones'}), 500
 
 
 @doctor_bp.route('/api/horarios', methods=['GET'])
+@limiter.limit(lambda: current_app.config['LIMITE_CONSULTA_HORARIOS'], key_func=clave_usuario_o_ip)
 def obtener_horarios():
     try:
         doctor_id = request.args.get('doctor_id')
         fecha_str = request.args.get('fecha')
         
         if not doctor_id or not fecha_str:
-            return jsonify({'error': 'Faltan parámetros'}), 400
-        
-        fecha_obj = datetime.date.fromisoformat(fecha_str)
-        dia_semana = fecha_obj.weekday()
-        
-        horarios_base = HorarioDisponible.query.filter_by(doctor_id=doctor_id, dia_semana=dia_semana).all()
-        if not horarios_base:
-            return jsonify({'horarios': []}), 200
+            return jsonify({'success': False, 'message': 'Faltan parámetros'}), 400
         
-        config = ConfiguracionHorario.query.filter_by(doctor_id=doctor_id).first()
-        duracion_min = config.duracion_turno if config else 30
-        duracion_turno = datetime.timedelta(minutes=duracion_min)
-        
-        turnos_reservados = Turno.query.filter(
-            Turno.doctor_id == doctor_id, 
-            db.func.date(Turno.fecha_hora) == fecha_obj,
-            Turno.estado.in_(['pendiente', 'confirmado']) 
-        ).all()
-        horas_reservadas = {turno.fecha_hora.time() for turno in turnos_reservados}
-        
-        horarios_disponibles_final = []
+        try:
+            doctor_id = int(doctor_id)
+            fecha_obj = datetime.date.fromisoformat(fecha_str)
+        except ValueError:
+            return jsonify({'success': False, 'message': 'Parámetros inválidos'}), 400
+        # El ETag sale de las versiones de la agenda: si no hubo reservas ni
+        # cambios de horario se contesta 304 sin leer turnos. Los slots de
+        # hoy van venciendo, así que ese día el ETag cambia cada minuto.
+        version = agenda.versiones_agenda(doctor_id, fecha_obj)
         now = datetime.datetime.now()
-        
-        for bloque in horarios_base:
-            hora_actual = datetime.datetime.combine(fecha_obj, bloque.hora_inicio)
-            hora_fin_bloque = datetime.datetime.combine(fecha_obj, bloque.hora_fin)
-            
-            while hora_actual < hora_fin_bloque:
-                slot_reservado = hora_actual.time() in horas_reservadas
-                es_futuro = fecha_obj > now.date() or hora_actual > now
-                
-                if not slot_reservado and es_futuro:
-                    horarios_disponibles_final.append({'hora': hora_actual.strftime('%H:%M')})
-                
-                hora_actual += duracion_turno
-                
-        return jsonify({'horarios': horarios_disponibles_final}), 200
+        momento = now.strftime('%Y-%m-%dT%H:%M') if fecha_obj == now.date() else now.date().isoformat()
+        etag = versiones.etag(doctor_id, fecha_obj, version, momento)
+
+        def generar():
+            horarios = agenda.horarios_libres(doctor_id, fecha_obj, now=now, version=version)
+            return jsonify({'horarios': horarios})
+
+        config = current_app.config
+        return versiones.respuesta_condicional(
+            etag, generar,
+            cache_control='private, max-age=%d, stale-while-revalidate=%d' % (
+                config['HORARIOS_MAX_AGE'], config['HORARIOS_STALE']
+            )
+        )
     except Exception as e:
         print(f"Error en obtener_horarios: {e}")
         return jsonify({'error': 'Error interno del servidor'}), 500
     
+@doctor_bp.route('/api/horarios/eventos', methods=['GET'])
+def eventos_horarios():
+    """Stream SSE con los slots que se ocupan ('ocupado') o liberan ('liberado')
+    en la agenda de ``doctor_id`` para ``fecha``."""
+    try:
+        doctor_id = int(request.args.get('doctor_id', ''))
+        fecha = datetime.date.fromisoformat(request.args.get('fecha', ''))
+    except ValueError:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    try:
+        suscripcion = eventos_agenda.suscribir(doctor_id, fecha)
+    except eventos_agenda.SinLugar:
+        # El navegador no reintenta ante un 503: la página sigue funcionando
+        # con los GET de horarios de siempre
+        return jsonify({'error': 'Servicio de eventos ocupado'}), 503
+
+    config = current_app.config
+    # El stream no usa la base: se devuelve la conexión al pool ya mismo
+    db.session.close()
+
+    def generar():
+        with suscripcion:
+            yield 'retry: 3000\n\n'
+            limite = time.monotonic() + config['EVENTOS_DURACION_MAX']
+            while time.monotonic() < limite:
+                evento = suscripcion.esperar(config['EVENTOS_KEEPALIVE'])
+                if evento is None:
+                    yield ': ping\n\n'
+                else:
+                    yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+
+    respuesta = Response(stream_with_context(generar()), mimetype='text/event-stream')
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    # Si el cliente se va antes de empezar a leer, el generador ni arranca
+    respuesta.call_on_close(suscripcion.cerrar)
+    return respuesta
+
+@doctor_bp.route('/api/disponibilidad', methods=['GET'])
+@limiter.limit(lambda: current_app.config['LIMITE_CONSULTA_HORARIOS'], key_func=clave_usuario_o_ip)
+def obtener_disponibilidad():
+    """Slots libres y ocupación de un mes (?mes=YYYY-MM) o rango (?desde=&hasta=)."""
+    try:
+        doctor_id = request.args.get('doctor_id')
+        mes_str = request.args.get('mes')
+        desde_str = request.args.get('desde')
+        hasta_str = request.args.get('hasta')
+
+        if not doctor_id or not (mes_str or (desde_str and hasta_str)):
+            return jsonify({'error': 'Faltan parámetros'}), 400
+
+        if mes_str:
+            year, month = (int(x) for x in mes_str.split('-'))
+            desde = datetime.date(year, month, 1)
+            hasta = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+        else:
+            desde = datetime.date.fromisoformat(desde_str)
+            hasta = datetime.date.fromisoformat(hasta_str)
+
+        if hasta < desde:
+            return jsonify({'error': 'Rango de fechas inválido'}), 400
+        if (hasta - desde).days >= current_app.config['AGENDA_RANGO_MAX_DIAS']:
+            return jsonify({'error': 'El rango de fechas es demasiado grande'}), 400
+
+        dias = agenda.disponibilidad_rango(int(doctor_id), desde, hasta)
+        return jsonify({'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'dias': dias}), 200
+    except ValueError:
+        return jsonify({'error': 'Parámetros inválidos'}), 400
+    except Exception as e:
+        print(f"Error en obtener_disponibilidad: {e}")
+        return jsonify({'error': 'Error interno del servidor'}), 500
+
 @doctor_bp.route('/turno/<int:turno_id>/completar', methods=['POST'])
 @login_required
 def completar_turno(turno_id):
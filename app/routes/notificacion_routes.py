@@ -1,43 +1,60 @@
-from app import Blueprint, jsonify, request, db
-import importlib.util, os, sys
-
-noti_bp = Blueprint('notificaciones', __name__)
-
-def _load_models():
-    base = os.path.join(os.getcwd(), 'flask', 'models')
-    models = {}
-    for name in ('user', 'paciente'):
-        mod_name = f'local_models.{name}'
-        if mod_name in sys.modules:
-            mod = sys.modules[mod_name]
-        else:
-            path = os.path.join(base, f'{name}.py')
-            spec = importlib.util.spec_from_file_location(mod_name, path)
-            mod = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(mod)  # type: ignore
-            sys.modules[mod_name] = mod
-        models[name] = mod
-    return models.get('user'), models.get('paciente')
+from flask import Blueprint, jsonify, request
+from flask_login import login_required, current_user
 
+from app.services import notificaciones
+from app.services.paginacion import por_pagina_desde_request, CursorInvalido
+from app import db
 
-@noti_bp.route('/', methods=['GET'])
-def listar_notificaciones():
-    user_id = request.args.get('user_id') or request.args.get('paciente_id')
-    if not user_id:
-        return jsonify([{'id': 1, 'title': 'Bienvenido', 'read': False}])
-    return jsonify([])
+noti_bp = Blueprint('notificaciones', __name__, url_prefix='/notificaciones')
 
 
-@noti_bp.route('/create', methods=['POST'])
-def crear_notificacion():
-    data = request.get_json() or {}
-    return jsonify({'ok': True, 'notificacion': {'title': data.get('title'), 'body': data.get('body')}})
+# --- Seguridad: cada usuario ve sólo sus notificaciones ---
+@noti_bp.before_request
+@login_required
+def proteger_notificaciones():
+    pass
 
 
-@noti_bp.route('/mark-read', methods=['POST'])
-def marcar_leida():
-    data = request.get_json() or {}
-    noti_id = data.get('id')
-    if not noti_id:
-        return jsonify({'ok': False, 'msg': 'id required'}), 400
-    return jsonify({'ok': True, 'id': noti_id})
+@noti_bp.route('/', methods=['GET'])
+def listar_notificaciones():
+    """Notificaciones del usuario, más nuevas primero (?no_leidas=1, ?despues=, ?antes=)."""
+    try:
+        pagina = notificaciones.listar(
+            current_user.id,
+            solo_no_leidas=request.args.get('no_leidas') == '1',
+            despues=request.args.get('despues') or None,
+            antes=request.args.get('antes') or None,
+            por_pagina=por_pagina_desde_request()
+        )
+    except CursorInvalido:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    return jsonify({
+        'items': [n.to_dict() for n in pagina],
+        'siguiente': pagina.siguiente,
+        'anterior': pagina.anterior,
+        'no_leidas': notificaciones.contar_no_leidas(current_user.id),
+    })
+
+
+@noti_bp.route('/no-leidas', methods=['GET'])
+def contar_no_leidas():
+    return jsonify({'no_leidas': notificaciones.contar_no_leidas(current_user.id)})
+
+
+@noti_bp.route('/marcar-leidas', methods=['POST'])
+def marcar_leidas():
+    """Marca como leídas las notificaciones de ``ids`` o, con ``todas``, todas."""
+    data = request.get_json(silent=True) or {}
+    if data.get('todas'):
+        ids = None
+    else:
+        ids = data.get('ids')
+        if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+            return jsonify({'success': False, 'message': 'Se esperaba una lista de ids'}), 400
+    marcadas = notificaciones.marcar_leidas(current_user.id, ids)
+    db.session.commit()
+    return jsonify({
+        'success': True,
+        'marcadas': marcadas,
+        'no_leidas': notificaciones.contar_no_leidas(current_user.id),
+    })
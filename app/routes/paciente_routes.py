@@ -1,14 +1,14 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app
 from flask_login import login_required, current_user
 from sqlalchemy.orm import joinedload
-from sqlalchemy import distinct
 import datetime
 
 from app.models.user import User
 from app.models.doctor import Doctor
 from app.models.turno import Turno
-from app.models.paciente import Paciente
-from app.models.horario_disponible import HorarioDisponible
+from app.services import agenda, excepciones
+from app.services.limites import clave_usuario_o_ip
+from app.extensions import limiter
 from app import db
 
 
@@ -36,7 +36,8 @@ def dashboard():
     show_videocall_button = False
     if paciente:
         proximos_turnos = Turno.query.options(
-            joinedload(Turno.doctor).joinedload(Doctor.user)
+            joinedload(Turno.doctor).joinedload(Doctor.user),
+            joinedload(Turno.doctor).joinedload(Doctor.especialidad)
         ).filter(
             Turno.paciente_id == paciente.id,
             Turno.fecha_hora >= datetime.datetime.now(),
@@ -106,32 +107,41 @@ def cambiar_password():
 def mis_turnos():
     paciente_id = current_user.paciente_perfil.id
     
-    # Cargar turnos con la info del doctor y el user del doctor
+    # Cargar turnos con la info del doctor, su user y su especialidad
     turnos = Turno.query.options(
-        joinedload(Turno.doctor).joinedload(Doctor.user)
+        joinedload(Turno.doctor).joinedload(Doctor.user),
+        joinedload(Turno.doctor).joinedload(Doctor.especialidad)
     ).filter(
         Turno.paciente_id == paciente_id
     ).order_by(Turno.fecha_hora.desc()).all() # Ordenar del más nuevo al más viejo
 
-    # Separar en próximos y pasados
-    now = datetime.datetime.now()
+    turnos_proximos, turnos_pasados = separar_turnos(turnos, datetime.datetime.now())
+
+    return render_template('paciente/mis-turnos.html', 
+                           turnos_proximos=turnos_proximos,
+                           turnos_pasados=turnos_pasados)
+
+
+def separar_turnos(turnos, now):
+    """(próximos, pasados) de ``turnos`` ordenados del más nuevo al más viejo."""
     turnos_proximos = [t for t in turnos if t.fecha_hora >= now and t.estado == 'pendiente']
     turnos_pasados = [t for t in turnos if t.fecha_hora < now or t.estado != 'pendiente']
     
     # Re-ordenar los próximos para que el más cercano esté primero
     turnos_proximos.reverse()
-
-    return render_template('paciente/mis-turnos.html', 
-                           turnos_proximos=turnos_proximos,
-                           turnos_pasados=turnos_pasados)
+    return turnos_proximos, turnos_pasados
 
 
 # --- Reservar Turno (GET) ---
 @paciente_bp.route('/reservar-turno')
 @login_required
 def reservar_turno():
-    
-    hoy = datetime.date.today()
+    doctores = doctores_para_reservar(datetime.date.today())
+    return render_template('paciente/reservar-turno.html', doctores=doctores)
+
+
+def doctores_para_reservar(hoy):
+    """Doctores con modalidad, precio y días disponibles del mes de ``hoy``."""
     current_year = hoy.year
     current_month = hoy.month
 
@@ -140,6 +150,21 @@ def reservar_turno():
         joinedload(Doctor.especialidad),
         joinedload(Doctor.configuracion),
     ).all()
+
+    # Una sola consulta para los días de trabajo de todos los doctores y
+    # otra para las excepciones del mes (los que no tienen no aparecen)
+    dias_semana_por_doctor = agenda.dias_semana_por_doctor()
+    inicio_mes = datetime.datetime(current_year, current_month, 1)
+    fin_mes = datetime.datetime(current_year + current_month // 12, current_month % 12 + 1, 1)
+    excepciones_por_doctor = excepciones.intervalos_por_doctor(
+        [doctor.id for doctor in doctores], inicio_mes, fin_mes
+    )
+    # Sólo hace falta la plantilla de los que tienen excepciones (con un
+    # feriado, todos): se cargan juntas y no una consulta por doctor
+    con_excepciones = [doctor_id for doctor_id, intervalos in excepciones_por_doctor.items() if intervalos]
+    plantillas = {}
+    if con_excepciones:
+        plantillas = agenda.obtener_plantillas(con_excepciones, agenda.versiones_horario(con_excepciones))
     
     doctores_con_disponibilidad = []
     for doctor in doctores:
@@ -151,23 +176,28 @@ def reservar_turno():
             modalidad_final = 'presencial' 
             precio_final = 0.0
         
-        dias_disponibles = obtener_dias_disponibles_del_mes(
-            doctor.id, 
-            current_year, 
-            current_month
+        dias_disponibles = agenda.dias_disponibles_del_mes(
+            doctor.id,
+            dias_semana_por_doctor.get(doctor.id, frozenset()),
+            current_year,
+            current_month,
+            hoy,
+            intervalos=excepciones_por_doctor.get(doctor.id, excepciones.Intervalos()),
+            plantilla=plantillas.get(doctor.id)
         )
         
         doctor.modalidad = modalidad_final
         doctor.precio_consulta = precio_final
-        doctor.dias_disponibles_mes_actual = dias_disponibles 
+        doctor.dias_disponibles_mes_actual = list(dias_disponibles)
         
         doctores_con_disponibilidad.append(doctor)
     
-    return render_template('paciente/reservar-turno.html', doctores=doctores_con_disponibilidad)
+    return doctores_con_disponibilidad
 
 # --- Confirmar Turno (POST API) ---
 @paciente_bp.route('/confirmar-turno', methods=['POST'])
 @login_required
+@limiter.limit(lambda: current_app.config['LIMITE_RESERVA'], key_func=clave_usuario_o_ip)
 def confirmar_turno():
     try:
         data = request.json
@@ -182,6 +212,11 @@ def confirmar_turno():
         hora_str = data.get('hora')
         fecha_hora_str = f"{fecha_str} {hora_str}"
         fecha_hora_obj = datetime.datetime.strptime(fecha_hora_str, '%Y-%m-%d %H:%M')
+
+        # La pantalla ya no ofrece esos slots, pero la reserva puede venir
+        # de una pantalla vieja o armada a mano
+        if agenda.bloqueado_por_excepcion(int(doctor_id_final), fecha_hora_obj):
+            return jsonify({'success': False, 'message': 'El doctor no atiende en ese horario.'}), 409
         
         nuevo_turno = Turno(
             fecha_hora=fecha_hora_obj,
@@ -218,41 +253,3 @@ def cancelar_turno(turno_id):
     
     flash('Turno cancelado exitosamente.', 'success')
     return redirect(url_for('paciente.mis_turnos'))
-
-def obtener_dias_disponibles_del_mes(doctor_id, year, month):
-    #Calcula qué días del mes tienen al menos un horario base configurado.
-    
-    dias_semana_con_horario = db.session.query(
-        distinct(HorarioDisponible.dia_semana)
-    ).filter(
-        HorarioDisponible.doctor_id == doctor_id
-    ).all()
-    
-    dias_semana_set = {d[0] for d in dias_semana_con_horario} 
-
-    if not dias_semana_set:
-        return []
-    
-    dias_disponibles = set()
-    
-    try:
-        inicio_mes = datetime.date(year, month, 1)
-        if month == 12:
-            fin_rango = datetime.date(year + 1, 1, 1)
-        else:
-            fin_rango = datetime.date(year, month + 1, 1)
-    except ValueError:
-        return []
-
-    fecha_actual = inicio_mes
-    hoy = datetime.date.today()
-    
-    while fecha_actual < fin_rango:
-        # Solo incluimos días futuros o el día actual
-        if fecha_actual >= hoy: 
-            if fecha_actual.weekday() in dias_semana_set:
-                dias_disponibles.add(fecha_actual.day)
-        
-        fecha_actual += datetime.timedelta(days=1)
-        
-    return sorted(list(dias_disponibles))
@@ -0,0 +1,543 @@
+import bisect
+import calendar
+import datetime
+import functools
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, or_, select
+
+from app.extensions import db
+from app.models.configuracion_horario import ConfiguracionHorario
+from app.models.horario_disponible import HorarioDisponible
+from app.models.turno import Turno
+from app.models.version_agenda import VersionAgenda
+from app.services import cambios_turnos, excepciones, versiones
+from app.services.cache import TTLCache
+from app.services.fechas import entre, rango_dias
+
+# Estados que ocupan un slot en la agenda del doctor
+ESTADOS_OCUPADOS = ('pendiente', 'confirmado')
+DURACION_DEFAULT = 30
+# Códigos de los días como los usa la pantalla de horarios (índice = weekday)
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+
+_plantillas = TTLCache(ttl=300)
+_ocupacion = TTLCache(ttl=5, max_entradas=50000)
+
+
+class PlantillaDia:
+    """Slots de un día de la semana, en el orden en que los devuelve la API.
+
+    Cada slot ocupa un bit: el bit ``i`` corresponde a ``minutos[i]``. Si
+    dos bloques se solapan el mismo minuto aparece dos veces, igual que
+    antes, y ``indice`` guarda la máscara con todos sus bits.
+    """
+
+    __slots__ = ('minutos', 'etiquetas', 'indice', 'mascara_total', '_orden', '_prefijos')
+
+    def __init__(self, minutos):
+        self.minutos = tuple(minutos)
+        self.etiquetas = tuple('%02d:%02d' % divmod(m, 60) for m in self.minutos)
+        self.mascara_total = (1 << len(self.minutos)) - 1
+
+        self.indice = {}
+        for i, m in enumerate(self.minutos):
+            self.indice[m] = self.indice.get(m, 0) | (1 << i)
+
+        # Máscaras acumuladas por minuto ascendente, para saber en O(log n)
+        # qué slots ya pasaron en el día de hoy.
+        self._orden = sorted(self.indice)
+        self._prefijos = []
+        acumulado = 0
+        for m in self._orden:
+            acumulado |= self.indice[m]
+            self._prefijos.append(acumulado)
+
+    def mascara_hasta(self, minuto):
+        """Bits de los slots que empiezan en ``minuto`` o antes."""
+        pos = bisect.bisect_right(self._orden, minuto)
+        return self._prefijos[pos - 1] if pos else 0
+
+    def mascara_entre(self, desde, hasta):
+        """Bits de los slots que empiezan entre ``desde`` y ``hasta`` inclusive."""
+        return self.mascara_hasta(hasta) & ~self.mascara_hasta(desde - 1)
+
+    def mascara_de(self, minutos):
+        mascara = 0
+        for m in minutos:
+            mascara |= self.indice.get(m, 0)
+        return mascara
+
+    def etiquetas_de(self, mascara):
+        return [self.etiquetas[i] for i in range(len(self.minutos)) if mascara >> i & 1]
+
+    def minutos_ordenados_de(self, mascara):
+        """Minutos (sin repetir y en orden) de los slots de ``mascara``."""
+        return [m for m in self._orden if self.indice[m] & mascara]
+
+    def primer_minuto_despues(self, minuto):
+        """Primer minuto con slot posterior a ``minuto``, o None."""
+        pos = bisect.bisect_right(self._orden, minuto)
+        return self._orden[pos] if pos < len(self._orden) else None
+
+
+class PlantillaSemanal:
+    """Agenda compilada de un doctor: una ``PlantillaDia`` por día con horario."""
+
+    __slots__ = ('doctor_id', 'duracion', 'dias')
+
+    def __init__(self, doctor_id, duracion, dias):
+        self.doctor_id = doctor_id
+        self.duracion = duracion
+        self.dias = dias
+
+    def huella(self):
+        """Valor que cambia si cambian los slots (para ETags)."""
+        return tuple(sorted((dia, p.minutos) for dia, p in self.dias.items()))
+
+
+def compilar_plantilla(doctor_id, bloques, duracion):
+    """Arma la plantilla a partir de los ``HorarioDisponible`` del doctor."""
+    if not duracion or duracion <= 0:
+        duracion = DURACION_DEFAULT
+    minutos_por_dia = {}
+    for bloque in bloques:
+        inicio = bloque.hora_inicio.hour * 60 + bloque.hora_inicio.minute
+        fin = bloque.hora_fin.hour * 60 + bloque.hora_fin.minute
+        minutos = minutos_por_dia.setdefault(bloque.dia_semana, [])
+        minutos.extend(range(inicio, fin, duracion))
+    dias = {dia: PlantillaDia(minutos) for dia, minutos in minutos_por_dia.items() if minutos}
+    return PlantillaSemanal(doctor_id, duracion, dias)
+
+
+def obtener_plantilla(doctor_id, version=None):
+    """Plantilla del doctor; con ``version`` se descarta la cacheada si es de otra versión."""
+    cacheada = _plantillas.get(doctor_id)
+    if cacheada is not None and (version is None or cacheada[0] == version):
+        return cacheada[1]
+    bloques = HorarioDisponible.query.filter_by(doctor_id=doctor_id)\
+        .order_by(HorarioDisponible.hora_inicio, HorarioDisponible.id).all()
+    duracion = db.session.query(ConfiguracionHorario.duracion_turno).filter_by(doctor_id=doctor_id).scalar()
+    plantilla = compilar_plantilla(doctor_id, bloques, duracion)
+    _plantillas.set(doctor_id, (version, plantilla), ttl=current_app.config['AGENDA_PLANTILLA_TTL'])
+    return plantilla
+
+
+def obtener_plantillas(doctor_ids, versiones=None):
+    """{doctor_id: plantilla} de varios doctores; las que no están en cache se
+    cargan juntas con dos consultas. ``versiones`` es el resultado de
+    :func:`versiones_horario`: las cacheadas de otra versión se recargan."""
+    plantillas = {}
+    faltantes = []
+    for doctor_id in doctor_ids:
+        cacheada = _plantillas.get(doctor_id)
+        if cacheada is not None and (versiones is None or cacheada[0] == versiones.get(doctor_id, 0)):
+            plantillas[doctor_id] = cacheada[1]
+        else:
+            faltantes.append(doctor_id)
+    if faltantes:
+        bloques = {}
+        for bloque in HorarioDisponible.query.filter(HorarioDisponible.doctor_id.in_(faltantes))\
+                .order_by(HorarioDisponible.hora_inicio, HorarioDisponible.id):
+            bloques.setdefault(bloque.doctor_id, []).append(bloque)
+        duraciones = dict(db.session.query(ConfiguracionHorario.doctor_id, ConfiguracionHorario.duracion_turno)
+                          .filter(ConfiguracionHorario.doctor_id.in_(faltantes)).all())
+        ttl = current_app.config['AGENDA_PLANTILLA_TTL']
+        for doctor_id in faltantes:
+            plantilla = compilar_plantilla(doctor_id, bloques.get(doctor_id, []), duraciones.get(doctor_id))
+            version = versiones.get(doctor_id, 0) if versiones is not None else None
+            _plantillas.set(doctor_id, (version, plantilla), ttl=ttl)
+            plantillas[doctor_id] = plantilla
+    return plantillas
+
+
+def minutos_reservados_rango(doctor_id, desde, hasta):
+    """Minutos ocupados por día entre ``desde`` y ``hasta`` (inclusive), en una sola consulta."""
+    filas = db.session.query(Turno.fecha_hora).filter(
+        Turno.doctor_id == doctor_id,
+        entre(Turno.fecha_hora, rango_dias(desde, hasta)),
+        Turno.estado.in_(ESTADOS_OCUPADOS)
+    ).all()
+    reservados = {}
+    for (f,) in filas:
+        # Un turno sólo coincide con un slot si cae justo en el minuto
+        if f.second == 0 and f.microsecond == 0:
+            reservados.setdefault(f.date(), set()).add(f.hour * 60 + f.minute)
+    return reservados
+
+
+def minutos_reservados(doctor_id, fecha):
+    """Minutos del día con un turno que ocupa el slot."""
+    return minutos_reservados_rango(doctor_id, fecha, fecha).get(fecha, set())
+
+
+def obtener_ocupacion(doctor_id, fecha, plantilla_dia, version=None):
+    """Bitmap de slots reservados del día (bit en 1 = ocupado).
+
+    Se cachean los minutos reservados, no el bitmap: los bits son
+    posiciones de una ``PlantillaDia`` en particular y otro worker puede
+    haber cambiado el horario. Con ``version`` (la del día, ver
+    :func:`versiones_agenda`) los minutos cacheados sólo se usan si son de
+    esa versión, aunque los haya cambiado otro worker.
+    """
+    clave = (doctor_id, fecha)
+    cacheada = _ocupacion.get(clave)
+    if cacheada is not None and (version is None or cacheada[0] == version):
+        minutos = cacheada[1]
+    else:
+        minutos = frozenset(minutos_reservados(doctor_id, fecha))
+        _ocupacion.set(clave, (version, minutos), ttl=current_app.config['AGENDA_OCUPACION_TTL'])
+    return plantilla_dia.mascara_de(minutos)
+
+
+def mascara_pasada(plantilla_dia, fecha, now):
+    """Bits de los slots que ya no se pueden reservar."""
+    if fecha > now.date():
+        return 0
+    if fecha < now.date():
+        return plantilla_dia.mascara_total
+    # Hoy: sólo sirven los slots estrictamente posteriores a ``now``
+    segundos = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+    return plantilla_dia.mascara_hasta(int(segundos // 60))
+
+
+def mascara_excepciones(plantilla, plantilla_dia, intervalos, fecha):
+    """Bits de los slots que se superponen con alguna excepción del día."""
+    mascara = 0
+    for desde, hasta in intervalos.minutos_del_dia(fecha):
+        # Un slot [m, m + duración) choca si m > desde - duración y m < hasta
+        mascara |= plantilla_dia.mascara_entre(desde - plantilla.duracion + 1, hasta - 1)
+    return mascara
+
+
+def horarios_libres(doctor_id, fecha, now=None, version=None):
+    """Slots libres de un doctor para una fecha, en formato de la API.
+
+    ``version`` es el par de :func:`versiones_agenda` si ya se leyó (para
+    el ETag): garantiza que la respuesta no sale de un cache más viejo.
+    """
+    version_horario, version_dia = version or (None, None)
+    plantilla = obtener_plantilla(doctor_id, version_horario)
+    plantilla_dia = plantilla.dias.get(fecha.weekday())
+    if plantilla_dia is None:
+        return []
+    now = now or datetime.datetime.now()
+    bloqueados = mascara_pasada(plantilla_dia, fecha, now)
+    intervalos = excepciones.intervalos_de(doctor_id, version_horario)
+    if intervalos:
+        bloqueados |= mascara_excepciones(plantilla, plantilla_dia, intervalos, fecha)
+    if bloqueados == plantilla_dia.mascara_total:
+        return []
+    ocupados = obtener_ocupacion(doctor_id, fecha, plantilla_dia, version_dia)
+    libres = plantilla_dia.mascara_total & ~(bloqueados | ocupados)
+    return [{'hora': hora} for hora in plantilla_dia.etiquetas_de(libres)]
+
+
+def disponibilidad_rango(doctor_id, desde, hasta, now=None, version=None):
+    """Slots libres y ocupación de cada día con horario entre ``desde`` y ``hasta``.
+
+    Resuelve todo el rango con una única consulta a ``turnos`` y de paso deja
+    cargadas las ocupaciones de cada día. ``version`` es la de
+    :func:`version_horario` si ya se leyó; si no, se lee acá para no usar
+    una plantilla o excepciones cacheadas de antes de un cambio hecho en
+    otro proceso (un feriado cargado desde la consola, por ejemplo).
+    """
+    if version is None:
+        version = version_horario(doctor_id)
+    plantilla = obtener_plantilla(doctor_id, version)
+    if not plantilla.dias:
+        return {}
+    now = now or datetime.datetime.now()
+    reservados = minutos_reservados_rango(doctor_id, desde, hasta)
+    intervalos = excepciones.intervalos_de(doctor_id, version)
+    ttl = current_app.config['AGENDA_OCUPACION_TTL']
+
+    dias = {}
+    fecha = desde
+    while fecha <= hasta:
+        plantilla_dia = plantilla.dias.get(fecha.weekday())
+        if plantilla_dia is not None:
+            minutos = frozenset(reservados.get(fecha, ()))
+            _ocupacion.set((doctor_id, fecha), (None, minutos), ttl=ttl)
+            ocupados = plantilla_dia.mascara_de(minutos)
+            bloqueados = mascara_pasada(plantilla_dia, fecha, now)
+            if intervalos:
+                bloqueados |= mascara_excepciones(plantilla, plantilla_dia, intervalos, fecha)
+            libres = plantilla_dia.mascara_total & ~(bloqueados | ocupados)
+            horarios = plantilla_dia.etiquetas_de(libres)
+            dias[fecha.isoformat()] = {
+                'horarios': [{'hora': hora} for hora in horarios],
+                'total': len(plantilla_dia.minutos),
+                'ocupados': bin(ocupados).count('1'),
+                'libres': len(horarios),
+            }
+        fecha += datetime.timedelta(days=1)
+    return dias
+
+
+# --- Días disponibles del mes (calendario de reserva) ---
+
+def dias_semana_por_doctor(doctor_ids=None):
+    """Días de la semana con horario de cada doctor, con una sola consulta agrupada."""
+    query = db.session.query(
+        HorarioDisponible.doctor_id, HorarioDisponible.dia_semana
+    ).group_by(HorarioDisponible.doctor_id, HorarioDisponible.dia_semana)
+    if doctor_ids is not None:
+        query = query.filter(HorarioDisponible.doctor_id.in_(doctor_ids))
+    dias = {}
+    for doctor_id, dia_semana in query.all():
+        dias.setdefault(doctor_id, set()).add(dia_semana)
+    return {doctor_id: frozenset(d) for doctor_id, d in dias.items()}
+
+
+@functools.lru_cache(maxsize=512)
+def dias_del_mes(dias_semana, year, month, hoy):
+    """Números de día del mes (desde ``hoy``) que caen en ``dias_semana``.
+
+    Depende sólo del patrón semanal, así que se calcula una vez por patrón
+    y lo comparten todos los doctores que trabajan los mismos días.
+    """
+    if not dias_semana:
+        return ()
+    primer_dia_semana, cantidad_dias = calendar.monthrange(year, month)
+    if (year, month) < (hoy.year, hoy.month):
+        return ()
+    desde = hoy.day if (year, month) == (hoy.year, hoy.month) else 1
+    return tuple(
+        dia for dia in range(desde, cantidad_dias + 1)
+        if (primer_dia_semana + dia - 1) % 7 in dias_semana
+    )
+
+
+def dias_disponibles_del_mes(doctor_id, dias_semana, year, month, hoy, intervalos=None, plantilla=None):
+    """``dias_del_mes`` sin los días que las excepciones bloquean por completo.
+
+    ``intervalos`` y ``plantilla`` permiten pasar lo ya cargado (por ejemplo,
+    para todos los doctores con :func:`excepciones.intervalos_por_doctor` y
+    :func:`obtener_plantillas`); un Intervalos vacío evita cualquier consulta.
+    """
+    dias = dias_del_mes(dias_semana, year, month, hoy)
+    version = None
+    if intervalos is None:
+        version = version_horario(doctor_id)
+        intervalos = excepciones.intervalos_de(doctor_id, version)
+    if not dias or not intervalos:
+        return dias
+    if plantilla is None:
+        plantilla = obtener_plantilla(doctor_id, version)
+    libres = []
+    for dia in dias:
+        fecha = datetime.date(year, month, dia)
+        plantilla_dia = plantilla.dias.get(fecha.weekday())
+        if plantilla_dia is None:
+            continue
+        if mascara_excepciones(plantilla, plantilla_dia, intervalos, fecha) != plantilla_dia.mascara_total:
+            libres.append(dia)
+    return tuple(libres)
+
+
+# --- Guardado del horario semanal ---
+
+class HorarioInvalido(ValueError):
+    pass
+
+
+def fusionar_bloques(bloques):
+    """Bloques (inicio, fin) ordenados, con los solapados o contiguos unidos."""
+    fusionados = []
+    for inicio, fin in sorted(bloques):
+        if fin <= inicio:
+            continue
+        if fusionados and inicio <= fusionados[-1][1]:
+            if fin > fusionados[-1][1]:
+                fusionados[-1] = (fusionados[-1][0], fin)
+        else:
+            fusionados.append((inicio, fin))
+    return fusionados
+
+
+def leer_semana(dias):
+    """{weekday: [(inicio, fin)]} normalizado desde la lista de la pantalla de
+    horarios (codigo, activo, bloques con inicio/fin en HH:MM).
+
+    Los días inactivos o desconocidos y los bloques vacíos se ignoran.
+    """
+    semana = {}
+    for dia in dias or []:
+        if not dia.get('activo') or dia.get('codigo') not in DIAS_SEMANA:
+            continue
+        bloques = []
+        for bloque in dia.get('bloques') or []:
+            if not bloque.get('inicio') or not bloque.get('fin'):
+                continue
+            try:
+                bloques.append((datetime.time.fromisoformat(bloque['inicio']),
+                                datetime.time.fromisoformat(bloque['fin'])))
+            except (TypeError, ValueError) as e:
+                raise HorarioInvalido(f"Hora inválida en {dia['codigo']}.") from e
+        fusionados = fusionar_bloques(bloques)
+        if fusionados:
+            semana.setdefault(DIAS_SEMANA.index(dia['codigo']), []).extend(fusionados)
+    return semana
+
+
+def guardar_semana(doctor_id, semana):
+    """Deja en la base exactamente los bloques de ``semana`` aplicando sólo
+    las diferencias: un DELETE y un INSERT masivos como mucho.
+
+    Devuelve los weekdays que cambiaron. Si hay cambios registra la nueva
+    versión del horario; hay que hacer commit.
+    """
+    deseados = {(dia, inicio, fin) for dia, bloques in semana.items() for inicio, fin in bloques}
+    sobrantes = []
+    actuales = set()
+    filas = db.session.execute(
+        select(HorarioDisponible.id, HorarioDisponible.dia_semana,
+               HorarioDisponible.hora_inicio, HorarioDisponible.hora_fin)
+        .where(HorarioDisponible.doctor_id == doctor_id)
+    )
+    for id_, dia, inicio, fin in filas:
+        clave = (dia, inicio, fin)
+        # Los repetidos (o los que quedaron sin fusionar) también sobran
+        if clave in deseados and clave not in actuales:
+            actuales.add(clave)
+        else:
+            sobrantes.append((id_, dia))
+    nuevos = deseados - actuales
+
+    if sobrantes:
+        db.session.execute(delete(HorarioDisponible).where(HorarioDisponible.id.in_([i for i, _ in sobrantes])),
+                           execution_options={'synchronize_session': False})
+    if nuevos:
+        db.session.execute(insert(HorarioDisponible), [
+            {'doctor_id': doctor_id, 'dia_semana': dia, 'hora_inicio': inicio, 'hora_fin': fin}
+            for dia, inicio, fin in sorted(nuevos)
+        ])
+    dias = sorted({dia for _, dia in sobrantes} | {dia for dia, _, _ in nuevos})
+    if dias:
+        registrar_cambio_horario(doctor_id)
+    return dias
+
+
+# --- Versiones (ETags de los horarios) ---
+#
+# versiones_agenda lleva un contador por (doctor, día) que se incrementa en
+# la misma transacción que cada reserva, cancelación o cambio de estado, y
+# uno por doctor (fecha VersionAgenda.HORARIO) para su horario semanal y sus
+# excepciones. Los feriados incrementan el de VersionAgenda.TODOS. Con eso
+# se puede contestar un 304 sin leer turnos ni horarios.
+
+def versiones_agenda(doctor_id, fecha):
+    """(versión del horario, versión del día) del doctor, en una sola consulta.
+
+    La del horario incluye la de los feriados: sólo importa que cambie.
+    """
+    filas = db.session.execute(
+        select(VersionAgenda.doctor_id, VersionAgenda.fecha, VersionAgenda.version).where(
+            VersionAgenda.doctor_id.in_([doctor_id, VersionAgenda.TODOS]),
+            or_(VersionAgenda.fecha == VersionAgenda.HORARIO, VersionAgenda.fecha == fecha)
+        )
+    ).all()
+    horario = sum(v for _, f, v in filas if f == VersionAgenda.HORARIO)
+    dia = sum(v for d, f, v in filas if f == fecha and d == doctor_id)
+    return horario, dia
+
+
+def version_horario(doctor_id):
+    """Versión del horario y las excepciones del doctor, feriados incluidos
+    (la primera de :func:`versiones_agenda`, sin leer la del día)."""
+    return db.session.scalar(
+        select(func.coalesce(func.sum(VersionAgenda.version), 0)).where(
+            VersionAgenda.doctor_id.in_([doctor_id, VersionAgenda.TODOS]),
+            VersionAgenda.fecha == VersionAgenda.HORARIO
+        )
+    )
+
+
+def versiones_horario(doctor_ids):
+    """{doctor_id: versión del horario} de varios doctores en una sola
+    consulta, como :func:`version_horario`. Los que nunca cambiaron tienen
+    la de los feriados."""
+    filas = db.session.execute(
+        select(VersionAgenda.doctor_id, VersionAgenda.version).where(
+            VersionAgenda.doctor_id.in_(list(doctor_ids) + [VersionAgenda.TODOS]),
+            VersionAgenda.fecha == VersionAgenda.HORARIO
+        )
+    ).all()
+    propias = dict(filas)
+    feriados = propias.pop(VersionAgenda.TODOS, 0)
+    return {doctor_id: propias.get(doctor_id, 0) + feriados for doctor_id in doctor_ids}
+
+
+def bloqueado_por_excepcion(doctor_id, fecha_hora):
+    """True si el slot que empieza en ``fecha_hora`` choca con una excepción
+    del doctor o un feriado."""
+    duracion = db.session.query(ConfiguracionHorario.duracion_turno).filter_by(doctor_id=doctor_id).scalar()
+    if not duracion or duracion <= 0:
+        duracion = DURACION_DEFAULT
+    return excepciones.bloquea(doctor_id, fecha_hora, fecha_hora + datetime.timedelta(minutes=duracion))
+
+
+def version_rango(doctor_ids, desde, hasta):
+    """Versión conjunta de la agenda de ``doctor_ids`` entre ``desde`` y
+    ``hasta`` (inclusive), con sus horarios y los feriados.
+
+    Es la suma de los contadores: como sólo crecen, cualquier reserva o
+    cambio en esos días la cambia, y los de otros doctores o días no.
+    """
+    doctor_ids = list(doctor_ids) + [VersionAgenda.TODOS]
+    return db.session.scalar(
+        select(func.coalesce(func.sum(VersionAgenda.version), 0)).where(
+            VersionAgenda.doctor_id.in_(doctor_ids),
+            or_(VersionAgenda.fecha == VersionAgenda.HORARIO, VersionAgenda.fecha.between(desde, hasta))
+        )
+    )
+
+
+def _incrementar_versiones(conexion, agendas):
+    filas = [{'doctor_id': doctor_id, 'fecha': fecha, 'version': 1} for doctor_id, fecha in sorted(agendas)]
+    if filas:
+        versiones.sumar(conexion, VersionAgenda.__table__, filas, ['doctor_id', 'fecha'], ['version'])
+
+
+def registrar_cambio_horario(doctor_id):
+    """Incrementa la versión del horario del doctor en la transacción actual.
+
+    Llamar antes del commit que guarda HorarioDisponible, ConfiguracionHorario
+    o excepciones del doctor.
+    """
+    _incrementar_versiones(db.session.connection(), [(doctor_id, VersionAgenda.HORARIO)])
+
+
+def registrar_cambio_general():
+    """Como :func:`registrar_cambio_horario`, para cambios que afectan a todos
+    los doctores (feriados)."""
+    _incrementar_versiones(db.session.connection(), [(VersionAgenda.TODOS, VersionAgenda.HORARIO)])
+
+
+@cambios_turnos.en_transaccion
+def _versionar_agendas(conexion, cambios):
+    _incrementar_versiones(conexion, cambios_turnos.afectadas(cambios))
+
+
+# --- Invalidación ---
+
+def invalidar_doctor(doctor_id):
+    """Descarta la plantilla de un doctor (cambió su horario).
+
+    Las ocupaciones cacheadas son minutos reservados y no dependen de la
+    plantilla: siguen valiendo.
+    """
+    _plantillas.delete(doctor_id)
+
+
+def invalidar_ocupacion(doctor_id, fecha):
+    """Descarta el bitmap de un día (se reservó, canceló o completó un turno)."""
+    _ocupacion.delete((doctor_id, fecha))
+
+
+@cambios_turnos.al_confirmar
+def _invalidar_agendas(cambios):
+    # Reservas, cancelaciones y turnos completados liberan u ocupan slots
+    for doctor_id, fecha in cambios_turnos.afectadas(cambios):
+        invalidar_ocupacion(doctor_id, fecha)
@@ -0,0 +1,339 @@
+import datetime
+import gc
+import importlib.metadata
+import platform
+import statistics
+import time
+
+import sqlalchemy
+from flask import render_template
+from flask_login import login_user
+from sqlalchemy import insert, select
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models.configuracion_horario import ConfiguracionHorario
+from app.models.doctor import Doctor
+from app.models.excepcion import Excepcion
+from app.models.horario_disponible import HorarioDisponible
+from app.models.paciente import Paciente
+from app.models.turno import Turno
+from app.models.user import User
+from app.services import agenda, excepciones, sembrado
+
+# Micro-benchmarks de los caminos calientes (``flask benchmark``).
+#
+# A diferencia de ``flask carga`` no pasan por HTTP ni miden la base: cada
+# caso prepara sus datos una vez (consultas incluidas) y después se cronometra
+# sólo el cómputo en Python que hace el request con esos datos, con los
+# caches de la agenda ya calientes, como en un worker que lleva un rato
+# andando. Corren sobre una base SQLite en memoria sembrada siempre igual
+# (misma semilla y mismo "ahora"), así dos corridas son comparables.
+#
+# El "ahora" de los datos es una fecha fija en el futuro: el dataset no
+# depende del día en que se corre y las excepciones siguen vigentes para
+# excepciones.intervalos_de, que mira desde hoy en adelante.
+
+DATOS = {
+    'doctores': 300, 'pacientes': 3000, 'turnos': 60000,
+    'dias_pasados': 120, 'dias_futuros': 60, 'semilla': 2024,
+}
+AHORA = datetime.datetime(2040, 3, 14, 10, 17)
+PREFIJO = 'bench'
+# Turnos de la lista de "mis turnos" del paciente (un paciente con historia larga)
+TURNOS_PACIENTE = 2000
+# Días hacia adelante que se consultan en horarios_libres
+DIAS_HORARIOS = 14
+
+CONFIG = {
+    'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+    'SQLALCHEMY_ENGINE_OPTIONS': {},
+    'RATELIMIT_STORAGE_URI': 'memory://',
+    'RATELIMIT_ENABLED': False,
+    'SQL_INSTRUMENTACION': False,
+    'BCRYPT_LOG_ROUNDS': 4,
+    # Que ningún cache venza en medio de una medición
+    'AGENDA_PLANTILLA_TTL': 24 * 3600,
+    'AGENDA_OCUPACION_TTL': 24 * 3600,
+    'NOTIFICACIONES_TTL': 24 * 3600,
+}
+
+# Cuánto tiene que durar como mínimo cada ronda (segundos)
+DURACION_RONDA = 0.05
+
+_casos = {}
+
+
+def caso(nombre, descripcion):
+    """Registra ``preparar(datos)``, que devuelve la función a cronometrar."""
+    def registrar(preparar):
+        _casos[nombre] = (descripcion, preparar)
+        return preparar
+    return registrar
+
+
+def nombres():
+    return list(_casos)
+
+
+# --- Dataset ---
+
+class Datos:
+    """Lo que los casos necesitan del dataset sembrado."""
+
+    def __init__(self, app):
+        self.app = app
+        self.hoy = AHORA.date()
+        self.doctor_ids = db.session.scalars(select(Doctor.id).order_by(Doctor.id)).all()
+        self.paciente = db.session.scalar(
+            select(User).where(User.email == sembrado.email(PREFIJO, 'paciente', 0))
+        )
+
+
+def crear_app():
+    """App con la base en memoria, sembrada con DATOS."""
+    from app import create_app
+
+    app = create_app(CONFIG)
+    with app.app_context():
+        db.create_all()
+        sembrado.sembrar(
+            DATOS['doctores'], DATOS['pacientes'], DATOS['turnos'], prefijo=PREFIJO,
+            dias_pasados=DATOS['dias_pasados'], dias_futuros=DATOS['dias_futuros'],
+            semilla=DATOS['semilla'], ahora=AHORA,
+        )
+        _sembrar_excepciones()
+    return app
+
+
+def _sembrar_excepciones():
+    """Un feriado general y excepciones propias en uno de cada cinco doctores:
+    una semana de vacaciones y una mañana de congreso."""
+    doctor_ids = db.session.scalars(select(Doctor.id).order_by(Doctor.id)).all()
+    dia = datetime.datetime.combine(AHORA.date(), datetime.time())
+    filas = [{'doctor_id': None, 'inicio': dia + datetime.timedelta(days=10),
+              'fin': dia + datetime.timedelta(days=11), 'motivo': 'Feriado'}]
+    for i, doctor_id in enumerate(doctor_ids[::5]):
+        vacaciones = dia + datetime.timedelta(days=2 + i % 7)
+        congreso = dia + datetime.timedelta(days=1 + i % 5, hours=8)
+        filas.append({'doctor_id': doctor_id, 'inicio': vacaciones,
+                      'fin': vacaciones + datetime.timedelta(days=7), 'motivo': 'Vacaciones'})
+        filas.append({'doctor_id': doctor_id, 'inicio': congreso,
+                      'fin': congreso + datetime.timedelta(hours=4), 'motivo': 'Congreso'})
+    db.session.execute(insert(Excepcion), filas)
+    db.session.commit()
+
+
+# --- Casos ---
+
+@caso('agenda.compilar_plantilla', f"Plantilla semanal de los {DATOS['doctores']} doctores")
+def _compilar_plantilla(datos):
+    bloques = {}
+    for bloque in HorarioDisponible.query.order_by(HorarioDisponible.hora_inicio, HorarioDisponible.id):
+        bloques.setdefault(bloque.doctor_id, []).append(bloque)
+    duraciones = dict(db.session.query(ConfiguracionHorario.doctor_id, ConfiguracionHorario.duracion_turno).all())
+    agendas = [(d, bloques.get(d, []), duraciones.get(d)) for d in datos.doctor_ids]
+
+    def correr():
+        for doctor_id, bloques_doctor, duracion in agendas:
+            agenda.compilar_plantilla(doctor_id, bloques_doctor, duracion)
+    return correr
+
+
+@caso('agenda.horarios_libres', f'Slots libres (obtener_horarios) de cada doctor, hoy y {DIAS_HORARIOS - 1} días más')
+def _horarios_libres(datos):
+    consultas = [
+        (doctor_id, datos.hoy + datetime.timedelta(days=d))
+        for doctor_id in datos.doctor_ids for d in range(DIAS_HORARIOS)
+    ]
+    for doctor_id in datos.doctor_ids:
+        agenda.disponibilidad_rango(doctor_id, datos.hoy, consultas[-1][1], now=AHORA)
+
+    def correr():
+        for doctor_id, fecha in consultas:
+            agenda.horarios_libres(doctor_id, fecha, now=AHORA)
+    return correr
+
+
+@caso('agenda.dias_disponibles_del_mes', 'Días disponibles del mes de todos los doctores (reservar_turno)')
+def _dias_disponibles_del_mes(datos):
+    hoy = datos.hoy
+    inicio_mes = datetime.datetime(hoy.year, hoy.month, 1)
+    fin_mes = datetime.datetime(hoy.year + hoy.month // 12, hoy.month % 12 + 1, 1)
+    dias_semana = agenda.dias_semana_por_doctor()
+    intervalos = excepciones.intervalos_por_doctor(datos.doctor_ids, inicio_mes, fin_mes)
+    agenda.obtener_plantillas(datos.doctor_ids)
+    argumentos = [
+        (d, dias_semana.get(d, frozenset()), intervalos.get(d, excepciones.Intervalos()))
+        for d in datos.doctor_ids
+    ]
+
+    def correr():
+        for doctor_id, dias, intervalos_doctor in argumentos:
+            agenda.dias_disponibles_del_mes(doctor_id, dias, hoy.year, hoy.month, hoy, intervalos=intervalos_doctor)
+    return correr
+
+
+def _turnos_paciente():
+    # Los primeros del dataset (pasados y futuros) como si fueran todos del
+    # mismo paciente, del más nuevo al más viejo como los ordena mis_turnos
+    turnos = Turno.query.options(
+        joinedload(Turno.doctor).joinedload(Doctor.user),
+        joinedload(Turno.doctor).joinedload(Doctor.especialidad),
+    ).order_by(Turno.id).limit(TURNOS_PACIENTE).all()
+    return sorted(turnos, key=lambda t: t.fecha_hora, reverse=True)
+
+
+@caso('paciente.separar_turnos', f'Próximos y pasados de {TURNOS_PACIENTE} turnos (mis_turnos del paciente)')
+def _separar_turnos(datos):
+    from app.routes.paciente_routes import separar_turnos
+
+    turnos = _turnos_paciente()
+
+    def correr():
+        separar_turnos(turnos, AHORA)
+    return correr
+
+
+def _renderizar(datos, usuario, ruta, plantilla, **contexto):
+    """Función que renderiza ``plantilla`` dentro de un request de ``usuario``."""
+    def correr():
+        with datos.app.test_request_context(ruta):
+            login_user(usuario)
+            render_template(plantilla, **contexto)
+    return correr
+
+
+@caso('render.paciente_reservar_turno', f"paciente/reservar-turno.html con los {DATOS['doctores']} doctores")
+def _render_reservar_turno(datos):
+    from app.routes.paciente_routes import doctores_para_reservar
+
+    doctores = doctores_para_reservar(datos.hoy)
+    return _renderizar(datos, datos.paciente, '/paciente/reservar-turno', 'paciente/reservar-turno.html',
+                       doctores=doctores)
+
+
+@caso('render.paciente_mis_turnos', f'paciente/mis-turnos.html con {TURNOS_PACIENTE} turnos')
+def _render_mis_turnos_paciente(datos):
+    from app.routes.paciente_routes import separar_turnos
+
+    proximos, pasados = separar_turnos(_turnos_paciente(), AHORA)
+    return _renderizar(datos, datos.paciente, '/paciente/mis-turnos', 'paciente/mis-turnos.html',
+                       turnos_proximos=proximos, turnos_pasados=pasados)
+
+
+@caso('render.doctor_mis_turnos', 'doctor/mis-turnos.html con los turnos pendientes del doctor con más turnos')
+def _render_mis_turnos_doctor(datos):
+    doctor_id = db.session.scalar(
+        select(Turno.doctor_id).group_by(Turno.doctor_id)
+        .order_by(sqlalchemy.func.count().desc(), Turno.doctor_id).limit(1)
+    )
+    doctor = db.session.get(Doctor, doctor_id)
+    turnos = Turno.query.options(
+        joinedload(Turno.paciente).joinedload(Paciente.user)
+    ).filter(
+        Turno.doctor_id == doctor_id, Turno.estado == 'pendiente', Turno.fecha_hora >= AHORA
+    ).order_by(Turno.fecha_hora.asc()).all()
+    return _renderizar(datos, doctor.user, '/doctor/mis-turnos', 'doctor/mis-turnos.html', turnos=turnos)
+
+
+# --- Medición ---
+
+def medir(funcion, rondas):
+    """Tiempos por llamada (microsegundos) de ``funcion``.
+
+    Como timeit: se calibra cuántas llamadas entran en DURACION_RONDA, se
+    corren ``rondas`` rondas de esas llamadas con el GC apagado y se toma
+    la mejor (la menos perturbada por el resto de la máquina) y la mediana.
+    """
+    funcion()  # calentar caches y plantillas de Jinja
+    llamadas = 1
+    while True:
+        inicio = time.perf_counter()
+        for _ in range(llamadas):
+            funcion()
+        if time.perf_counter() - inicio >= DURACION_RONDA:
+            break
+        llamadas *= 2
+    tiempos = []
+    gc_activo = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(rondas):
+            inicio = time.perf_counter()
+            for _ in range(llamadas):
+                funcion()
+            tiempos.append((time.perf_counter() - inicio) / llamadas * 1e6)
+    finally:
+        if gc_activo:
+            gc.enable()
+    return {
+        'mejor_us': round(min(tiempos), 2),
+        'mediana_us': round(statistics.median(tiempos), 2),
+        'llamadas': llamadas,
+        'rondas': rondas,
+    }
+
+
+def entorno():
+    """Dónde se midió: las comparaciones sólo tienen sentido en la misma máquina."""
+    return {
+        'python': platform.python_version(),
+        'implementacion': platform.python_implementation(),
+        'maquina': platform.machine(),
+        'sistema': platform.system(),
+        'flask': importlib.metadata.version('flask'),
+        'sqlalchemy': sqlalchemy.__version__,
+    }
+
+
+def correr(app, filtro=None, rondas=7, avisar=None):
+    """Prepara y mide los casos cuyo nombre contiene ``filtro``.
+
+    Devuelve el dict que se guarda como JSON (y como baseline).
+    """
+    avisar = avisar or (lambda mensaje: None)
+    resultados = {}
+    with app.app_context():
+        datos = Datos(app)
+        for nombre, (descripcion, preparar) in _casos.items():
+            if filtro and filtro not in nombre:
+                continue
+            avisar(nombre)
+            medicion = medir(preparar(datos), rondas)
+            medicion['descripcion'] = descripcion
+            resultados[nombre] = medicion
+        db.session.remove()
+    return {
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'entorno': entorno(),
+        'datos': dict(DATOS, ahora=AHORA.isoformat()),
+        'casos': resultados,
+    }
+
+
+def comparar(actual, base, umbral):
+    """[{caso, base_us, actual_us, cambio, estado}] comparando la mejor ronda.
+
+    ``cambio`` es relativo (0.1 = 10 % más lento). El estado es 'regresion'
+    si empeoró más que ``umbral``, 'mejora' si mejoró más que ``umbral``,
+    'nuevo' si el caso no está en la base y 'igual' en los demás casos.
+    """
+    filas = []
+    casos_base = base.get('casos', {})
+    for nombre, medicion in actual['casos'].items():
+        anterior = casos_base.get(nombre)
+        if anterior is None:
+            filas.append({'caso': nombre, 'base_us': None, 'actual_us': medicion['mejor_us'],
+                          'cambio': None, 'estado': 'nuevo'})
+            continue
+        cambio = medicion['mejor_us'] / anterior['mejor_us'] - 1
+        if cambio > umbral:
+            estado = 'regresion'
+        elif cambio < -umbral:
+            estado = 'mejora'
+        else:
+            estado = 'igual'
+        filas.append({'caso': nombre, 'base_us': anterior['mejor_us'], 'actual_us': medicion['mejor_us'],
+                      'cambio': round(cambio, 4), 'estado': estado})
+    return filas
@@ -0,0 +1,63 @@
+import threading
+import time
+
+
+class TTLCache:
+    """Cache en memoria del proceso con expiración por entrada.
+
+    Cada worker de gunicorn tiene su propia instancia, por eso los TTL
+    tienen que ser cortos: acotan cuánto tarda un worker en enterarse de
+    un cambio hecho por otro.
+    """
+
+    def __init__(self, ttl=60, max_entradas=10000):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = {}
+        self._lock = threading.Lock()
+
+    def get(self, clave, default=None):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return default
+            vence, valor = entrada
+            if vence < time.monotonic():
+                del self._datos[clave]
+                return default
+            return valor
+
+    def set(self, clave, valor, ttl=None):
+        vence = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._datos.pop(clave, None)
+            self._datos[clave] = (vence, valor)
+            if len(self._datos) > self.max_entradas:
+                self._recortar()
+
+    def delete(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def descartar_si(self, predicado):
+        """Elimina todas las entradas cuya clave cumple el predicado."""
+        with self._lock:
+            for clave in [c for c in self._datos if predicado(c)]:
+                del self._datos[clave]
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+    def _recortar(self):
+        # Primero las vencidas; si no alcanza, las más viejas (orden de inserción)
+        ahora = time.monotonic()
+        for clave in [c for c, (vence, _) in self._datos.items() if vence < ahora]:
+            del self._datos[clave]
+        sobrantes = len(self._datos) - self.max_entradas
+        if sobrantes > 0:
+            for clave in list(self._datos)[:sobrantes]:
+                del self._datos[clave]
@@ -0,0 +1,154 @@
+from collections import namedtuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from app.models.turno import Turno
+
+# Seguimiento de los cambios de Turno por transacción.
+#
+# Cualquier alta, cambio de estado/fecha/doctor o baja de un Turno que pase
+# por el ORM genera un CambioTurno. Los servicios se suscriben de dos formas:
+#
+#   @en_transaccion  -> se llama en cada flush, con la conexión de la
+#                       transacción en curso (para escribir en la base).
+#   @al_confirmar    -> se llama después del commit (para caches, avisos).
+
+EstadoTurno = namedtuple('EstadoTurno', ['fecha_hora', 'doctor_id', 'estado', 'creado_en'])
+CAMPOS = EstadoTurno._fields
+
+_ANTERIORES = 'cambios_turnos_anteriores'
+_CONFIRMAR = 'cambios_turnos_pendientes'
+
+_suscriptores_transaccion = []
+_suscriptores_confirmar = []
+
+
+class CambioTurno:
+    """Un Turno creado (``anterior`` None), modificado o borrado (``nuevo`` None)."""
+
+    __slots__ = ('turno_id', 'paciente_id', 'anterior', 'nuevo')
+
+    def __init__(self, turno_id, paciente_id, anterior, nuevo):
+        self.turno_id = turno_id
+        self.paciente_id = paciente_id
+        self.anterior = anterior
+        self.nuevo = nuevo
+
+    @property
+    def doctor_id(self):
+        return (self.nuevo or self.anterior).doctor_id
+
+    def agendas_afectadas(self):
+        """Pares (doctor_id, fecha) cuya ocupación pudo cambiar."""
+        return {
+            (int(e.doctor_id), e.fecha_hora.date())
+            for e in (self.anterior, self.nuevo) if e is not None
+        }
+
+    def __repr__(self):
+        return f'<CambioTurno {self.turno_id}: {self.anterior} -> {self.nuevo}>'
+
+
+def en_transaccion(funcion):
+    """Registra ``funcion(conexion, cambios)`` para cada flush con cambios."""
+    _suscriptores_transaccion.append(funcion)
+    return funcion
+
+
+def al_confirmar(funcion):
+    """Registra ``funcion(cambios)`` para después de cada commit con cambios."""
+    _suscriptores_confirmar.append(funcion)
+    return funcion
+
+
+def afectadas(cambios):
+    """Unión de las agendas (doctor_id, fecha) tocadas por ``cambios``."""
+    agendas = set()
+    for cambio in cambios:
+        agendas |= cambio.agendas_afectadas()
+    return agendas
+
+
+# --- Listeners de la sesión ---
+
+def _estado_actual(turno):
+    return EstadoTurno(turno.fecha_hora, turno.doctor_id, turno.estado, turno.creado_en)
+
+
+def _estado_en_base(session, turno):
+    """Valores de la fila tal como están en la base antes del flush."""
+    insp = inspect(turno)
+    valores = []
+    for campo in CAMPOS:
+        historia = insp.attrs[campo].history
+        if historia.deleted:
+            valores.append(historia.deleted[0])
+        elif historia.unchanged:
+            valores.append(historia.unchanged[0])
+        else:
+            # El atributo estaba expirado cuando se modificó: se lee de la base
+            tabla = Turno.__table__
+            fila = session.connection().execute(
+                select(*(tabla.c[campo] for campo in CAMPOS)).where(tabla.c.id == turno.id)
+            ).one()
+            return EstadoTurno(*fila)
+    return EstadoTurno(*valores)
+
+
+def _antes_del_flush(session, flush_context, instances):
+    anteriores = session.info.setdefault(_ANTERIORES, {})
+    for obj in session.dirty:
+        if not isinstance(obj, Turno) or obj in anteriores:
+            continue
+        insp = inspect(obj)
+        if any(insp.attrs[c].history.has_changes() for c in CAMPOS):
+            anteriores[obj] = _estado_en_base(session, obj)
+    for obj in session.deleted:
+        if isinstance(obj, Turno) and obj not in anteriores:
+            anteriores[obj] = _estado_en_base(session, obj)
+
+
+def _despues_del_flush(session, flush_context):
+    anteriores = session.info.pop(_ANTERIORES, {})
+    cambios = []
+    for obj in session.new:
+        if isinstance(obj, Turno):
+            cambios.append(CambioTurno(obj.id, obj.paciente_id, None, _estado_actual(obj)))
+    for obj, anterior in anteriores.items():
+        if obj in session.deleted:
+            cambios.append(CambioTurno(obj.id, obj.paciente_id, anterior, None))
+        else:
+            nuevo = _estado_actual(obj)
+            if nuevo != anterior:
+                cambios.append(CambioTurno(obj.id, obj.paciente_id, anterior, nuevo))
+    if not cambios:
+        return
+
+    conexion = session.connection()
+    for funcion in _suscriptores_transaccion:
+        funcion(conexion, cambios)
+    session.info.setdefault(_CONFIRMAR, []).extend(cambios)
+
+
+def _despues_del_commit(session):
+    cambios = session.info.pop(_CONFIRMAR, None)
+    if not cambios:
+        return
+    for funcion in _suscriptores_confirmar:
+        funcion(cambios)
+
+
+def _despues_del_rollback(session, transaccion_anterior):
+    session.info.pop(_ANTERIORES, None)
+    session.info.pop(_CONFIRMAR, None)
+
+
+def init_app(app):
+    """Engancha el seguimiento al ciclo de la sesión de SQLAlchemy (una sola vez)."""
+    if event.contains(Session, 'before_flush', _antes_del_flush):
+        return
+    event.listen(Session, 'before_flush', _antes_del_flush)
+    event.listen(Session, 'after_flush', _despues_del_flush)
+    event.listen(Session, 'after_commit', _despues_del_commit)
+    event.listen(Session, 'after_soft_rollback', _despues_del_rollback)
@@ -0,0 +1,181 @@
+import datetime
+import http.cookiejar
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# Harness de carga (``flask carga``): clientes concurrentes que usan las
+# rutas reales de la aplicación como lo haría un navegador, contra un
+# servidor que ya está corriendo (normalmente gunicorn local sobre una base
+# cargada con ``flask seed``). Mide cada request del lado del cliente y
+# reporta latencias y throughput por endpoint.
+
+# Pasos de un paciente y su peso relativo en la mezcla
+MEZCLA_PACIENTE = (
+    ('obtener_horarios', 10),
+    ('reservar_turno', 2),
+    ('dashboard_paciente', 2),
+    ('mis_turnos', 1),
+    ('confirmar_turno', 1),
+)
+MEZCLA_DOCTOR = (
+    ('dashboard_doctor', 3),
+    ('obtener_horarios', 1),
+)
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    # El 302 del login se mide como respuesta, no se sigue
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Resultados:
+    """Duraciones (segundos) y errores por endpoint, compartidos entre hilos."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.duraciones = {}
+        self.errores = {}
+        self.estados = {}
+
+    def registrar(self, endpoint, segundos, estado):
+        with self.lock:
+            self.duraciones.setdefault(endpoint, []).append(segundos)
+            clave = (endpoint, estado)
+            self.estados[clave] = self.estados.get(clave, 0) + 1
+            if estado is None or estado >= 400:
+                self.errores[endpoint] = self.errores.get(endpoint, 0) + 1
+
+    def resumen(self, segundos_totales):
+        """[{endpoint, pedidos, errores, rps, p50, p95, p99, max}] con tiempos en ms."""
+        filas = []
+        for endpoint, duraciones in sorted(self.duraciones.items()):
+            orden = sorted(duraciones)
+            filas.append({
+                'endpoint': endpoint,
+                'pedidos': len(orden),
+                'errores': self.errores.get(endpoint, 0),
+                'rps': round(len(orden) / segundos_totales, 2) if segundos_totales else 0.0,
+                'p50': round(percentil(orden, 50) * 1000, 1),
+                'p95': round(percentil(orden, 95) * 1000, 1),
+                'p99': round(percentil(orden, 99) * 1000, 1),
+                'max': round(orden[-1] * 1000, 1),
+            })
+        return filas
+
+    def codigos(self):
+        return {f'{endpoint} {estado}': cantidad for (endpoint, estado), cantidad in sorted(
+            self.estados.items(), key=lambda item: (item[0][0], item[0][1] or 0))}
+
+
+def percentil(orden, p):
+    """Percentil ``p`` (nearest-rank) de una lista ya ordenada."""
+    if not orden:
+        return 0.0
+    indice = max(0, min(len(orden) - 1, -(-len(orden) * p // 100) - 1))
+    return orden[indice]
+
+
+class Cliente:
+    """Un usuario navegando: cookies propias y sin seguir redirecciones."""
+
+    def __init__(self, base_url, resultados, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.resultados = resultados
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _SinRedirecciones
+        )
+
+    def pedir(self, endpoint, ruta, formulario=None, json_body=None):
+        """Hace el request, lo registra y devuelve (estado, cuerpo)."""
+        datos, headers = None, {}
+        if formulario is not None:
+            datos = urllib.parse.urlencode(formulario).encode()
+        elif json_body is not None:
+            datos = json.dumps(json_body).encode()
+            headers['Content-Type'] = 'application/json'
+        pedido = urllib.request.Request(self.base_url + ruta, data=datos, headers=headers)
+        inicio = time.perf_counter()
+        try:
+            with self.opener.open(pedido, timeout=self.timeout) as respuesta:
+                cuerpo = respuesta.read()
+                estado = respuesta.status
+        except urllib.error.HTTPError as e:
+            cuerpo = e.read()
+            estado = e.code
+        except (urllib.error.URLError, OSError):
+            cuerpo, estado = b'', None
+        self.resultados.registrar(endpoint, time.perf_counter() - inicio, estado)
+        return estado, cuerpo
+
+
+def _elegir(mezcla, azar):
+    pasos, pesos = zip(*mezcla)
+    return azar.choices(pasos, pesos)[0]
+
+
+def _sesion(cliente, email, password, rol, doctor_ids, dias, hasta, azar):
+    estado, _ = cliente.pedir('login', '/auth/login', formulario={'email': email, 'password': password})
+    if estado != 302:
+        return
+    mezcla = MEZCLA_PACIENTE if rol == 'paciente' else MEZCLA_DOCTOR
+    ultimo_slot = None
+    while time.monotonic() < hasta:
+        paso = _elegir(mezcla, azar)
+        if paso == 'obtener_horarios':
+            doctor_id = azar.choice(doctor_ids)
+            fecha = datetime.date.today() + datetime.timedelta(days=azar.randrange(dias))
+            estado, cuerpo = cliente.pedir(
+                paso, f'/doctor/api/horarios?doctor_id={doctor_id}&fecha={fecha.isoformat()}'
+            )
+            if estado == 200:
+                horarios = json.loads(cuerpo).get('horarios') or []
+                if horarios:
+                    ultimo_slot = (doctor_id, fecha.isoformat(), azar.choice(horarios)['hora'])
+        elif paso == 'confirmar_turno':
+            if ultimo_slot is None:
+                continue
+            doctor_id, fecha, hora = ultimo_slot
+            cliente.pedir(paso, '/paciente/confirmar-turno',
+                          json_body={'doctor_id': doctor_id, 'fecha': fecha, 'hora': hora})
+            ultimo_slot = None
+        elif paso == 'reservar_turno':
+            cliente.pedir(paso, '/paciente/reservar-turno')
+        elif paso == 'dashboard_paciente':
+            cliente.pedir(paso, '/paciente/dashboard')
+        elif paso == 'mis_turnos':
+            cliente.pedir(paso, '/paciente/mis-turnos')
+        elif paso == 'dashboard_doctor':
+            cliente.pedir(paso, '/doctor/dashboard')
+
+
+def correr(base_url, usuarios, doctor_ids, clientes, duracion, password, dias=14, semilla=None):
+    """Corre ``clientes`` sesiones concurrentes durante ``duracion`` segundos.
+
+    ``usuarios`` son pares (email, rol) para loguearse; cada cliente toma
+    uno distinto. Devuelve (Resultados, segundos reales).
+    """
+    resultados = Resultados()
+    azar_general = random.Random(semilla)
+    elegidos = azar_general.sample(usuarios, min(clientes, len(usuarios)))
+    hasta = time.monotonic() + duracion
+    hilos = []
+    inicio = time.perf_counter()
+    for i, (email, rol) in enumerate(elegidos):
+        azar = random.Random(azar_general.random())
+        cliente = Cliente(base_url, resultados)
+        hilo = threading.Thread(
+            target=_sesion, args=(cliente, email, password, rol, doctor_ids, dias, hasta, azar),
+            name=f'carga-{i}', daemon=True
+        )
+        hilo.start()
+        hilos.append(hilo)
+    for hilo in hilos:
+        hilo.join()
+    return resultados, time.perf_counter() - inicio
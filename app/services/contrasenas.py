@@ -0,0 +1,238 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturoVencido
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from flask import current_app
+
+# Hash y verificación de contraseñas fuera del worker de gunicorn.
+#
+# bcrypt es CPU puro: una ráfaga de logins deja a los hilos del worker
+# (gthread) peleando por la CPU con el resto de los requests. Acá cada
+# worker manda el trabajo a un pool de procesos propio y acotado:
+#
+#   HASH_POOL_WORKERS  procesos del pool (0 = calcular en el mismo worker)
+#   HASH_COLA_MAX      trabajos esperando como máximo, además de los que corren
+#   HASH_TIMEOUT       segundos que un request espera por su hash en total
+#
+# Si la cola está llena o se vence el tiempo se levanta HashingOcupado, que
+# create_app convierte en un aviso al usuario en vez de un worker colgado.
+
+# bcrypt sólo usa los primeros 72 bytes; las versiones viejas cortaban en
+# silencio y las nuevas fallan. Se corta acá para seguir validando los
+# hashes ya guardados.
+_MAX_BYTES = 72
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_cupos = None
+
+_metricas = {
+    'hashes': 0,
+    'verificaciones': 0,
+    'segundos': 0.0,
+    'rechazados': 0,
+    'vencidos': 0,
+}
+
+
+class HashingOcupado(RuntimeError):
+    """El pool de bcrypt no pudo atender el pedido a tiempo."""
+
+
+def _a_bytes(texto):
+    if isinstance(texto, str):
+        texto = texto.encode('utf-8')
+    return texto
+
+
+# --- Trabajo que corre en los procesos del pool ---
+
+def _hashear(password, rounds):
+    return bcrypt.hashpw(password[:_MAX_BYTES], bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _verificar(password, password_hash):
+    return bcrypt.checkpw(password[:_MAX_BYTES], password_hash)
+
+
+# --- Pool por worker ---
+
+def _contexto():
+    # Nada de fork: el pool se crea (y crece) desde un hilo de request
+    # mientras los otros hilos del worker pueden tener tomados locks de
+    # logging o del pool de SQLAlchemy, y el hijo los heredaría tomados
+    # para siempre. forkserver forkea desde un proceso limpio de un solo
+    # hilo; donde no existe se usa spawn.
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+
+
+def _sumar(**valores):
+    # Los contadores se actualizan desde todos los hilos del worker
+    with _lock:
+        for clave, valor in valores.items():
+            _metricas[clave] += valor
+
+
+def _obtener_pool(workers, cola):
+    """Pool y semáforo de cupos del proceso actual (gunicorn forkea los workers)."""
+    global _pool, _pool_pid, _cupos
+    pid = os.getpid()
+    if _pool is None or _pool_pid != pid:
+        with _lock:
+            if _pool is None or _pool_pid != pid:
+                _pool = ProcessPoolExecutor(max_workers=workers, mp_context=_contexto())
+                _cupos = threading.BoundedSemaphore(workers + cola)
+                _pool_pid = pid
+    return _pool, _cupos
+
+
+def _descartar_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _enviar(funcion, args, timeout):
+    """Encola ``funcion(*args)`` en el pool esperando cupo hasta ``timeout``."""
+    config = current_app.config
+    pool, cupos = _obtener_pool(config['HASH_POOL_WORKERS'], config['HASH_COLA_MAX'])
+    if not cupos.acquire(timeout=timeout):
+        _sumar(rechazados=1)
+        raise HashingOcupado('No hay lugar en la cola de bcrypt')
+    try:
+        futuro = pool.submit(funcion, *args)
+    except BrokenProcessPool:
+        cupos.release()
+        _descartar_pool()
+        raise HashingOcupado('El pool de bcrypt se reinició')
+    # El cupo se libera cuando el trabajo termina de verdad, aunque el
+    # request ya se haya ido por timeout: así la cola nunca se pasa.
+    futuro.add_done_callback(lambda _: cupos.release())
+    return futuro
+
+
+def _resultado(futuro, timeout):
+    try:
+        return futuro.result(timeout=timeout)
+    except FuturoVencido:
+        futuro.cancel()
+        _sumar(vencidos=1)
+        raise HashingOcupado('bcrypt tardó demasiado')
+    except BrokenProcessPool:
+        _descartar_pool()
+        raise HashingOcupado('El pool de bcrypt se reinició')
+
+
+def _ejecutar(funcion, *args):
+    inicio = time.perf_counter()
+    if current_app.config['HASH_POOL_WORKERS'] <= 0:
+        resultado = funcion(*args)
+    else:
+        timeout = current_app.config['HASH_TIMEOUT']
+        futuro = _enviar(funcion, args, timeout)
+        restante = max(0.0, timeout - (time.perf_counter() - inicio))
+        resultado = _resultado(futuro, restante)
+    _sumar(segundos=time.perf_counter() - inicio)
+    return resultado
+
+
+# --- API ---
+
+def rounds_configurados():
+    return current_app.config['BCRYPT_LOG_ROUNDS']
+
+
+def hashear(password):
+    """Hash bcrypt de ``password`` con el costo configurado."""
+    if not password:
+        raise ValueError('La contraseña no puede estar vacía.')
+    resultado = _ejecutar(_hashear, _a_bytes(password), rounds_configurados())
+    _sumar(hashes=1)
+    return resultado
+
+
+def hashear_lote(passwords, workers=None):
+    """Hashes de varias contraseñas en paralelo, en el mismo orden.
+
+    Sin ``workers`` usa el pool del worker respetando HASH_COLA_MAX (cada
+    envío espera su cupo); con ``workers`` arma un pool propio, pensado
+    para comandos de consola que pueden ocupar toda la máquina.
+    """
+    rounds = rounds_configurados()
+    datos = [_a_bytes(p) for p in passwords]
+    if any(not p for p in datos):
+        raise ValueError('La contraseña no puede estar vacía.')
+    inicio = time.perf_counter()
+    if workers is not None:
+        if workers <= 0:
+            hashes = [_hashear(p, rounds) for p in datos]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_contexto()) as pool:
+                hashes = list(pool.map(_hashear, datos, [rounds] * len(datos)))
+    elif current_app.config['HASH_POOL_WORKERS'] <= 0:
+        hashes = [_hashear(p, rounds) for p in datos]
+    else:
+        timeout = current_app.config['HASH_TIMEOUT']
+        futuros = [_enviar(_hashear, (p, rounds), timeout) for p in datos]
+        hashes = [_resultado(f, timeout) for f in futuros]
+    _sumar(segundos=time.perf_counter() - inicio, hashes=len(hashes))
+    return hashes
+
+
+def verificar(password_hash, password):
+    """True si ``password`` corresponde a ``password_hash``."""
+    if not password or not password_hash:
+        return False
+    resultado = _ejecutar(_verificar, _a_bytes(password), _a_bytes(password_hash))
+    _sumar(verificaciones=1)
+    return resultado
+
+
+def costo_de(password_hash):
+    """Costo (log rounds) con el que se generó un hash: ``$2b$12$...`` -> 12."""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def necesita_rehash(password_hash):
+    return costo_de(password_hash) != rounds_configurados()
+
+
+def estadisticas():
+    """Contadores de este worker desde que arrancó."""
+    with _lock:
+        datos = dict(_metricas)
+    operaciones = datos['hashes'] + datos['verificaciones']
+    datos['ms_promedio'] = round(1000 * datos['segundos'] / operaciones, 1) if operaciones else None
+    return datos
+
+
+def medir_rendimiento(cantidad, workers, rounds):
+    """Hashes por segundo con ``workers`` procesos y costo ``rounds``."""
+    password = b'medicion-de-rendimiento'
+    inicio = time.perf_counter()
+    if workers <= 0:
+        for _ in range(cantidad):
+            _hashear(password, rounds)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_contexto()) as pool:
+            list(pool.map(_hashear, [password] * cantidad, [rounds] * cantidad))
+    segundos = time.perf_counter() - inicio
+    return {
+        'cantidad': cantidad,
+        'workers': workers,
+        'rounds': rounds,
+        'segundos': segundos,
+        'por_segundo': cantidad / segundos,
+        'ms_por_hash': 1000 * segundos / cantidad * max(workers, 1),
+    }
@@ -0,0 +1,195 @@
+import datetime
+
+from flask import current_app
+from sqlalchemy import Integer, cast, distinct, func, insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.especialidad import Especialidad
+from app.models.estadistica_diaria import EstadisticaDiaria
+from app.models.turno import Turno
+from app.services import cambios_turnos
+from app.services.cache import TTLCache
+from app.services.fechas import entre, rango_dia, rango_semana
+
+_resumenes_doctor = TTLCache(ttl=30)
+
+
+@cambios_turnos.en_transaccion
+def _actualizar_contadores(conexion, cambios):
+    # Por clave: [cantidad, minutos de anticipación, turnos con anticipación]
+    deltas = {}
+    for cambio in cambios:
+        for estado_turno, signo in ((cambio.anterior, -1), (cambio.nuevo, 1)):
+            if estado_turno is None:
+                continue
+            delta = deltas.setdefault(_clave(estado_turno), [0, 0, 0])
+            delta[0] += signo
+            minutos = minutos_anticipacion(estado_turno)
+            if minutos is not None:
+                delta[1] += signo * minutos
+                delta[2] += signo
+    deltas = {clave: d for clave, d in deltas.items() if any(d)}
+    if deltas:
+        aplicar_deltas(conexion, deltas)
+
+
+def _clave(estado_turno):
+    return (estado_turno.fecha_hora.date(), int(estado_turno.doctor_id), estado_turno.estado)
+
+
+def minutos_anticipacion(estado_turno):
+    """Minutos entre la reserva y el turno, o None si no se sabe cuándo se reservó."""
+    if estado_turno.creado_en is None:
+        return None
+    # Al segundo, igual que la versión SQL de reconstruir()
+    diferencia = estado_turno.fecha_hora.replace(microsecond=0) - estado_turno.creado_en.replace(microsecond=0)
+    return max(0, int(diferencia.total_seconds()) // 60)
+
+
+def aplicar_deltas(conexion, deltas):
+    """Suma ``deltas`` a los contadores.
+
+    ``deltas`` es {(fecha, doctor_id, estado): (cantidad, minutos, turnos_con_anticipacion)}.
+    """
+    doctor_ids = {doctor_id for _, doctor_id, _ in deltas}
+    especialidades = dict(conexion.execute(
+        select(Doctor.id, Doctor.especialidad_id).where(Doctor.id.in_(doctor_ids))
+    ).all())
+    filas = [
+        {'fecha': fecha, 'doctor_id': doctor_id, 'estado': estado,
+         'especialidad_id': especialidades.get(doctor_id), 'cantidad': n,
+         'anticipacion_minutos': minutos, 'anticipacion_turnos': medidos}
+        for (fecha, doctor_id, estado), (n, minutos, medidos) in sorted(deltas.items())
+    ]
+    sumables = ('cantidad', 'anticipacion_minutos', 'anticipacion_turnos')
+    # La especialidad se pisa con la actual del doctor, igual que en
+    # reconstruir(): si cambió, la fila del día no queda con la vieja
+
+    tabla = EstadisticaDiaria.__table__
+    dialecto = conexion.dialect.name
+    if dialecto in ('postgresql', 'sqlite'):
+        insertar = (postgresql if dialecto == 'postgresql' else sqlite).insert
+        stmt = insertar(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['fecha', 'doctor_id', 'estado'],
+            set_={'especialidad_id': stmt.excluded.especialidad_id,
+                  **{c: tabla.c[c] + stmt.excluded[c] for c in sumables}}
+        )
+        conexion.execute(stmt, filas)
+        return
+
+    # Otros motores: update y, si no existía la fila, insert
+    for fila in filas:
+        resultado = conexion.execute(
+            tabla.update().where(
+                tabla.c.fecha == fila['fecha'],
+                tabla.c.doctor_id == fila['doctor_id'],
+                tabla.c.estado == fila['estado']
+            ).values(especialidad_id=fila['especialidad_id'], **{c: tabla.c[c] + fila[c] for c in sumables})
+        )
+        if resultado.rowcount == 0:
+            conexion.execute(tabla.insert().values(**fila))
+
+
+def _minutos_anticipacion_sql(dialecto):
+    """Expresión SQL equivalente a :func:`minutos_anticipacion` para un Turno."""
+    desde, hasta = Turno.creado_en, Turno.fecha_hora
+    if dialecto == 'postgresql':
+        segundos = func.extract('epoch', func.date_trunc('second', hasta) - func.date_trunc('second', desde))
+        return func.greatest(0, func.floor(segundos / 60))
+    if dialecto == 'sqlite':
+        segundos = cast(func.strftime('%s', hasta), Integer) - cast(func.strftime('%s', desde), Integer)
+        return func.max(0, segundos // 60)
+    return func.greatest(0, func.timestampdiff(text('MINUTE'), desde, hasta))
+
+
+def reconstruir():
+    """Recalcula todos los contadores desde la tabla turnos.
+
+    Hace falta después de cargas masivas que no pasan por el ORM.
+    """
+    tabla = EstadisticaDiaria.__table__
+    fecha = func.date(Turno.fecha_hora)
+    minutos = _minutos_anticipacion_sql(db.engine.dialect.name)
+    origen = select(
+        fecha, Turno.doctor_id, Doctor.especialidad_id, Turno.estado, func.count(Turno.id),
+        func.coalesce(func.sum(minutos), 0), func.count(Turno.creado_en)
+    ).join(Doctor, Turno.doctor_id == Doctor.id).group_by(
+        fecha, Turno.doctor_id, Doctor.especialidad_id, Turno.estado
+    )
+    db.session.execute(tabla.delete())
+    db.session.execute(
+        insert(tabla).from_select([
+            'fecha', 'doctor_id', 'especialidad_id', 'estado', 'cantidad',
+            'anticipacion_minutos', 'anticipacion_turnos'
+        ], origen)
+    )
+    db.session.commit()
+    return db.session.query(func.count(EstadisticaDiaria.id)).scalar()
+
+
+# --- Consultas para el dashboard ---
+
+def turnos_del_dia(fecha):
+    return db.session.query(
+        func.coalesce(func.sum(EstadisticaDiaria.cantidad), 0)
+    ).filter(EstadisticaDiaria.fecha == fecha).scalar()
+
+
+def turnos_por_estado():
+    total = func.sum(EstadisticaDiaria.cantidad)
+    return db.session.query(EstadisticaDiaria.estado, total)\
+        .group_by(EstadisticaDiaria.estado)\
+        .having(total > 0).all()
+
+
+def especialidades_populares(limite=5):
+    total = func.sum(EstadisticaDiaria.cantidad)
+    return db.session.query(Especialidad.nombre, total.label('total_turnos'))\
+        .join(Especialidad, EstadisticaDiaria.especialidad_id == Especialidad.id)\
+        .group_by(Especialidad.nombre)\
+        .having(total > 0)\
+        .order_by(total.desc())\
+        .limit(limite).all()
+
+
+# --- Resumen del dashboard del doctor ---
+
+def resumen_doctor(doctor_id, now=None):
+    """Contadores del dashboard del doctor con una sola consulta agregada.
+
+    Se cachea por doctor unos segundos; reservas y cambios de estado de sus
+    turnos lo invalidan (ver ``_invalidar_resumenes``).
+    """
+    resumen = _resumenes_doctor.get(doctor_id)
+    if resumen is not None:
+        return resumen
+
+    now = now or datetime.datetime.now()
+    hoy = entre(Turno.fecha_hora, rango_dia(now.date()))
+    semana = entre(Turno.fecha_hora, rango_semana(now.date()))
+    pendientes = (Turno.estado == 'pendiente') & (Turno.fecha_hora >= now)
+
+    fila = db.session.query(
+        func.count(Turno.id).filter(hoy),
+        func.count(Turno.id).filter(semana),
+        func.count(Turno.id).filter(pendientes),
+        func.count(distinct(Turno.paciente_id))
+    ).filter(Turno.doctor_id == doctor_id).one()
+
+    resumen = {
+        'turnos_hoy': fila[0],
+        'turnos_semana': fila[1],
+        'turnos_pendientes': fila[2],
+        'pacientes': fila[3]
+    }
+    _resumenes_doctor.set(doctor_id, resumen, ttl=current_app.config['DOCTOR_DASHBOARD_TTL'])
+    return resumen
+
+
+@cambios_turnos.al_confirmar
+def _invalidar_resumenes(cambios):
+    for doctor_id, _ in cambios_turnos.afectadas(cambios):
+        _resumenes_doctor.delete(doctor_id)
@@ -0,0 +1,231 @@
+import json
+import os
+import queue
+import socket
+import tempfile
+import threading
+
+from flask import current_app
+
+from app.services import cambios_turnos
+from app.services.agenda import ESTADOS_OCUPADOS
+
+# Avisos en vivo de slots tomados y liberados, para la pantalla de reserva.
+#
+# Cada worker lleva en memoria quién está mirando qué agenda (doctor, día)
+# y le pasa los eventos por una cola. Los eventos salen de los commits de
+# turnos (cambios_turnos.al_confirmar) y, como el commit puede ocurrir en
+# otro worker, también se reenvían a los demás workers de la máquina por
+# sockets Unix de datagramas: cada worker que tiene suscriptores escucha en
+# EVENTOS_DIR/<pid>.sock y quien publica manda una copia a cada socket del
+# directorio. Los avisos son una ayuda: si uno se pierde (cola llena,
+# worker reiniciándose) el próximo GET de horarios lo corrige.
+
+MAX_DATAGRAMA = 8192
+EVENTOS_POR_DATAGRAMA = 40
+
+
+class SinLugar(RuntimeError):
+    """El worker ya tiene el máximo de conexiones de eventos abiertas."""
+
+
+_lock = threading.Lock()
+_suscriptores = {}  # (doctor_id, 'YYYY-MM-DD') -> set de Suscripcion
+_cantidad = 0
+_receptor = {'pid': None, 'socket': None, 'ruta': None}
+
+
+class Suscripcion:
+    """Cola de eventos de una agenda para una conexión SSE."""
+
+    def __init__(self, clave, max_cola):
+        self.clave = clave
+        self.cola = queue.Queue(maxsize=max_cola)
+        self.cerrada = False
+
+    def esperar(self, timeout):
+        """Próximo evento, o None si no llegó ninguno en ``timeout`` segundos."""
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def entregar(self, evento):
+        try:
+            self.cola.put_nowait(evento)
+        except queue.Full:
+            # Cliente que no lee: se pierde el aviso, no se frena al resto
+            pass
+
+    def cerrar(self):
+        global _cantidad
+        with _lock:
+            if self.cerrada:
+                return
+            self.cerrada = True
+            _cantidad -= 1
+            grupo = _suscriptores.get(self.clave)
+            if grupo is not None:
+                grupo.discard(self)
+                if not grupo:
+                    del _suscriptores[self.clave]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+
+def suscribir(doctor_id, fecha):
+    """Abre una suscripción a los eventos de la agenda ``(doctor_id, fecha)``.
+
+    Levanta SinLugar si el worker ya tiene EVENTOS_MAX_CONEXIONES abiertas.
+    """
+    global _cantidad
+    config = current_app.config
+    _asegurar_receptor(config['EVENTOS_DIR'])
+    suscripcion = Suscripcion((int(doctor_id), fecha.isoformat()), config['EVENTOS_MAX_COLA'])
+    with _lock:
+        if _cantidad >= config['EVENTOS_MAX_CONEXIONES']:
+            raise SinLugar('Demasiadas conexiones de eventos en este worker')
+        _cantidad += 1
+        _suscriptores.setdefault(suscripcion.clave, set()).add(suscripcion)
+    return suscripcion
+
+
+def conexiones_abiertas():
+    return _cantidad
+
+
+def _entregar_local(eventos):
+    with _lock:
+        destinos = [
+            (suscripcion, evento)
+            for evento in eventos
+            for suscripcion in _suscriptores.get((evento['doctor_id'], evento['fecha']), ())
+        ]
+    for suscripcion, evento in destinos:
+        suscripcion.entregar(evento)
+
+
+# --- Reenvío entre workers (sockets Unix) ---
+
+def _directorio(config_dir):
+    return config_dir or os.path.join(tempfile.gettempdir(), 'iturnito-eventos')
+
+
+def _asegurar_receptor(config_dir):
+    """Socket y hilo receptor del worker actual (se crean con la primera suscripción)."""
+    if not hasattr(socket, 'AF_UNIX'):
+        return
+    pid = os.getpid()
+    if _receptor['pid'] == pid:
+        return
+    with _lock:
+        if _receptor['pid'] == pid:
+            return
+        directorio = _directorio(config_dir)
+        os.makedirs(directorio, exist_ok=True)
+        ruta = os.path.join(directorio, f'{pid}.sock')
+        if os.path.exists(ruta):
+            os.unlink(ruta)
+        receptor = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receptor.bind(ruta)
+        _receptor.update(pid=pid, socket=receptor, ruta=ruta)
+    threading.Thread(target=_escuchar, args=(receptor,), name='eventos-agenda', daemon=True).start()
+
+
+def _escuchar(receptor):
+    while True:
+        try:
+            datos = receptor.recv(MAX_DATAGRAMA)
+        except OSError:
+            return
+        try:
+            _entregar_local(json.loads(datos))
+        except ValueError:
+            continue
+
+
+def _reenviar(eventos, config_dir):
+    if not hasattr(socket, 'AF_UNIX'):
+        return
+    directorio = _directorio(config_dir)
+    try:
+        nombres = os.listdir(directorio)
+    except FileNotFoundError:
+        return
+    propio = _receptor['ruta'] if _receptor['pid'] == os.getpid() else None
+    rutas = [
+        os.path.join(directorio, nombre) for nombre in nombres
+        if nombre.endswith('.sock') and os.path.join(directorio, nombre) != propio
+    ]
+    if not rutas:
+        return
+    paquetes = [
+        json.dumps(eventos[i:i + EVENTOS_POR_DATAGRAMA]).encode('utf-8')
+        for i in range(0, len(eventos), EVENTOS_POR_DATAGRAMA)
+    ]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as emisor:
+        emisor.setblocking(False)
+        for ruta in rutas:
+            for datos in paquetes:
+                try:
+                    emisor.sendto(datos, ruta)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Worker que ya no existe: se limpia su socket
+                    try:
+                        os.unlink(ruta)
+                    except FileNotFoundError:
+                        pass
+                    break
+                except OSError:
+                    # Buffer del receptor lleno u otro error puntual
+                    continue
+
+
+def publicar(eventos):
+    """Entrega ``eventos`` a los suscriptores de este worker y de los demás."""
+    if not eventos:
+        return
+    _entregar_local(eventos)
+    _reenviar(eventos, current_app.config['EVENTOS_DIR'])
+
+
+# --- Eventos desde los cambios de turnos ---
+
+def _slot(estado):
+    """(doctor_id, fecha_hora) si el turno ocupa un slot en ese estado."""
+    if estado is None or estado.estado not in ESTADOS_OCUPADOS:
+        return None
+    return int(estado.doctor_id), estado.fecha_hora
+
+
+def _evento(tipo, slot):
+    doctor_id, fecha_hora = slot
+    return {
+        'tipo': tipo,
+        'doctor_id': doctor_id,
+        'fecha': fecha_hora.date().isoformat(),
+        'hora': fecha_hora.strftime('%H:%M'),
+    }
+
+
+def eventos_de(cambios):
+    """Slots ocupados y liberados por un grupo de cambios de turnos."""
+    eventos = []
+    for cambio in cambios:
+        antes, despues = _slot(cambio.anterior), _slot(cambio.nuevo)
+        if antes == despues:
+            continue
+        if antes is not None:
+            eventos.append(_evento('liberado', antes))
+        if despues is not None:
+            eventos.append(_evento('ocupado', despues))
+    return eventos
+
+
+@cambios_turnos.al_confirmar
+def _publicar_cambios(cambios):
+    publicar(eventos_de(cambios))
@@ -0,0 +1,222 @@
+import bisect
+import datetime
+
+from flask import current_app
+from sqlalchemy import delete, insert, or_, select
+
+from app.extensions import db
+from app.models.excepcion import Excepcion
+from app.services.cache import TTLCache
+
+# Excepciones a la agenda semanal: intervalos [inicio, fin) en los que un
+# doctor no atiende. Las de doctor_id NULL (feriados) valen para todos.
+#
+# Para la agenda se cargan de una vez las excepciones vigentes del doctor
+# en un Intervalos (ordenados y fusionados): saber qué parte de un día está
+# bloqueada es una búsqueda binaria, sin consultas por slot ni por día.
+
+_intervalos = TTLCache(ttl=300, max_entradas=5000)
+
+UN_DIA = datetime.timedelta(days=1)
+
+
+class ExcepcionInvalida(ValueError):
+    pass
+
+
+class Intervalos:
+    """Intervalos [inicio, fin) ordenados y sin solapamientos."""
+
+    __slots__ = ('inicios', 'fines')
+
+    def __init__(self, intervalos=()):
+        fusionados = []
+        for inicio, fin in sorted(intervalos):
+            if fin <= inicio:
+                continue
+            if fusionados and inicio <= fusionados[-1][1]:
+                fusionados[-1][1] = max(fusionados[-1][1], fin)
+            else:
+                fusionados.append([inicio, fin])
+        self.inicios = [inicio for inicio, _ in fusionados]
+        self.fines = [fin for _, fin in fusionados]
+
+    def __bool__(self):
+        return bool(self.inicios)
+
+    def __len__(self):
+        return len(self.inicios)
+
+    def __iter__(self):
+        return zip(self.inicios, self.fines)
+
+    def huella(self):
+        """Valor que cambia si cambian los intervalos (para ETags)."""
+        return tuple(zip(self.inicios, self.fines))
+
+    def recortes(self, desde, hasta):
+        """Partes de los intervalos que caen dentro de [desde, hasta)."""
+        # Al estar fusionados, los fines también quedan ordenados
+        i = bisect.bisect_right(self.fines, desde)
+        while i < len(self.inicios) and self.inicios[i] < hasta:
+            yield max(self.inicios[i], desde), min(self.fines[i], hasta)
+            i += 1
+
+    def minutos_del_dia(self, fecha):
+        """Rangos [desde, hasta) en minutos desde las 00:00 bloqueados en ``fecha``."""
+        comienzo = datetime.datetime.combine(fecha, datetime.time())
+        rangos = []
+        for inicio, fin in self.recortes(comienzo, comienzo + UN_DIA):
+            desde = int((inicio - comienzo).total_seconds() // 60)
+            hasta = -int(-(fin - comienzo).total_seconds() // 60)
+            rangos.append((desde, hasta))
+        return rangos
+
+
+# --- Lectura ---
+
+def _vigentes(doctor_ids, desde, hasta=None):
+    """SELECT de las excepciones de ``doctor_ids`` y las generales que
+    terminan después de ``desde`` (y empiezan antes de ``hasta``)."""
+    stmt = select(Excepcion.doctor_id, Excepcion.inicio, Excepcion.fin).where(
+        or_(Excepcion.doctor_id.in_(doctor_ids), Excepcion.doctor_id.is_(None)),
+        Excepcion.fin > desde
+    )
+    if hasta is not None:
+        stmt = stmt.where(Excepcion.inicio < hasta)
+    return db.session.execute(stmt)
+
+
+def intervalos_de(doctor_id, version=None):
+    """Intervalos bloqueados del doctor desde ayer en adelante (cacheado).
+
+    Con ``version`` (ver agenda.versiones_agenda) se descarta el cache si es
+    de otra versión, igual que la plantilla semanal.
+    """
+    cacheado = _intervalos.get(doctor_id)
+    if cacheado is not None and (version is None or cacheado[0] == version):
+        return cacheado[1]
+    desde = datetime.datetime.combine(datetime.date.today() - UN_DIA, datetime.time())
+    intervalos = Intervalos((inicio, fin) for _, inicio, fin in _vigentes([doctor_id], desde))
+    _intervalos.set(doctor_id, (version, intervalos), ttl=current_app.config['AGENDA_PLANTILLA_TTL'])
+    return intervalos
+
+
+def bloquea(doctor_id, inicio, fin):
+    """True si alguna excepción del doctor o feriado se superpone con
+    [inicio, fin). Lee la base, no el cache: es el control de la reserva."""
+    return _vigentes([doctor_id], inicio, fin).first() is not None
+
+
+def intervalos_por_doctor(doctor_ids, desde, hasta):
+    """{doctor_id: Intervalos} de las excepciones que tocan [desde, hasta), en
+    una sola consulta. Los doctores sin excepciones no aparecen."""
+    doctor_ids = list(doctor_ids)
+    propias = {}
+    generales = []
+    for doctor_id, inicio, fin in _vigentes(doctor_ids, desde, hasta):
+        if doctor_id is None:
+            generales.append((inicio, fin))
+        else:
+            propias.setdefault(doctor_id, []).append((inicio, fin))
+    if generales:
+        return {d: Intervalos(propias.get(d, []) + generales) for d in doctor_ids}
+    return {d: Intervalos(lista) for d, lista in propias.items()}
+
+
+def listar(doctor_id, desde=None):
+    """Excepciones del doctor y feriados que terminan después de ``desde`` (hoy)."""
+    desde = desde or datetime.datetime.combine(datetime.date.today(), datetime.time())
+    return Excepcion.query.filter(
+        or_(Excepcion.doctor_id == doctor_id, Excepcion.doctor_id.is_(None)),
+        Excepcion.fin > desde
+    ).order_by(Excepcion.inicio, Excepcion.id).all()
+
+
+# --- Alta ---
+
+def leer_intervalo(datos):
+    """(inicio, fin) desde un dict con fecha, hasta, hora_inicio y hora_fin.
+
+    ``hasta`` es inclusive y por defecto igual a ``fecha``; sin horas la
+    excepción cubre los días completos.
+    """
+    try:
+        fecha = datetime.date.fromisoformat(str(datos.get('fecha') or ''))
+        hasta = datetime.date.fromisoformat(str(datos['hasta'])) if datos.get('hasta') else fecha
+        hora_inicio = datetime.time.fromisoformat(datos['hora_inicio']) if datos.get('hora_inicio') else None
+        hora_fin = datetime.time.fromisoformat(datos['hora_fin']) if datos.get('hora_fin') else None
+    except (TypeError, ValueError) as e:
+        raise ExcepcionInvalida('Fecha u hora inválida.') from e
+    inicio = datetime.datetime.combine(fecha, hora_inicio or datetime.time())
+    fin = datetime.datetime.combine(hasta, hora_fin) if hora_fin else datetime.datetime.combine(hasta + UN_DIA, datetime.time())
+    if fin <= inicio:
+        raise ExcepcionInvalida('La excepción termina antes de empezar.')
+    return inicio, fin
+
+
+def _motivo(datos):
+    motivo = str(datos.get('motivo') or '').strip()
+    return motivo[:200] or None
+
+
+def reemplazar(doctor_id, lista, desde=None):
+    """Reemplaza las excepciones propias del doctor por ``lista`` (dicts como
+    los de Excepcion.to_dict). Las generales se ignoran. Hay que hacer commit.
+
+    Sólo se reemplazan las que terminan después de ``desde`` (hoy), las
+    mismas que muestra :func:`listar`: las pasadas quedan como estaban.
+    """
+    desde = desde or datetime.datetime.combine(datetime.date.today(), datetime.time())
+    filas = []
+    for datos in lista:
+        if datos.get('global'):
+            continue
+        inicio, fin = leer_intervalo(datos)
+        filas.append({'doctor_id': doctor_id, 'inicio': inicio, 'fin': fin, 'motivo': _motivo(datos)})
+    db.session.execute(delete(Excepcion).where(Excepcion.doctor_id == doctor_id, Excepcion.fin > desde),
+                       execution_options={'synchronize_session': False})
+    if filas:
+        db.session.execute(insert(Excepcion), filas)
+    invalidar(doctor_id)
+    return len(filas)
+
+
+def agregar_feriados(feriados):
+    """Agrega feriados para todos los doctores con un solo INSERT.
+
+    ``feriados`` son pares (fecha, motivo). Las fechas que ya tenían un
+    feriado de día completo se omiten. Devuelve cuántos se agregaron; hay
+    que hacer commit.
+    """
+    pedidos = {}
+    for fecha, motivo in feriados:
+        pedidos[fecha] = (motivo or '').strip()[:200] or None
+    if not pedidos:
+        return 0
+    inicios = [datetime.datetime.combine(f, datetime.time()) for f in pedidos]
+    existentes = set(db.session.scalars(
+        select(Excepcion.inicio).where(Excepcion.doctor_id.is_(None), Excepcion.inicio.in_(inicios))
+    ))
+    filas = [
+        {
+            'doctor_id': None,
+            'inicio': datetime.datetime.combine(fecha, datetime.time()),
+            'fin': datetime.datetime.combine(fecha + UN_DIA, datetime.time()),
+            'motivo': motivo,
+        }
+        for fecha, motivo in sorted(pedidos.items())
+        if datetime.datetime.combine(fecha, datetime.time()) not in existentes
+    ]
+    if filas:
+        db.session.execute(insert(Excepcion), filas)
+    invalidar()
+    return len(filas)
+
+
+def invalidar(doctor_id=None):
+    """Descarta los intervalos cacheados de un doctor, o de todos."""
+    if doctor_id is None:
+        _intervalos.clear()
+    else:
+        _intervalos.delete(doctor_id)
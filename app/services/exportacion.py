@@ -0,0 +1,139 @@
+import csv
+import datetime
+import io
+import json
+
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.especialidad import Especialidad
+from app.models.paciente import Paciente
+from app.models.turno import Turno
+from app.models.user import User
+from app.services.fechas import rango_dia
+
+# Exportación de turnos en CSV o NDJSON sin cargar la tabla en memoria.
+#
+# La consulta se recorre con un cursor del lado del servidor (stream_results)
+# de a FILAS_POR_TANDA filas y cada tanda se convierte en un bloque de texto:
+# el consumo de memoria es el mismo para un día que para cinco años.
+
+FORMATOS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+COLUMNAS = (
+    'id', 'fecha_hora', 'estado', 'modalidad',
+    'doctor_id', 'doctor', 'especialidad',
+    'paciente_id', 'paciente', 'paciente_dni',
+)
+ESTADOS = ('pendiente', 'confirmado', 'completado', 'cancelado')
+FILAS_POR_TANDA = 1000
+
+
+class FiltroInvalido(ValueError):
+    pass
+
+
+def leer_filtros(args):
+    """Filtros de exportación desde un dict de textos (request.args, opciones de CLI).
+
+    Claves: desde, hasta (YYYY-MM-DD), doctor_id, especialidad_id, estado.
+    """
+    filtros = {}
+    try:
+        for clave in ('desde', 'hasta'):
+            if args.get(clave):
+                filtros[clave] = datetime.date.fromisoformat(str(args[clave]))
+        for clave in ('doctor_id', 'especialidad_id'):
+            if args.get(clave):
+                filtros[clave] = int(args[clave])
+    except ValueError as e:
+        raise FiltroInvalido(str(e)) from e
+    estado = args.get('estado')
+    if estado:
+        if estado not in ESTADOS:
+            raise FiltroInvalido(f'Estado desconocido: {estado}')
+        filtros['estado'] = estado
+    return filtros
+
+
+def consulta(filtros):
+    """SELECT de los turnos filtrados con los nombres de doctor y paciente."""
+    usuario_doctor = aliased(User)
+    usuario_paciente = aliased(User)
+    stmt = (
+        select(
+            Turno.id, Turno.fecha_hora, Turno.estado, Turno.modalidad,
+            Turno.doctor_id, usuario_doctor.name.label('doctor'),
+            Especialidad.nombre.label('especialidad'),
+            Turno.paciente_id, usuario_paciente.name.label('paciente'),
+            usuario_paciente.dni.label('paciente_dni'),
+        )
+        .join(Doctor, Turno.doctor_id == Doctor.id)
+        .join(usuario_doctor, Doctor.user_id == usuario_doctor.id)
+        .outerjoin(Especialidad, Doctor.especialidad_id == Especialidad.id)
+        .join(Paciente, Turno.paciente_id == Paciente.id)
+        .join(usuario_paciente, Paciente.user_id == usuario_paciente.id)
+        .order_by(Turno.fecha_hora, Turno.id)
+    )
+    if 'desde' in filtros:
+        stmt = stmt.where(Turno.fecha_hora >= rango_dia(filtros['desde'])[0])
+    if 'hasta' in filtros:
+        stmt = stmt.where(Turno.fecha_hora < rango_dia(filtros['hasta'])[1])
+    if 'doctor_id' in filtros:
+        stmt = stmt.where(Turno.doctor_id == filtros['doctor_id'])
+    if 'especialidad_id' in filtros:
+        stmt = stmt.where(Doctor.especialidad_id == filtros['especialidad_id'])
+    if 'estado' in filtros:
+        stmt = stmt.where(Turno.estado == filtros['estado'])
+    return stmt
+
+
+def _tandas(filtros):
+    # Conexión propia: el cursor queda abierto mientras se envía la respuesta
+    with db.engine.connect() as conexion:
+        resultado = conexion.execution_options(
+            stream_results=True, yield_per=FILAS_POR_TANDA
+        ).execute(consulta(filtros))
+        for tanda in resultado.partitions():
+            yield tanda
+
+
+def _a_texto(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(timespec='minutes')
+    return valor
+
+
+def generar_csv(filtros):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    for tanda in _tandas(filtros):
+        escritor.writerows([[_a_texto(v) for v in fila] for fila in tanda])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Encabezado solo, si no hubo filas
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def generar_ndjson(filtros):
+    for tanda in _tandas(filtros):
+        yield ''.join(
+            json.dumps(dict(zip(COLUMNAS, map(_a_texto, fila))), ensure_ascii=False) + '\n'
+            for fila in tanda
+        )
+
+
+def generar(formato, filtros):
+    """Bloques de texto del export en ``formato`` ('csv' o 'ndjson')."""
+    if formato == 'csv':
+        return generar_csv(filtros)
+    if formato == 'ndjson':
+        return generar_ndjson(filtros)
+    raise FiltroInvalido(f'Formato desconocido: {formato}')
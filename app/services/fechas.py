@@ -0,0 +1,35 @@
+import datetime
+
+from sqlalchemy import and_
+
+# Helpers para filtrar por fecha sin envolver la columna en func.date(),
+# que impide usar los índices sobre fecha_hora. Todos los rangos son
+# semiabiertos: [inicio, fin).
+
+
+def rango_dias(desde, hasta):
+    """Rango de ``desde`` a ``hasta`` inclusive, como datetimes [inicio, fin)."""
+    inicio = datetime.datetime.combine(desde, datetime.time.min)
+    fin = datetime.datetime.combine(hasta + datetime.timedelta(days=1), datetime.time.min)
+    return inicio, fin
+
+
+def rango_dia(fecha):
+    return rango_dias(fecha, fecha)
+
+
+def inicio_semana(fecha):
+    """Lunes de la semana de ``fecha``."""
+    return fecha - datetime.timedelta(days=fecha.weekday())
+
+
+def rango_semana(fecha):
+    """Semana (lunes a domingo) que contiene ``fecha``."""
+    lunes = inicio_semana(fecha)
+    return rango_dias(lunes, lunes + datetime.timedelta(days=6))
+
+
+def entre(columna, rango):
+    """Condición ``inicio <= columna < fin`` para usar en ``filter()``."""
+    inicio, fin = rango
+    return and_(columna >= inicio, columna < fin)
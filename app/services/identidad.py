@@ -0,0 +1,73 @@
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.paciente import Paciente
+from app.models.user import User
+from app.services.cache import TTLCache
+
+# Usuarios ya cargados (instancias desprendidas de cualquier sesión) por id.
+# Sólo se usa si IDENTIDAD_CACHE_TTL > 0.
+_usuarios = TTLCache(ttl=30, max_entradas=5000)
+
+
+def _consulta(session):
+    # El perfil del rol viene en la misma consulta: los guards de los
+    # blueprints y casi todas las rutas lo usan enseguida.
+    return session.query(User).options(
+        joinedload(User.paciente_perfil),
+        joinedload(User.doctor_perfil)
+    )
+
+
+def cargar_usuario(user_id):
+    """Usuario con su perfil de rol, para el ``user_loader`` de Flask-Login.
+
+    Flask-Login ya guarda el resultado en ``g`` durante el request; esto
+    evita además las consultas perezosas al perfil y, si está activado el
+    cache, la consulta misma en requests seguidos del mismo usuario.
+    """
+    ttl = current_app.config['IDENTIDAD_CACHE_TTL']
+    if not ttl:
+        return _consulta(db.session).filter(User.id == user_id).first()
+
+    cacheado = _usuarios.get(user_id)
+    if cacheado is None:
+        # Sesión aparte: al cerrarla las instancias quedan desprendidas y se
+        # pueden guardar sin atarlas al request que las cargó.
+        with Session(db.engine) as session:
+            cacheado = _consulta(session).filter(User.id == user_id).first()
+        if cacheado is None:
+            return None
+        _usuarios.set(user_id, cacheado, ttl=ttl)
+    # merge(load=False) copia el estado a la sesión del request sin consultar
+    return db.session.merge(cacheado, load=False)
+
+
+def invalidar(user_id):
+    _usuarios.delete(user_id)
+
+
+# --- Invalidación automática ---
+
+def _al_cambiar_usuario(mapper, connection, target):
+    invalidar(target.id)
+
+
+def _al_cambiar_perfil(mapper, connection, target):
+    if target.user_id is not None:
+        invalidar(target.user_id)
+
+
+def init_app(app):
+    """Descarta del cache a los usuarios cuyo perfil o contraseña cambian."""
+    if event.contains(User, 'after_update', _al_cambiar_usuario):
+        return
+    for evento in ('after_update', 'after_delete'):
+        event.listen(User, evento, _al_cambiar_usuario)
+        event.listen(Paciente, evento, _al_cambiar_perfil)
+        event.listen(Doctor, evento, _al_cambiar_perfil)
+    event.listen(Paciente, 'after_insert', _al_cambiar_perfil)
+    event.listen(Doctor, 'after_insert', _al_cambiar_perfil)
@@ -0,0 +1,229 @@
+import csv
+import itertools
+
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.especialidad import Especialidad
+from app.models.paciente import Paciente
+from app.models.user import User
+from app.services import contrasenas
+
+# Alta masiva de pacientes y doctores desde CSV.
+#
+# El archivo se lee en lotes de ``tamano_lote`` filas. Por lote: una sola
+# consulta para ver qué emails/DNIs ya existen, los hashes en paralelo y
+# dos INSERT masivos (users + perfiles) en una transacción propia. Una
+# fila inválida no frena al resto: se anota con su número de línea.
+#
+#   pacientes: name, email, password, dni, telefono, obra_social
+#   doctores:  name, email, password, dni, telefono, especialidad, matricula
+#
+# ``especialidad`` puede ser el nombre o el id.
+
+COLUMNAS = {
+    'paciente': ('name', 'email', 'password', 'dni', 'telefono', 'obra_social'),
+    'doctor': ('name', 'email', 'password', 'dni', 'telefono', 'especialidad', 'matricula'),
+}
+OBLIGATORIAS = ('name', 'email', 'password')
+LONGITUD_MINIMA_PASSWORD = 8
+TAMANO_LOTE = 500
+
+
+class ArchivoInvalido(ValueError):
+    pass
+
+
+class ResultadoImportacion:
+
+    def __init__(self):
+        self.creados = 0
+        self.errores = []  # (línea, mensaje)
+
+    def error(self, linea, mensaje):
+        self.errores.append((linea, mensaje))
+
+    @property
+    def procesados(self):
+        return self.creados + len(self.errores)
+
+
+def leer_csv(lineas, rol):
+    """Filas del CSV como (número de línea, dict), validando el encabezado.
+
+    Acepta ``,`` o ``;`` como separador (Excel en español usa ``;``).
+    """
+    lineas = iter(lineas)
+    encabezado = next(lineas, '')
+    separador = ';' if encabezado.count(';') > encabezado.count(',') else ','
+    lector = csv.DictReader(itertools.chain([encabezado], lineas), delimiter=separador)
+    campos = [c.strip().lower() for c in (lector.fieldnames or [])]
+    faltan = [c for c in OBLIGATORIAS if c not in campos]
+    if faltan:
+        raise ArchivoInvalido(f"Faltan columnas: {', '.join(faltan)}")
+    lector.fieldnames = campos
+    for fila in lector:
+        datos = {c: (fila.get(c) or '').strip() for c in COLUMNAS[rol]}
+        yield lector.line_num, datos
+
+
+def _especialidades():
+    """Id de especialidad por nombre (en minúsculas) y por id en texto."""
+    mapa = {}
+    for esp_id, nombre in db.session.execute(select(Especialidad.id, Especialidad.nombre)):
+        mapa[nombre.strip().lower()] = esp_id
+        mapa[str(esp_id)] = esp_id
+    return mapa
+
+
+class _Importador:
+
+    def __init__(self, rol, workers):
+        self.rol = rol
+        self.workers = workers
+        self.resultado = ResultadoImportacion()
+        # Emails/DNIs/matrículas ya vistos en el archivo, para los duplicados
+        # entre lotes distintos
+        self.emails = set()
+        self.dnis = set()
+        self.matriculas = set()
+        self.especialidades = _especialidades() if rol == 'doctor' else {}
+
+    def validar(self, datos):
+        if not all(datos[c] for c in OBLIGATORIAS):
+            return 'Nombre, email y contraseña son obligatorios.'
+        if '@' not in datos['email']:
+            return 'Email inválido.'
+        if len(datos['password']) < LONGITUD_MINIMA_PASSWORD:
+            return f'La contraseña debe tener al menos {LONGITUD_MINIMA_PASSWORD} caracteres.'
+        if datos['email'] in self.emails:
+            return f"Email repetido en el archivo: {datos['email']}"
+        if datos['dni'] and datos['dni'] in self.dnis:
+            return f"DNI repetido en el archivo: {datos['dni']}"
+        if self.rol == 'doctor':
+            if datos['especialidad'] and datos['especialidad'].lower() not in self.especialidades:
+                return f"Especialidad desconocida: {datos['especialidad']}"
+            if datos['matricula'] and datos['matricula'] in self.matriculas:
+                return f"Matrícula repetida en el archivo: {datos['matricula']}"
+        return None
+
+    def existentes(self, filas):
+        """Emails, DNIs y matrículas del lote que ya están en la base."""
+        emails = [d['email'] for _, d in filas]
+        dnis = [d['dni'] for _, d in filas if d['dni']]
+        condicion = User.email.in_(emails)
+        if dnis:
+            condicion = or_(condicion, User.dni.in_(dnis))
+        usados = db.session.execute(select(User.email, User.dni).where(condicion)).all()
+        matriculas = set()
+        if self.rol == 'doctor':
+            pedidas = [d['matricula'] for _, d in filas if d['matricula']]
+            if pedidas:
+                matriculas = set(db.session.scalars(
+                    select(Doctor.matricula).where(Doctor.matricula.in_(pedidas))
+                ))
+        return {e for e, _ in usados}, {d for _, d in usados if d}, matriculas
+
+    def procesar_lote(self, lote):
+        validas = []
+        for linea, datos in lote:
+            mensaje = self.validar(datos)
+            if mensaje:
+                self.resultado.error(linea, mensaje)
+                continue
+            self.emails.add(datos['email'])
+            if datos['dni']:
+                self.dnis.add(datos['dni'])
+            if self.rol == 'doctor' and datos['matricula']:
+                self.matriculas.add(datos['matricula'])
+            validas.append((linea, datos))
+        if not validas:
+            return
+
+        emails, dnis, matriculas = self.existentes(validas)
+        filas = []
+        for linea, datos in validas:
+            if datos['email'] in emails:
+                self.resultado.error(linea, f"El email ya está registrado: {datos['email']}")
+            elif datos['dni'] and datos['dni'] in dnis:
+                self.resultado.error(linea, f"El DNI ya está registrado: {datos['dni']}")
+            elif self.rol == 'doctor' and datos['matricula'] in matriculas:
+                self.resultado.error(linea, f"La matrícula ya está registrada: {datos['matricula']}")
+            else:
+                filas.append((linea, datos))
+        if not filas:
+            return
+
+        hashes = contrasenas.hashear_lote([d['password'] for _, d in filas], workers=self.workers)
+        try:
+            self.insertar(filas, hashes)
+            db.session.commit()
+            self.resultado.creados += len(filas)
+        except IntegrityError:
+            # Alguien dio de alta los mismos datos entre la consulta y el
+            # INSERT: se reintenta fila por fila para saber cuál choca.
+            db.session.rollback()
+            for fila, password_hash in zip(filas, hashes):
+                try:
+                    self.insertar([fila], [password_hash])
+                    db.session.commit()
+                    self.resultado.creados += 1
+                except IntegrityError:
+                    db.session.rollback()
+                    self.resultado.error(fila[0], 'El email, DNI o matrícula ya está registrado.')
+
+    def insertar(self, filas, hashes):
+        usuarios = [
+            {
+                'name': d['name'], 'email': d['email'], 'password_hash': h, 'rol': self.rol,
+                'telefono': d['telefono'] or None, 'dni': d['dni'] or None,
+            }
+            for (_, d), h in zip(filas, hashes)
+        ]
+        ids = dict(db.session.execute(insert(User).returning(User.email, User.id), usuarios).all())
+        if self.rol == 'paciente':
+            perfiles = [
+                {'user_id': ids[d['email']], 'obra_social': d['obra_social'] or None}
+                for _, d in filas
+            ]
+            db.session.execute(insert(Paciente), perfiles)
+        else:
+            perfiles = [
+                {
+                    'user_id': ids[d['email']],
+                    'especialidad_id': self.especialidades.get(d['especialidad'].lower()),
+                    'matricula': d['matricula'] or None,
+                }
+                for _, d in filas
+            ]
+            db.session.execute(insert(Doctor), perfiles)
+
+
+def importar(lineas, rol, tamano_lote=TAMANO_LOTE, workers=None, max_filas=None):
+    """Importa usuarios ``rol`` ('paciente' o 'doctor') desde líneas de un CSV.
+
+    ``workers`` se pasa a :func:`contrasenas.hashear_lote`. Con ``max_filas``
+    se deja de leer al pasar ese número de filas y se anota dónde se cortó.
+    """
+    if rol not in COLUMNAS:
+        raise ValueError(f'Rol no importable: {rol}')
+    importador = _Importador(rol, workers)
+    filas = leer_csv(lineas, rol)
+    leidas = 0
+    while True:
+        lote = list(itertools.islice(filas, tamano_lote))
+        if not lote:
+            break
+        if max_filas is not None and leidas + len(lote) > max_filas:
+            sobrante = max_filas - leidas
+            importador.procesar_lote(lote[:sobrante])
+            importador.resultado.error(
+                lote[sobrante][0],
+                f'Se importan hasta {max_filas} filas por archivo; desde esta línea no se importó.'
+            )
+            break
+        leidas += len(lote)
+        importador.procesar_lote(lote)
+    return importador.resultado
@@ -0,0 +1,113 @@
+import collections
+import re
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, raiseload
+
+# Instrumentación de SQL por request (SQL_INSTRUMENTACION).
+#
+# Los eventos del engine cuentan las sentencias de cada request y suman su
+# tiempo; la respuesta sale con un header Server-Timing que las devtools
+# del navegador muestran solas. Si una misma forma de sentencia (el SQL sin
+# los valores) se repite SQL_N1_UMBRAL veces o más en un request, es casi
+# seguro un N+1 y se deja un warning en el log.
+#
+# Con SQL_LAZY_RAISE (para desarrollo y pruebas) las relaciones que no se
+# cargaron en la consulta original levantan una excepción en vez de hacer
+# una consulta perezosa: un N+1 nuevo rompe en vez de llegar a producción.
+
+_CLAVE = '_sql_medicion'
+
+# "IN (?, ?, ?)" con cualquier cantidad de parámetros es la misma forma
+_LISTA_PARAMETROS = re.compile(r'\((?:\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%s|%\(\w+\)s|:\w+)\s*\)')
+
+
+class Medicion:
+    __slots__ = ('inicio', 'consultas', 'tiempo', 'formas')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.formas = collections.Counter()
+
+    def repetidas(self, umbral):
+        """[(veces, forma)] de las sentencias repetidas ``umbral`` veces o más."""
+        return [(veces, forma) for forma, veces in self.formas.most_common() if veces >= umbral]
+
+
+def forma(sentencia):
+    return _LISTA_PARAMETROS.sub('(...)', ' '.join(sentencia.split()))
+
+
+def medicion_actual():
+    """La Medicion del request en curso, o None si no se está midiendo."""
+    if not has_request_context():
+        return None
+    return g.get(_CLAVE)
+
+
+# --- Eventos del engine ---
+
+def _antes_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    if medicion_actual() is not None:
+        conn.info['_sql_inicio'] = time.perf_counter()
+
+
+def _despues_de_ejecutar(conn, cursor, sentencia, parametros, contexto, executemany):
+    medicion = medicion_actual()
+    inicio = conn.info.pop('_sql_inicio', None)
+    if medicion is None or inicio is None:
+        return
+    medicion.tiempo += time.perf_counter() - inicio
+    medicion.consultas += 1
+    medicion.formas[forma(sentencia)] += 1
+
+
+def _sin_carga_perezosa(estado):
+    # Sólo las consultas "de verdad": las cargas perezosas y de columnas
+    # diferidas que disparan ellas mismas no se tocan
+    if not estado.is_select or estado.is_relationship_load or estado.is_column_load:
+        return
+    if has_app_context() and current_app.config.get('SQL_LAZY_RAISE'):
+        estado.statement = estado.statement.options(raiseload('*', sql_only=True))
+
+
+# --- Request ---
+
+def _empezar():
+    g.setdefault(_CLAVE, Medicion())
+
+
+def _terminar(respuesta):
+    medicion = g.pop(_CLAVE, None)
+    if medicion is None:
+        return respuesta
+    total = (time.perf_counter() - medicion.inicio) * 1000
+    respuesta.headers.add(
+        'Server-Timing',
+        f'db;dur={medicion.tiempo * 1000:.1f};desc="{medicion.consultas} consultas", app;dur={total:.1f}'
+    )
+    for veces, sentencia in medicion.repetidas(current_app.config['SQL_N1_UMBRAL']):
+        current_app.logger.warning(
+            'Posible N+1 en %s %s: %d veces %s', request.method, request.path, veces, sentencia[:300]
+        )
+    return respuesta
+
+
+def init_app(app):
+    """Registra la medición por request si SQL_INSTRUMENTACION está activada.
+
+    Los eventos del engine y de la sesión se enganchan una sola vez por
+    proceso y no hacen nada fuera de un request medido.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _antes_de_ejecutar):
+        event.listen(Engine, 'before_cursor_execute', _antes_de_ejecutar)
+        event.listen(Engine, 'after_cursor_execute', _despues_de_ejecutar)
+        event.listen(Session, 'do_orm_execute', _sin_carga_perezosa)
+    if app.config['SQL_INSTRUMENTACION']:
+        app.before_request(_empezar)
+        app.after_request(_terminar)
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+import time
+
+from flask import request
+from flask_login import current_user
+from limits.storage import Storage
+from sqlalchemy.engine import make_url
+
+# Storage de Flask-Limiter compartido entre los workers de gunicorn de un
+# mismo host, sin levantar Redis ni Memcached: los contadores viven en un
+# archivo SQLite en modo WAL. Con synchronous=OFF cada incremento es una
+# sola sentencia (INSERT ... ON CONFLICT ... RETURNING) de pocas decenas de
+# microsegundos. Si la máquina se cae se pierden contadores, no datos.
+#
+#   RATELIMIT_STORAGE_URI = "iturnito+sqlite:////ruta/absoluta/ratelimit.sqlite"
+#   RATELIMIT_STORAGE_URI = "iturnito+sqlite:///ruta/relativa/ratelimit.sqlite"
+#
+# Igual que en las URLs de SQLite de SQLAlchemy: con tres barras la ruta es
+# relativa al directorio actual, con cuatro es absoluta.
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS limites (
+    clave TEXT PRIMARY KEY,
+    cantidad INTEGER NOT NULL,
+    vence REAL NOT NULL
+) WITHOUT ROWID
+"""
+
+_INCREMENTAR = """
+INSERT INTO limites (clave, cantidad, vence) VALUES (:clave, :cantidad, :vence)
+ON CONFLICT(clave) DO UPDATE SET
+    cantidad = CASE WHEN vence <= :ahora THEN excluded.cantidad ELSE cantidad + excluded.cantidad END,
+    vence = CASE WHEN vence <= :ahora THEN excluded.vence ELSE vence END
+RETURNING cantidad
+"""
+
+# Cada cuántos incrementos se borran las claves vencidas
+_LIMPIAR_CADA = 1000
+
+
+class AlmacenSQLite(Storage):
+    STORAGE_SCHEME = ['iturnito+sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.ruta = make_url(uri).database
+        if not self.ruta or self.ruta == ':memory:':
+            raise ValueError(
+                'iturnito+sqlite necesita la ruta del archivo: iturnito+sqlite:///relativa.sqlite '
+                'o iturnito+sqlite:////ruta/absoluta.sqlite'
+            )
+        directorio = os.path.dirname(self.ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._local = threading.local()
+        self._incrementos = 0
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso (gunicorn forkea los workers)
+        pid = os.getpid()
+        if getattr(self._local, 'pid', None) != pid:
+            conexion = sqlite3.connect(self.ruta, isolation_level=None, timeout=5)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=OFF')
+            conexion.execute(_ESQUEMA)
+            self._local.conexion = conexion
+            self._local.pid = pid
+        return self._local.conexion
+
+    def incr(self, key, expiry, amount=1):
+        ahora = time.time()
+        conexion = self._conexion()
+        fila = conexion.execute(_INCREMENTAR, {
+            'clave': key, 'cantidad': amount, 'vence': ahora + expiry, 'ahora': ahora
+        }).fetchone()
+        self._incrementos += 1
+        if self._incrementos % _LIMPIAR_CADA == 0:
+            conexion.execute('DELETE FROM limites WHERE vence <= ?', (ahora,))
+        return fila[0]
+
+    def get(self, key):
+        fila = self._conexion().execute(
+            'SELECT cantidad FROM limites WHERE clave = ? AND vence > ?', (key, time.time())
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    def get_expiry(self, key):
+        fila = self._conexion().execute(
+            'SELECT vence FROM limites WHERE clave = ? AND vence > ?', (key, time.time())
+        ).fetchone()
+        return fila[0] if fila else time.time()
+
+    def check(self):
+        try:
+            self._conexion().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conexion().execute('DELETE FROM limites').rowcount
+
+    def clear(self, key):
+        self._conexion().execute('DELETE FROM limites WHERE clave = ?', (key,))
+
+
+def clave_usuario_o_ip():
+    """Clave de rate limit: el usuario logueado o, si no hay, la IP."""
+    if current_user.is_authenticated:
+        return f'user:{current_user.id}'
+    return request.remote_addr or '127.0.0.1'
@@ -0,0 +1,164 @@
+from flask import current_app
+from sqlalchemy import func, insert, select, update
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.notificacion import Notificacion
+from app.models.paciente import Paciente
+from app.models.user import User
+from app.services import cambios_turnos
+from app.services.cache import TTLCache
+from app.services.paginacion import paginar
+
+# Notificaciones de los usuarios.
+#
+# Las de turnos se crean solas: cada reserva, cancelación o turno
+# completado inserta los avisos del paciente y del doctor en la misma
+# transacción que el cambio (un INSERT por flush, sin importar cuántos
+# turnos cambien). El conteo de no leídas, que se pide en cada pantalla,
+# se cachea por usuario y se descarta al crear o marcar notificaciones.
+
+_no_leidas = TTLCache(ttl=60, max_entradas=20000)
+
+# user_id de cada perfil (('paciente'|'doctor', id) -> user_id). No cambia
+# nunca, así que después del commit se sabe a quién invalidar sin consultar.
+_usuarios_de_perfil = TTLCache(ttl=3600, max_entradas=20000)
+
+FORMATO_FECHA = '%d/%m/%Y %H:%M'
+
+
+# --- Consultas ---
+
+def contar_no_leidas(user_id):
+    """Notificaciones sin leer del usuario (cacheado unos segundos)."""
+    cantidad = _no_leidas.get(user_id)
+    if cantidad is None:
+        cantidad = db.session.scalar(
+            select(func.count()).select_from(Notificacion)
+            .where(Notificacion.user_id == user_id, Notificacion.leida.is_(False))
+        )
+        _no_leidas.set(user_id, cantidad, ttl=current_app.config['NOTIFICACIONES_TTL'])
+    return cantidad
+
+
+def listar(user_id, solo_no_leidas=False, despues=None, antes=None, por_pagina=50):
+    """Página de notificaciones del usuario, de la más nueva a la más vieja."""
+    query = Notificacion.query.filter(Notificacion.user_id == user_id)
+    if solo_no_leidas:
+        query = query.filter(Notificacion.leida.is_(False))
+    return paginar(
+        query, [Notificacion.creado_en, Notificacion.id],
+        despues=despues, antes=antes, por_pagina=por_pagina, descendente=True
+    )
+
+
+# --- Altas y lecturas ---
+
+def crear(user_id, tipo, titulo, mensaje=None, turno_id=None):
+    """Agrega una notificación a la sesión (se guarda con el próximo commit)."""
+    notificacion = Notificacion(user_id=user_id, tipo=tipo, titulo=titulo, mensaje=mensaje, turno_id=turno_id)
+    db.session.add(notificacion)
+    invalidar(user_id)
+    return notificacion
+
+
+def marcar_leidas(user_id, ids=None):
+    """Marca como leídas las notificaciones ``ids`` del usuario (todas si es None).
+
+    Un solo UPDATE; devuelve cuántas cambiaron. Hay que hacer commit.
+    """
+    stmt = update(Notificacion).where(
+        Notificacion.user_id == user_id, Notificacion.leida.is_(False)
+    ).values(leida=True)
+    if ids is not None:
+        if not ids:
+            return 0
+        stmt = stmt.where(Notificacion.id.in_(ids))
+    cantidad = db.session.execute(stmt, execution_options={'synchronize_session': False}).rowcount
+    invalidar(user_id)
+    return cantidad
+
+
+def invalidar(user_id):
+    _no_leidas.delete(user_id)
+
+
+# --- Avisos de turnos ---
+
+def _evento(cambio):
+    """Tipo de aviso que genera un cambio de turno, o None."""
+    anterior, nuevo = cambio.anterior, cambio.nuevo
+    if nuevo is None:
+        return None
+    if anterior is None:
+        return 'turno_reservado' if nuevo.estado != 'cancelado' else None
+    if nuevo.estado != anterior.estado:
+        if nuevo.estado == 'cancelado':
+            return 'turno_cancelado'
+        if nuevo.estado == 'completado':
+            return 'turno_completado'
+    return None
+
+
+def _nombres(conexion, perfil, ids):
+    """{id de perfil: (user_id, nombre)} de pacientes o doctores, en una consulta."""
+    filas = conexion.execute(
+        select(perfil.id, perfil.user_id, User.name)
+        .join(User, User.id == perfil.user_id)
+        .where(perfil.id.in_(ids))
+    )
+    return {perfil_id: (user_id, nombre) for perfil_id, user_id, nombre in filas}
+
+
+def _avisos(evento, fecha, paciente, doctor):
+    """(user_id, título, mensaje) para cada destinatario de un evento."""
+    if evento == 'turno_reservado':
+        return [
+            (paciente[0], 'Turno reservado', f'Tu turno con {doctor[1]} el {fecha} quedó reservado.'),
+            (doctor[0], 'Nuevo turno', f'{paciente[1]} reservó un turno para el {fecha}.'),
+        ]
+    if evento == 'turno_cancelado':
+        return [
+            (paciente[0], 'Turno cancelado', f'Tu turno con {doctor[1]} del {fecha} fue cancelado.'),
+            (doctor[0], 'Turno cancelado', f'El turno de {paciente[1]} del {fecha} fue cancelado.'),
+        ]
+    return [
+        (paciente[0], 'Turno completado', f'Tu turno con {doctor[1]} del {fecha} figura como completado.'),
+    ]
+
+
+@cambios_turnos.en_transaccion
+def _notificar_cambios(conexion, cambios):
+    eventos = [(cambio, _evento(cambio)) for cambio in cambios]
+    eventos = [(cambio, evento) for cambio, evento in eventos if evento]
+    if not eventos:
+        return
+    pacientes = _nombres(conexion, Paciente, {c.paciente_id for c, _ in eventos})
+    # doctor_id puede llegar como texto desde el JSON de la reserva
+    doctores = _nombres(conexion, Doctor, {int(c.doctor_id) for c, _ in eventos})
+
+    filas = []
+    for cambio, evento in eventos:
+        paciente = pacientes.get(cambio.paciente_id)
+        doctor = doctores.get(int(cambio.doctor_id))
+        if paciente is None or doctor is None:
+            continue
+        _usuarios_de_perfil.set(('paciente', cambio.paciente_id), paciente[0])
+        _usuarios_de_perfil.set(('doctor', int(cambio.doctor_id)), doctor[0])
+        fecha = cambio.nuevo.fecha_hora.strftime(FORMATO_FECHA)
+        for user_id, titulo, mensaje in _avisos(evento, fecha, paciente, doctor):
+            filas.append({
+                'user_id': user_id, 'tipo': evento, 'titulo': titulo, 'mensaje': mensaje,
+                'turno_id': cambio.turno_id,
+            })
+    if filas:
+        conexion.execute(insert(Notificacion.__table__), filas)
+
+
+@cambios_turnos.al_confirmar
+def _invalidar_conteos(cambios):
+    for cambio in cambios:
+        for clave in (('paciente', cambio.paciente_id), ('doctor', int(cambio.doctor_id))):
+            user_id = _usuarios_de_perfil.get(clave)
+            if user_id is not None:
+                invalidar(user_id)
@@ -0,0 +1,96 @@
+import base64
+import datetime
+import json
+
+from flask import current_app, request
+from sqlalchemy import tuple_
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+class Pagina:
+    """Resultado de una consulta paginada por clave (keyset)."""
+
+    def __init__(self, items, siguiente=None, anterior=None, por_pagina=None):
+        self.items = items
+        self.siguiente = siguiente  # cursor para ?despues=
+        self.anterior = anterior    # cursor para ?antes=
+        self.por_pagina = por_pagina
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def codificar_cursor(valores):
+    crudo = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in valores]
+    texto = json.dumps(crudo, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(texto).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, columnas):
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        crudo = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if not isinstance(crudo, list) or len(crudo) != len(columnas):
+            raise CursorInvalido(cursor)
+        valores = []
+        for valor, columna in zip(crudo, columnas):
+            if columna.type.python_type is datetime.datetime:
+                valor = datetime.datetime.fromisoformat(valor)
+            elif columna.type.python_type is int:
+                valor = int(valor)
+            valores.append(valor)
+        return valores
+    except (ValueError, TypeError, NotImplementedError) as e:
+        raise CursorInvalido(cursor) from e
+
+
+def por_pagina_desde_request(default=None):
+    """Tamaño de página pedido en ?por_pagina=, acotado por la configuración."""
+    maximo = current_app.config['PAGINA_MAX']
+    default = default or current_app.config['PAGINA_DEFAULT']
+    return max(1, min(request.args.get('por_pagina', default, type=int) or default, maximo))
+
+
+def paginar(query, columnas, despues=None, antes=None, por_pagina=50, descendente=False):
+    """Pagina ``query`` por la tupla ``columnas`` sin usar OFFSET.
+
+    La última columna tiene que desempatar (normalmente el id). Con
+    ``despues`` se avanza desde un cursor y con ``antes`` se retrocede;
+    cada página cuesta lo mismo sin importar qué tan lejos esté.
+    """
+    clave = tuple_(*columnas)
+    hacia_atras = antes is not None and despues is None
+
+    if despues is not None:
+        valores = tuple_(*decodificar_cursor(despues, columnas))
+        query = query.filter(clave < valores if descendente else clave > valores)
+    elif antes is not None:
+        valores = tuple_(*decodificar_cursor(antes, columnas))
+        query = query.filter(clave > valores if descendente else clave < valores)
+
+    # Para retroceder se recorre en el orden inverso y después se da vuelta
+    orden_desc = descendente != hacia_atras
+    query = query.order_by(*[c.desc() if orden_desc else c.asc() for c in columnas])
+    filas = query.limit(por_pagina + 1).all()
+
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if hacia_atras:
+        filas.reverse()
+
+    def cursor_de(fila):
+        return codificar_cursor([getattr(fila, c.key) for c in columnas])
+
+    siguiente = anterior = None
+    if filas:
+        if hay_mas or hacia_atras:
+            siguiente = cursor_de(filas[-1])
+        if (hay_mas and hacia_atras) or despues is not None:
+            anterior = cursor_de(filas[0])
+    return Pagina(filas, siguiente=siguiente, anterior=anterior, por_pagina=por_pagina)
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+# Telemetría del pool de conexiones, para dimensionarlo con datos.
+#
+# PoolMedido es el QueuePool de siempre midiendo cuánto espera cada
+# checkout (incluye abrir la conexión si hace falta una nueva) y cuántos
+# se vencieron por pool_timeout. Cada worker de gunicorn tiene su propio
+# pool, así que los números son del proceso que contesta.
+
+# Límites (segundos) del histograma de esperas; el último tramo es "más"
+TRAMOS_ESPERA = (0.001, 0.005, 0.025, 0.1, 0.5, 2.0)
+ETIQUETAS_TRAMOS = tuple(f'<={int(limite * 1000)}ms' for limite in TRAMOS_ESPERA) + ('mas',)
+
+
+class _Medicion:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.checkouts = 0
+        self.vencidos = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.histograma = [0] * (len(TRAMOS_ESPERA) + 1)
+        self.desde = time.time()
+
+    def registrar(self, espera, vencido=False):
+        with self.lock:
+            if vencido:
+                self.vencidos += 1
+                return
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            i = 0
+            while i < len(TRAMOS_ESPERA) and espera > TRAMOS_ESPERA[i]:
+                i += 1
+            self.histograma[i] += 1
+
+
+_medicion = _Medicion()
+
+
+class PoolMedido(QueuePool):
+    """QueuePool que registra la espera de cada checkout."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            _medicion.registrar(time.perf_counter() - inicio, vencido=True)
+            raise
+        _medicion.registrar(time.perf_counter() - inicio)
+        return conexion
+
+
+def estadisticas(engine, max_desborde=None):
+    """Ocupación actual del pool de ``engine`` y esperas desde el último reinicio.
+
+    ``max_desborde`` es el max_overflow con el que se armó el engine (ver
+    configs/motor.py): el pool no lo expone.
+    """
+    pool = engine.pool
+    datos = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        datos.update(
+            tamano=pool.size(),
+            en_uso=pool.checkedout(),
+            libres=pool.checkedin(),
+            # Negativo mientras no se abrieron todas las conexiones del pool
+            desborde=pool.overflow(),
+            max_desborde=max_desborde,
+            timeout=pool.timeout(),
+        )
+    with _medicion.lock:
+        checkouts = _medicion.checkouts
+        datos.update(
+            checkouts=checkouts,
+            vencidos=_medicion.vencidos,
+            espera_media_ms=round(_medicion.espera_total / checkouts * 1000, 3) if checkouts else 0.0,
+            espera_max_ms=round(_medicion.espera_max * 1000, 3),
+            histograma_espera=dict(zip(ETIQUETAS_TRAMOS, _medicion.histograma)),
+            medido_desde=_medicion.desde,
+        )
+    return datos
+
+
+def reiniciar():
+    with _medicion.lock:
+        _medicion.reiniciar()
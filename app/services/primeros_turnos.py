@@ -0,0 +1,105 @@
+import datetime
+import heapq
+
+from flask import current_app
+from sqlalchemy import func, select
+
+from app.extensions import db
+from app.models.configuracion_horario import ConfiguracionHorario
+from app.models.doctor import Doctor
+from app.services import agenda, excepciones
+from app.services.fechas import rango_dias
+
+# Primeros turnos libres entre todos los doctores que cumplen un filtro.
+#
+# Cada doctor aporta un generador de sus slots libres en orden de fecha y
+# hora, y los generadores se mezclan con un heap hasta juntar ``cantidad``.
+# Antes de calcular un día el generador entrega una cota (el primer slot
+# de ese día según la plantilla): mientras esa cota no llegue al tope del
+# heap el día no se calcula ni se consulta. Así el trabajo depende de la
+# cantidad pedida y no de cuántos doctores haya ni de cuántos días se mire.
+
+# Días de turnos que se leen juntos cuando un doctor necesita ocupación
+TRAMO_DIAS = 7
+
+
+def doctores_candidatos(especialidad_id=None, modalidad=None, precio_min=None, precio_max=None):
+    """ids de los doctores que cumplen el filtro. Sin configuración cuentan
+    como presenciales y sin cargo, igual que en la pantalla de reserva."""
+    modalidad_col = func.coalesce(ConfiguracionHorario.modalidad, 'presencial')
+    precio_col = func.coalesce(ConfiguracionHorario.precio_consulta, 0.0)
+    stmt = select(Doctor.id).outerjoin(ConfiguracionHorario, ConfiguracionHorario.doctor_id == Doctor.id)
+    if especialidad_id is not None:
+        stmt = stmt.where(Doctor.especialidad_id == especialidad_id)
+    if modalidad:
+        stmt = stmt.where(modalidad_col == modalidad)
+    if precio_min is not None:
+        stmt = stmt.where(precio_col >= precio_min)
+    if precio_max is not None:
+        stmt = stmt.where(precio_col <= precio_max)
+    return list(db.session.scalars(stmt.order_by(Doctor.id)))
+
+
+def slots_del_doctor(doctor_id, plantilla, intervalos, now, hasta):
+    """Genera (fecha_hora, libre) en orden: una cota por día con horario
+    (libre=False) y después los slots libres de ese día (libre=True)."""
+    fecha = now.date()
+    # Hoy sólo cuentan los slots posteriores a ``now`` (ver mascara_pasada)
+    minuto_pasado = now.hour * 60 + now.minute
+    leido_hasta = None
+    reservados = {}
+    while fecha <= hasta:
+        plantilla_dia = plantilla.dias.get(fecha.weekday())
+        primero = None
+        if plantilla_dia is not None:
+            primero = plantilla_dia.primer_minuto_despues(minuto_pasado if fecha == now.date() else -1)
+        if primero is not None:
+            comienzo = datetime.datetime.combine(fecha, datetime.time())
+            yield comienzo + datetime.timedelta(minutes=primero), False
+
+            if leido_hasta is None or fecha > leido_hasta:
+                leido_hasta = min(fecha + datetime.timedelta(days=TRAMO_DIAS - 1), hasta)
+                reservados = agenda.minutos_reservados_rango(doctor_id, fecha, leido_hasta)
+            bloqueados = agenda.mascara_pasada(plantilla_dia, fecha, now)
+            bloqueados |= plantilla_dia.mascara_de(reservados.get(fecha, ()))
+            if intervalos:
+                bloqueados |= agenda.mascara_excepciones(plantilla, plantilla_dia, intervalos, fecha)
+            for minuto in plantilla_dia.minutos_ordenados_de(plantilla_dia.mascara_total & ~bloqueados):
+                yield comienzo + datetime.timedelta(minutes=minuto), True
+        fecha += datetime.timedelta(days=1)
+
+
+def _avanzar(heap, doctor_id, generador):
+    siguiente = next(generador, None)
+    if siguiente is not None:
+        fecha_hora, libre = siguiente
+        # A igual hora los slots libres salen antes que las cotas: una cota
+        # no puede dar nada anterior, así que no hace falta calcularla
+        heapq.heappush(heap, (fecha_hora, not libre, doctor_id, generador))
+
+
+def primeros_libres(doctor_ids, cantidad, now=None, dias=None):
+    """Los ``cantidad`` primeros slots libres entre ``doctor_ids``, como
+    pares (doctor_id, fecha_hora) en orden de fecha y hora."""
+    now = now or datetime.datetime.now()
+    dias = dias or current_app.config['PRIMEROS_TURNOS_DIAS']
+    hasta = now.date() + datetime.timedelta(days=dias - 1)
+    # Con las versiones, un horario que otro worker cambió no se usa viejo
+    versiones = agenda.versiones_horario(doctor_ids)
+    plantillas = {d: p for d, p in agenda.obtener_plantillas(doctor_ids, versiones).items() if p.dias}
+    if not plantillas or cantidad <= 0:
+        return []
+    intervalos = excepciones.intervalos_por_doctor(plantillas, *rango_dias(now.date(), hasta))
+
+    heap = []
+    for doctor_id, plantilla in plantillas.items():
+        generador = slots_del_doctor(doctor_id, plantilla, intervalos.get(doctor_id), now, hasta)
+        _avanzar(heap, doctor_id, generador)
+
+    resultado = []
+    while heap and len(resultado) < cantidad:
+        fecha_hora, es_cota, doctor_id, generador = heapq.heappop(heap)
+        if not es_cota:
+            resultado.append((doctor_id, fecha_hora))
+        _avanzar(heap, doctor_id, generador)
+    return resultado
@@ -0,0 +1,81 @@
+import datetime
+
+from flask import current_app
+from sqlalchemy import String, and_, cast, literal, select
+from sqlalchemy.orm import joinedload
+
+from app.extensions import db
+from app.models.doctor import Doctor
+from app.models.paciente import Paciente
+from app.models.trabajo import Trabajo
+from app.models.turno import Turno
+from app.services import notificaciones, trabajos
+from app.services.remitentes import Mensaje, obtener_remitente
+
+# Recordatorios de turnos.
+#
+# programar() busca los turnos pendientes que empiezan dentro de las
+# próximas RECORDATORIO_ANTICIPACION_HORAS y encola un trabajo por turno
+# (clave 'recordatorio:<id>', así nunca se encola dos veces). El worker los
+# manda por lote con el remitente configurado y deja además una notificación
+# en la app.
+
+TIPO = 'recordatorio_turno'
+PREFIJO_CLAVE = 'recordatorio:'
+FORMATO_FECHA = '%d/%m/%Y %H:%M'
+
+
+def programar(ahora=None):
+    """Encola los recordatorios que faltan. Devuelve cuántos encoló (hay que hacer commit)."""
+    ahora = ahora or datetime.datetime.now()
+    hasta = ahora + datetime.timedelta(hours=current_app.config['RECORDATORIO_ANTICIPACION_HORAS'])
+    ya_encolado = select(Trabajo.id).where(
+        Trabajo.clave == literal(PREFIJO_CLAVE) + cast(Turno.id, String)
+    ).exists()
+    ids = db.session.scalars(
+        select(Turno.id).where(
+            Turno.estado == 'pendiente',
+            and_(Turno.fecha_hora > ahora, Turno.fecha_hora <= hasta),
+            ~ya_encolado
+        ).order_by(Turno.fecha_hora)
+    ).all()
+    return trabajos.encolar_lote([
+        {'tipo': TIPO, 'datos': {'turno_id': turno_id}, 'clave': f'{PREFIJO_CLAVE}{turno_id}'}
+        for turno_id in ids
+    ])
+
+
+@trabajos.tarea(TIPO)
+def enviar_recordatorios(lote):
+    """Manda los recordatorios de un lote de trabajos con un solo envío."""
+    turno_de = {t.id: t.parametros.get('turno_id') for t in lote}
+    turnos = {
+        turno.id: turno
+        for turno in Turno.query.options(
+            joinedload(Turno.paciente).joinedload(Paciente.user),
+            joinedload(Turno.doctor).joinedload(Doctor.user),
+        ).filter(Turno.id.in_(set(turno_de.values())))
+    }
+
+    mensajes = []
+    avisos = []
+    for trabajo_id, turno_id in turno_de.items():
+        turno = turnos.get(turno_id)
+        # Cancelado o borrado desde que se encoló: no hay nada que recordar
+        if turno is None or turno.estado not in ('pendiente', 'confirmado'):
+            continue
+        usuario = turno.paciente.user
+        cuando = turno.fecha_hora.strftime(FORMATO_FECHA)
+        texto = f'Te recordamos tu turno con {turno.doctor.user.name} el {cuando}.'
+        mensajes.append(Mensaje(usuario.email, 'Recordatorio de turno', texto, referencia=trabajo_id))
+        avisos.append((trabajo_id, usuario.id, texto, turno.id))
+
+    if not mensajes:
+        return {}
+    errores = obtener_remitente().enviar_lote(mensajes)
+    # La notificación en la app sólo para los que salieron: los demás se
+    # reintentan y la crearían dos veces
+    for trabajo_id, user_id, texto, turno_id in avisos:
+        if trabajo_id not in errores:
+            notificaciones.crear(user_id, 'recordatorio', 'Recordatorio de turno', texto, turno_id=turno_id)
+    return errores
@@ -0,0 +1,63 @@
+import datetime
+import importlib
+import json
+import os
+
+from flask import current_app
+
+# Envío de mensajes (recordatorios, avisos) a los usuarios.
+#
+# El remitente se elige con REMITENTE ("modulo:Clase"); cualquier clase con
+# enviar_lote(mensajes) sirve. RemitenteArchivo, el default, no manda nada:
+# agrega cada mensaje como una línea JSON en ENVIOS_DIR/<fecha>.ndjson, para
+# desarrollo y para revisar qué se hubiera enviado.
+
+
+class Mensaje:
+
+    __slots__ = ('destinatario', 'asunto', 'cuerpo', 'referencia')
+
+    def __init__(self, destinatario, asunto, cuerpo, referencia=None):
+        self.destinatario = destinatario
+        self.asunto = asunto
+        self.cuerpo = cuerpo
+        self.referencia = referencia  # id propio para asociar errores
+
+    def to_dict(self):
+        return {
+            'destinatario': self.destinatario,
+            'asunto': self.asunto,
+            'cuerpo': self.cuerpo,
+            'referencia': self.referencia,
+        }
+
+
+class Remitente:
+    """Interfaz: ``enviar_lote`` devuelve {referencia: error} de los que fallaron."""
+
+    def enviar_lote(self, mensajes):
+        raise NotImplementedError
+
+
+class RemitenteArchivo(Remitente):
+
+    def __init__(self, directorio=None):
+        self.directorio = directorio or current_app.config['ENVIOS_DIR'] \
+            or os.path.join(current_app.instance_path, 'envios')
+
+    def enviar_lote(self, mensajes):
+        os.makedirs(self.directorio, exist_ok=True)
+        ahora = datetime.datetime.now()
+        ruta = os.path.join(self.directorio, f'{ahora:%Y-%m-%d}.ndjson')
+        with open(ruta, 'a', encoding='utf-8') as archivo:
+            for mensaje in mensajes:
+                datos = mensaje.to_dict()
+                datos['enviado_en'] = ahora.isoformat(timespec='seconds')
+                archivo.write(json.dumps(datos, ensure_ascii=False) + '\n')
+        return {}
+
+
+def obtener_remitente():
+    """Instancia del remitente configurado en REMITENTE."""
+    modulo, _, clase = current_app.config['REMITENTE'].partition(':')
+    return getattr(importlib.import_module(modulo), clase)()
@@ -0,0 +1,203 @@
+import datetime
+
+from flask import current_app
+from sqlalchemy import Float, case, cast, func, literal_column, select
+
+from app.extensions import db
+from app.models.configuracion_horario import ConfiguracionHorario
+from app.models.doctor import Doctor
+from app.models.especialidad import Especialidad
+from app.models.estadistica_diaria import EstadisticaDiaria
+from app.models.user import User
+from app.services import cambios_turnos
+from app.services.cache import TTLCache
+
+# Reportes del panel de admin.
+#
+# Todo sale de estadisticas_diarias (un contador por día, doctor y estado),
+# no de la tabla turnos: un año de reporte son a lo sumo 365 filas por
+# doctor y estado. Las agregaciones, tasas y comparaciones entre meses se
+# hacen en SQL con GROUP BY y funciones de ventana.
+#
+# Cada reporte se cachea por combinación de parámetros; un cambio de turno
+# descarta sólo los reportes cuyo rango incluye la fecha afectada.
+
+_reportes = TTLCache(ttl=300, max_entradas=500)
+
+E = EstadisticaDiaria
+
+
+class Filtros:
+    """Parámetros de un reporte: rango de fechas inclusive y opcionalmente
+    una especialidad o un doctor."""
+
+    def __init__(self, desde, hasta, especialidad_id=None, doctor_id=None):
+        if desde > hasta:
+            raise ValueError('La fecha inicial es posterior a la final.')
+        self.desde = desde
+        self.hasta = hasta
+        self.especialidad_id = especialidad_id
+        self.doctor_id = doctor_id
+
+    @classmethod
+    def por_defecto(cls, hoy=None):
+        """Los últimos doce meses, incluido el actual completo."""
+        hoy = hoy or datetime.date.today()
+        mes, anio = hoy.month - 11, hoy.year
+        if mes < 1:
+            mes, anio = mes + 12, anio - 1
+        siguiente = datetime.date(hoy.year + hoy.month // 12, hoy.month % 12 + 1, 1)
+        return cls(datetime.date(anio, mes, 1), siguiente - datetime.timedelta(days=1))
+
+    def clave(self):
+        return (self.desde, self.hasta, self.especialidad_id, self.doctor_id)
+
+    def aplicar(self, stmt):
+        stmt = stmt.where(E.fecha >= self.desde, E.fecha <= self.hasta)
+        if self.especialidad_id:
+            stmt = stmt.where(E.especialidad_id == self.especialidad_id)
+        if self.doctor_id:
+            stmt = stmt.where(E.doctor_id == self.doctor_id)
+        return stmt
+
+
+def _mes(columna):
+    """'YYYY-MM' de una columna de fecha, según el motor."""
+    dialecto = db.engine.dialect.name
+    if dialecto == 'postgresql':
+        return func.to_char(columna, 'YYYY-MM')
+    if dialecto == 'sqlite':
+        return func.strftime('%Y-%m', columna)
+    return func.date_format(columna, '%Y-%m')
+
+
+def _suma_estado(estado):
+    return func.sum(case((E.estado == estado, E.cantidad), else_=0))
+
+
+def _tasa(parte, total):
+    return cast(parte, Float) / func.nullif(total, 0)
+
+
+def _cacheado(nombre, filtros, calcular):
+    clave = (nombre,) + filtros.clave()
+    resultado = _reportes.get(clave)
+    if resultado is None:
+        resultado = calcular(filtros)
+        _reportes.set(clave, resultado, ttl=current_app.config['REPORTES_TTL'])
+    return resultado
+
+
+# --- Reportes ---
+
+def _turnos_por_doctor_mes(filtros):
+    base = filtros.aplicar(select(
+        _mes(E.fecha).label('mes'),
+        E.doctor_id,
+        func.sum(E.cantidad).label('total'),
+        _suma_estado('completado').label('completados'),
+        _suma_estado('cancelado').label('cancelados'),
+    ).group_by(literal_column('mes'), E.doctor_id)).subquery()
+
+    por_doctor = {'partition_by': base.c.doctor_id, 'order_by': base.c.mes}
+    stmt = select(
+        base.c.mes, base.c.doctor_id, User.name.label('doctor'),
+        base.c.total, base.c.completados, base.c.cancelados,
+        func.rank().over(partition_by=base.c.mes, order_by=base.c.total.desc()).label('puesto'),
+        func.sum(base.c.total).over(**por_doctor).label('acumulado'),
+        (base.c.total - func.lag(base.c.total).over(**por_doctor)).label('variacion'),
+    ).join(Doctor, Doctor.id == base.c.doctor_id)\
+     .join(User, User.id == Doctor.user_id)\
+     .where(base.c.total > 0)\
+     .order_by(base.c.mes, literal_column('puesto'), User.name)
+    return [dict(fila._mapping) for fila in db.session.execute(stmt)]
+
+
+def _tasas_por_doctor(filtros):
+    total = func.sum(E.cantidad)
+    completados = _suma_estado('completado')
+    cancelados = _suma_estado('cancelado')
+    base = filtros.aplicar(select(
+        E.doctor_id,
+        total.label('total'),
+        completados.label('completados'),
+        cancelados.label('cancelados'),
+        _tasa(completados, total).label('tasa_completados'),
+        _tasa(cancelados, total).label('tasa_cancelacion'),
+        # Anticipación promedio entre la reserva y el turno, en horas
+        (_tasa(func.sum(E.anticipacion_minutos), func.sum(E.anticipacion_turnos)) / 60).label('anticipacion_horas'),
+    ).group_by(E.doctor_id)).subquery()
+
+    stmt = select(
+        base, User.name.label('doctor'), Especialidad.nombre.label('especialidad'),
+        _tasa(base.c.total, func.sum(base.c.total).over()).label('participacion'),
+    ).join(Doctor, Doctor.id == base.c.doctor_id)\
+     .join(User, User.id == Doctor.user_id)\
+     .outerjoin(Especialidad, Especialidad.id == Doctor.especialidad_id)\
+     .where(base.c.total > 0)\
+     .order_by(base.c.total.desc(), User.name)
+    return [dict(fila._mapping) for fila in db.session.execute(stmt)]
+
+
+def _ingresos_por_mes(filtros):
+    # Turnos completados por el precio de consulta actual del doctor: no hay
+    # histórico de precios.
+    ingresos = func.sum(case(
+        (E.estado == 'completado', E.cantidad * func.coalesce(ConfiguracionHorario.precio_consulta, 0)),
+        else_=0
+    ))
+    base = filtros.aplicar(select(
+        _mes(E.fecha).label('mes'),
+        _suma_estado('completado').label('completados'),
+        ingresos.label('ingresos'),
+    ).outerjoin(ConfiguracionHorario, ConfiguracionHorario.doctor_id == E.doctor_id)
+     .group_by(literal_column('mes'))).subquery()
+
+    stmt = select(
+        base,
+        func.sum(base.c.ingresos).over(order_by=base.c.mes).label('acumulado'),
+        (base.c.ingresos - func.lag(base.c.ingresos).over(order_by=base.c.mes)).label('variacion'),
+    ).order_by(base.c.mes)
+    return [dict(fila._mapping) for fila in db.session.execute(stmt)]
+
+
+def _resumen(filtros):
+    total = func.sum(E.cantidad)
+    fila = db.session.execute(filtros.aplicar(select(
+        func.coalesce(total, 0).label('total'),
+        _tasa(_suma_estado('completado'), total).label('tasa_completados'),
+        _tasa(_suma_estado('cancelado'), total).label('tasa_cancelacion'),
+        (_tasa(func.sum(E.anticipacion_minutos), func.sum(E.anticipacion_turnos)) / 60).label('anticipacion_horas'),
+    ))).one()
+    return dict(fila._mapping)
+
+
+def turnos_por_doctor_mes(filtros):
+    """Turnos por doctor y mes, con puesto en el mes, acumulado y variación."""
+    return _cacheado('doctor_mes', filtros, _turnos_por_doctor_mes)
+
+
+def tasas_por_doctor(filtros):
+    """Tasas de completados y cancelados, anticipación y participación por doctor."""
+    return _cacheado('tasas', filtros, _tasas_por_doctor)
+
+
+def ingresos_por_mes(filtros):
+    """Ingresos por mes (completados x precio de consulta) con acumulado."""
+    return _cacheado('ingresos', filtros, _ingresos_por_mes)
+
+
+def resumen(filtros):
+    """Totales del período."""
+    return _cacheado('resumen', filtros, _resumen)
+
+
+def invalidar():
+    """Descarta todos los reportes (por ejemplo, si cambia un precio de consulta)."""
+    _reportes.clear()
+
+
+@cambios_turnos.al_confirmar
+def _invalidar_reportes(cambios):
+    fechas = {fecha for _, fecha in cambios_turnos.afectadas(cambios)}
+    _reportes.descartar_si(lambda clave: any(clave[1] <= fecha <= clave[2] for fecha in fechas))
@@ -0,0 +1,275 @@
+import datetime
+import random
+
+from sqlalchemy import func, insert, select
+
+from app.extensions import db
+from app.models.configuracion_horario import ConfiguracionHorario
+from app.models.doctor import Doctor
+from app.models.especialidad import Especialidad
+from app.models.horario_disponible import HorarioDisponible
+from app.models.paciente import Paciente
+from app.models.turno import Turno
+from app.models.user import User
+from app.services import agenda, contrasenas, estadisticas
+
+# Datos sintéticos para pruebas de carga y benchmarks (``flask seed``).
+#
+# Todo se inserta con INSERT masivos por lotes, sin pasar por el flush del
+# ORM: no se generan notificaciones ni eventos, y al final se reconstruyen
+# las estadísticas y se cambia la versión general de las agendas. Los
+# usuarios comparten una sola contraseña (un único hash bcrypt) y su email
+# lleva el prefijo de la corrida, así el harness de carga puede loguearse
+# como cualquiera de ellos.
+
+DOMINIO = 'iturnito.test'
+TAMANO_LOTE = 5000
+
+ESPECIALIDADES = (
+    'Clínica Médica', 'Pediatría', 'Cardiología', 'Dermatología', 'Ginecología',
+    'Traumatología', 'Oftalmología', 'Otorrinolaringología', 'Neurología',
+    'Psiquiatría', 'Endocrinología', 'Gastroenterología', 'Urología', 'Nutrición',
+)
+NOMBRES = (
+    'Sofía', 'Mateo', 'Valentina', 'Santiago', 'Martina', 'Benjamín', 'Lucía',
+    'Joaquín', 'Catalina', 'Tomás', 'Emma', 'Lautaro', 'Julieta', 'Felipe',
+    'Camila', 'Bautista', 'Mía', 'Thiago', 'Paula', 'Agustín',
+)
+APELLIDOS = (
+    'González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez',
+    'Pérez', 'García', 'Sánchez', 'Romero', 'Sosa', 'Álvarez', 'Torres', 'Ruiz',
+    'Ramírez', 'Flores', 'Acosta', 'Benítez', 'Medina',
+)
+OBRAS_SOCIALES = ('OSDE', 'Swiss Medical', 'Galeno', 'IOMA', 'PAMI', 'Medifé', None)
+DURACIONES = (15, 20, 30, 30, 30, 45)
+# Bloques típicos de atención (hora de inicio, hora de fin)
+MANANAS = ((8, 12), (9, 13), (9, 12))
+TARDES = ((14, 18), (15, 19), (16, 20))
+
+
+class YaSembrado(RuntimeError):
+    pass
+
+
+def email(prefijo, rol, i):
+    """Email del usuario sintético ``i`` de ``rol`` (lo usa el harness de carga)."""
+    return f'{prefijo}.{rol}{i}@{DOMINIO}'
+
+
+def _nombre(azar):
+    return f'{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)}'
+
+
+def _lotes(filas, tamano=TAMANO_LOTE):
+    for i in range(0, len(filas), tamano):
+        yield filas[i:i + tamano]
+
+
+def _insertar_usuarios(prefijo, rol, cantidad, password_hash, azar):
+    """Inserta ``cantidad`` usuarios de ``rol`` y devuelve sus ids en orden."""
+    ids = []
+    letra = rol[0].upper()
+    for desde in range(0, cantidad, TAMANO_LOTE):
+        filas = [
+            {
+                'name': _nombre(azar),
+                'email': email(prefijo, rol, i),
+                'password_hash': password_hash,
+                'rol': rol,
+                'telefono': f'11{azar.randrange(10 ** 8):08d}',
+                'dni': f'{prefijo}{letra}{i}'[:20],
+            }
+            for i in range(desde, min(desde + TAMANO_LOTE, cantidad))
+        ]
+        ids.extend(db.session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True), filas
+        ))
+    return ids
+
+
+def _especialidades():
+    existentes = dict(db.session.execute(select(Especialidad.nombre, Especialidad.id)).all())
+    faltantes = [{'nombre': nombre} for nombre in ESPECIALIDADES if nombre not in existentes]
+    if faltantes:
+        db.session.execute(insert(Especialidad), faltantes)
+        existentes = dict(db.session.execute(select(Especialidad.nombre, Especialidad.id)).all())
+    return [existentes[nombre] for nombre in ESPECIALIDADES]
+
+
+def _semana(azar):
+    """{weekday: [(inicio, fin)]} de un doctor: de 2 a 5 días, uno o dos bloques."""
+    semana = {}
+    for dia in azar.sample(range(6), azar.randint(2, 5)):
+        bloques = [azar.choice(MANANAS), azar.choice(TARDES)]
+        if azar.random() < 0.5:
+            bloques = [azar.choice(bloques)]
+        semana[dia] = [(datetime.time(a), datetime.time(b)) for a, b in bloques]
+    return semana
+
+
+def _slots(semana, duracion):
+    """{weekday: [minutos de inicio]} de la semana del doctor, como los arma
+    agenda.compilar_plantilla."""
+    slots = {}
+    for dia, bloques in semana.items():
+        for inicio, fin in bloques:
+            slots.setdefault(dia, []).extend(range(inicio.hour * 60, fin.hour * 60, duracion))
+    return slots
+
+
+def _estado(fecha_hora, ahora, azar):
+    if fecha_hora < ahora:
+        return azar.choices(('completado', 'cancelado', 'confirmado'), (80, 15, 5))[0]
+    return azar.choices(('pendiente', 'confirmado', 'cancelado'), (60, 30, 10))[0]
+
+
+def _slots_del_rango(slots, hoy, dias_pasados, dias_futuros):
+    """Todos los (fecha, minuto) de la agenda del doctor en el rango."""
+    todos = []
+    for d in range(-dias_pasados, dias_futuros + 1):
+        fecha = hoy + datetime.timedelta(days=d)
+        todos.extend((fecha, minuto) for minuto in slots.get(fecha.weekday(), ()))
+    return todos
+
+
+def _cantidad_de_weekday(hoy, dias_pasados, dias_futuros, dia):
+    """Cuántas veces cae el weekday ``dia`` en el rango."""
+    primero = hoy - datetime.timedelta(days=dias_pasados)
+    total = dias_pasados + dias_futuros + 1
+    desplazamiento = (dia - primero.weekday()) % 7
+    return 0 if desplazamiento >= total else (total - desplazamiento - 1) // 7 + 1
+
+
+def repartir(total, pesos, capacidades):
+    """Reparte ``total`` proporcional a ``pesos`` sin pasar ninguna capacidad;
+    lo que no entra en uno se reparte entre los demás."""
+    cantidades = [0] * len(pesos)
+    abiertos = [i for i, capacidad in enumerate(capacidades) if capacidad > 0]
+    restante = total
+    while restante > 0 and abiertos:
+        suma = sum(pesos[i] for i in abiertos)
+        asignado = 0
+        for i in abiertos:
+            extra = min(max(1, int(restante * pesos[i] / suma)), capacidades[i] - cantidades[i], restante - asignado)
+            cantidades[i] += extra
+            asignado += extra
+            if asignado >= restante:
+                break
+        restante -= asignado
+        abiertos = [i for i in abiertos if cantidades[i] < capacidades[i]]
+    return cantidades
+
+
+def _turnos_del_doctor(doctor_id, slots_del_rango, cantidad, paciente_ids, ahora, azar):
+    """``cantidad`` turnos en slots distintos de la agenda del doctor."""
+    filas = []
+    for fecha, minuto in azar.sample(slots_del_rango, cantidad):
+        fecha_hora = datetime.datetime.combine(fecha, datetime.time()) + datetime.timedelta(minutes=minuto)
+        filas.append({
+            'fecha_hora': fecha_hora,
+            'estado': _estado(fecha_hora, ahora, azar),
+            'modalidad': 'presencial',
+            'creado_en': fecha_hora - datetime.timedelta(days=azar.randint(1, 30), minutes=azar.randrange(600)),
+            'doctor_id': doctor_id,
+            'paciente_id': azar.choice(paciente_ids),
+        })
+    return filas
+
+
+def sembrar(doctores, pacientes, turnos, prefijo='seed', password='seed1234',
+            dias_pasados=365, dias_futuros=60, semilla=42, avisar=None, ahora=None):
+    """Crea una clínica sintética y devuelve un dict con lo que insertó.
+
+    ``avisar(mensaje)`` recibe el progreso. Con ``ahora`` los turnos se
+    reparten alrededor de ese momento en vez del actual (mismos datos
+    cualquier día). Levanta YaSembrado si ya hay usuarios con ese prefijo.
+    """
+    avisar = avisar or (lambda mensaje: None)
+    azar = random.Random(semilla)
+    existe = db.session.scalar(select(func.count(User.id)).where(User.email.like(f'{prefijo}.%@{DOMINIO}')))
+    if existe:
+        raise YaSembrado(f'Ya hay {existe} usuarios con el prefijo {prefijo!r}.')
+
+    password_hash = contrasenas.hashear(password)
+    especialidad_ids = _especialidades()
+
+    avisar(f'Doctores: {doctores}')
+    user_ids = _insertar_usuarios(prefijo, 'doctor', doctores, password_hash, azar)
+    doctor_ids = []
+    for lote in _lotes(user_ids):
+        doctor_ids.extend(db.session.scalars(
+            insert(Doctor).returning(Doctor.id, sort_by_parameter_order=True),
+            [{'user_id': u, 'especialidad_id': azar.choice(especialidad_ids), 'matricula': f'{prefijo}-MN{u}'}
+             for u in lote]
+        ))
+    agendas = {}
+    configuraciones, horarios = [], []
+    for doctor_id in doctor_ids:
+        duracion = azar.choice(DURACIONES)
+        semana = _semana(azar)
+        agendas[doctor_id] = _slots(semana, duracion)
+        configuraciones.append({
+            'doctor_id': doctor_id, 'duracion_turno': duracion,
+            'modalidad': azar.choices(('presencial', 'virtual'), (75, 25))[0],
+            'precio_consulta': float(azar.randrange(8, 40) * 1000),
+        })
+        horarios.extend(
+            {'doctor_id': doctor_id, 'dia_semana': dia, 'hora_inicio': inicio, 'hora_fin': fin}
+            for dia, bloques in semana.items() for inicio, fin in bloques
+        )
+    for lote in _lotes(configuraciones):
+        db.session.execute(insert(ConfiguracionHorario), lote)
+    for lote in _lotes(horarios):
+        db.session.execute(insert(HorarioDisponible), lote)
+    db.session.commit()
+
+    avisar(f'Pacientes: {pacientes}')
+    user_ids = _insertar_usuarios(prefijo, 'paciente', pacientes, password_hash, azar)
+    paciente_ids = []
+    for lote in _lotes(user_ids):
+        paciente_ids.extend(db.session.scalars(
+            insert(Paciente).returning(Paciente.id, sort_by_parameter_order=True),
+            [{'user_id': u, 'obra_social': azar.choice(OBRAS_SOCIALES)} for u in lote]
+        ))
+    db.session.commit()
+
+    avisar(f'Turnos: {turnos}')
+    ahora = (ahora or datetime.datetime.now()).replace(second=0, microsecond=0)
+    hoy = ahora.date()
+    # Algunos doctores tienen mucha más demanda que otros (hasta llenar su agenda)
+    pesos = [azar.paretovariate(1.5) for _ in doctor_ids]
+    capacidades = [
+        sum(len(slots) * _cantidad_de_weekday(hoy, dias_pasados, dias_futuros, dia) for dia, slots in agendas[d].items())
+        for d in doctor_ids
+    ]
+    cantidades = repartir(turnos, pesos, capacidades)
+    insertados = 0
+    pendientes = []
+    for doctor_id, cantidad in zip(doctor_ids, cantidades):
+        if not cantidad:
+            continue
+        en_rango = _slots_del_rango(agendas[doctor_id], hoy, dias_pasados, dias_futuros)
+        pendientes.extend(_turnos_del_doctor(doctor_id, en_rango, cantidad, paciente_ids, ahora, azar))
+        if len(pendientes) >= TAMANO_LOTE * 4:
+            insertados += _insertar_turnos(pendientes)
+            pendientes = []
+            avisar(f'  {insertados} turnos')
+    insertados += _insertar_turnos(pendientes)
+    # Los INSERT masivos no pasan por cambios_turnos: una sola versión
+    # general nueva invalida los ETags de todas las agendas
+    agenda.registrar_cambio_general()
+    db.session.commit()
+
+    avisar('Reconstruyendo estadísticas')
+    filas_estadisticas = estadisticas.reconstruir()
+    return {
+        'doctores': len(doctor_ids), 'pacientes': len(paciente_ids), 'turnos': insertados,
+        'horarios': len(horarios), 'estadisticas': filas_estadisticas,
+    }
+
+
+def _insertar_turnos(filas):
+    for lote in _lotes(filas):
+        db.session.execute(insert(Turno), lote)
+    db.session.commit()
+    return len(filas)
@@ -0,0 +1,232 @@
+import datetime
+import json
+import os
+import random
+import socket
+import traceback
+import uuid
+
+from flask import current_app
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.extensions import db
+from app.models.trabajo import Trabajo
+
+# Cola de trabajos en la base de datos (SQLite o Postgres).
+#
+# Encolar es un INSERT en la transacción de quien encola: si el request
+# hace rollback, el trabajo tampoco existe. ``flask worker`` toma lotes con
+# un UPDATE condicional (estado = 'pendiente') marcado con un token propio:
+# en SQLite el lock de escritura serializa a los workers y en Postgres el
+# SELECT ... FOR UPDATE SKIP LOCKED evita que se esperen entre sí. Si un
+# trabajo falla se reintenta con espera exponencial hasta max_intentos.
+#
+# Los manejadores se registran con @tarea('tipo') y reciben la lista de
+# trabajos del lote de ese tipo. Pueden devolver {id: error} para marcar
+# fallas puntuales; si levantan una excepción falla todo el lote.
+
+_manejadores = {}
+
+
+class TipoDesconocido(LookupError):
+    pass
+
+
+def tarea(tipo):
+    """Registra ``funcion(trabajos)`` como manejador de los trabajos ``tipo``."""
+    def registrar(funcion):
+        _manejadores[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def tipos_registrados():
+    return sorted(_manejadores)
+
+
+# --- Encolar ---
+
+def _fila(tipo, datos, disponible_en, clave, max_intentos, ahora):
+    return {
+        'tipo': tipo,
+        'datos': json.dumps(datos or {}, separators=(',', ':')),
+        'clave': clave,
+        'estado': 'pendiente',
+        'intentos': 0,
+        'max_intentos': max_intentos or current_app.config['TRABAJOS_MAX_INTENTOS'],
+        'disponible_en': disponible_en or ahora,
+        'creado_en': ahora,
+    }
+
+
+def encolar(tipo, datos=None, disponible_en=None, clave=None, max_intentos=None):
+    """Encola un trabajo en la transacción actual (se confirma con el commit)."""
+    return encolar_lote([dict(tipo=tipo, datos=datos, disponible_en=disponible_en,
+                              clave=clave, max_intentos=max_intentos)])
+
+
+def encolar_lote(trabajos):
+    """Encola varios trabajos con un solo INSERT; los de ``clave`` repetida se omiten.
+
+    ``trabajos`` son dicts con tipo y opcionalmente datos, disponible_en,
+    clave y max_intentos. Devuelve cuántos se insertaron.
+    """
+    if not trabajos:
+        return 0
+    ahora = datetime.datetime.now()
+    filas = [
+        _fila(t['tipo'], t.get('datos'), t.get('disponible_en'), t.get('clave'), t.get('max_intentos'), ahora)
+        for t in trabajos
+    ]
+    tabla = Trabajo.__table__
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialecto == 'postgresql' else sqlite).insert(tabla)
+        stmt = stmt.on_conflict_do_nothing(index_elements=['clave'])
+        return db.session.execute(stmt, filas).rowcount
+    # Otros motores: se descartan antes las claves que ya existen
+    claves = [f['clave'] for f in filas if f['clave']]
+    existentes = set(db.session.scalars(select(Trabajo.clave).where(Trabajo.clave.in_(claves)))) if claves else set()
+    filas = [f for f in filas if f['clave'] not in existentes]
+    if filas:
+        db.session.execute(insert(tabla), filas)
+    return len(filas)
+
+
+# --- Tomar y ejecutar ---
+
+def nombre_trabajador():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def tomar(limite, tipos=None, ahora=None):
+    """Toma hasta ``limite`` trabajos pendientes para este proceso y confirma.
+
+    Devuelve los Trabajo tomados, ya marcados 'en_curso'.
+    """
+    ahora = ahora or datetime.datetime.now()
+    token = f'{nombre_trabajador()}:{uuid.uuid4().hex[:8]}'
+    candidatos = select(Trabajo.id).where(
+        Trabajo.estado == 'pendiente', Trabajo.disponible_en <= ahora
+    ).order_by(Trabajo.disponible_en, Trabajo.id).limit(limite)
+    if tipos:
+        candidatos = candidatos.where(Trabajo.tipo.in_(tipos))
+    if db.session.get_bind().dialect.name == 'postgresql':
+        candidatos = candidatos.with_for_update(skip_locked=True)
+    ids = list(db.session.scalars(candidatos))
+    if not ids:
+        db.session.rollback()
+        return []
+    # El WHERE estado = 'pendiente' hace que si otro worker tomó alguno en
+    # el medio, ese no se actualice acá
+    db.session.execute(
+        update(Trabajo)
+        .where(Trabajo.id.in_(ids), Trabajo.estado == 'pendiente')
+        .values(estado='en_curso', tomado_por=token, tomado_en=ahora, intentos=Trabajo.intentos + 1),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return Trabajo.query.filter(Trabajo.tomado_por == token, Trabajo.estado == 'en_curso')\
+        .order_by(Trabajo.id).all()
+
+
+def espera_reintento(intentos):
+    """Segundos hasta el próximo intento: exponencial con tope y algo de azar."""
+    config = current_app.config
+    espera = min(config['TRABAJOS_BACKOFF_BASE'] * 2 ** max(intentos - 1, 0), config['TRABAJOS_BACKOFF_MAX'])
+    return espera * random.uniform(0.8, 1.2)
+
+
+def _terminar(trabajo, error, ahora):
+    if error is None:
+        trabajo.estado = 'hecho'
+        trabajo.error = None
+        trabajo.terminado_en = ahora
+    elif trabajo.intentos >= trabajo.max_intentos:
+        trabajo.estado = 'fallido'
+        trabajo.error = error
+        trabajo.terminado_en = ahora
+    else:
+        trabajo.estado = 'pendiente'
+        trabajo.error = error
+        trabajo.disponible_en = ahora + datetime.timedelta(seconds=espera_reintento(trabajo.intentos))
+
+
+def ejecutar(trabajos):
+    """Corre los trabajos tomados, agrupados por tipo, y guarda el resultado.
+
+    Devuelve (hechos, fallidos) contando los que van a reintentarse como fallidos.
+    """
+    por_tipo = {}
+    for trabajo in trabajos:
+        por_tipo.setdefault(trabajo.tipo, []).append(trabajo)
+
+    hechos = fallidos = 0
+    for tipo, lote in por_tipo.items():
+        try:
+            manejador = _manejadores.get(tipo)
+            if manejador is None:
+                raise TipoDesconocido(f'No hay manejador para el tipo {tipo!r}')
+            errores = manejador(lote) or {}
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Falló el lote de trabajos %s', tipo)
+            error = traceback.format_exc(limit=5)
+            errores = {t.id: error for t in lote}
+        # El resultado se guarda en la misma transacción que lo que hizo el
+        # manejador: si el worker se cae antes, el trabajo se vuelve a correr
+        ahora = datetime.datetime.now()
+        for trabajo in lote:
+            error = errores.get(trabajo.id)
+            _terminar(trabajo, error, ahora)
+            if error is None:
+                hechos += 1
+            else:
+                fallidos += 1
+        db.session.commit()
+    return hechos, fallidos
+
+
+def procesar(limite=None, tipos=None):
+    """Toma y ejecuta un lote. Devuelve (hechos, fallidos)."""
+    trabajos = tomar(limite or current_app.config['TRABAJOS_LOTE'], tipos=tipos)
+    if not trabajos:
+        return 0, 0
+    return ejecutar(trabajos)
+
+
+# --- Mantenimiento ---
+
+def recuperar_colgados(ahora=None):
+    """Devuelve a 'pendiente' los trabajos en curso hace más de TRABAJOS_TIMEOUT
+    (el worker que los tomó se murió). Hay que hacer commit."""
+    ahora = ahora or datetime.datetime.now()
+    limite = ahora - datetime.timedelta(seconds=current_app.config['TRABAJOS_TIMEOUT'])
+    return db.session.execute(
+        update(Trabajo)
+        .where(Trabajo.estado == 'en_curso', Trabajo.tomado_en < limite)
+        .values(estado='pendiente', disponible_en=ahora, error='Se venció el tiempo del worker'),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+
+def limpiar(dias=None, ahora=None):
+    """Borra los trabajos terminados bien hace más de ``dias``. Hay que hacer commit."""
+    ahora = ahora or datetime.datetime.now()
+    dias = current_app.config['TRABAJOS_RETENCION_DIAS'] if dias is None else dias
+    return db.session.execute(
+        delete(Trabajo).where(
+            Trabajo.estado == 'hecho', Trabajo.terminado_en < ahora - datetime.timedelta(days=dias)
+        ),
+        execution_options={'synchronize_session': False}
+    ).rowcount
+
+
+def resumen():
+    """Cantidad de trabajos por (tipo, estado)."""
+    filas = db.session.execute(
+        select(Trabajo.tipo, Trabajo.estado, func.count()).group_by(Trabajo.tipo, Trabajo.estado)
+        .order_by(Trabajo.tipo, Trabajo.estado)
+    )
+    return [(tipo, estado, cantidad) for tipo, estado, cantidad in filas]
@@ -0,0 +1,125 @@
+import hashlib
+
+from flask import current_app, request
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.version_tabla import VersionTabla
+
+# Versión por tabla para los ETag de la API.
+#
+# Cada flush que inserta, modifica o borra filas de una tabla de TABLAS
+# incrementa su contador en la misma transacción; también los INSERT/UPDATE/
+# DELETE masivos que pasan por session.execute(). Si la versión de todas las
+# tablas de las que sale una respuesta no cambió, la respuesta tampoco.
+#
+# ``turnos`` no está: cada reserva, cancelación o cambio de estado
+# actualizaría la misma fila de versiones_tablas, que quedaría bloqueada
+# hasta el commit y serializaría todas las reservas de todos los doctores.
+# Las respuestas que dependen de turnos usan las versiones por doctor y día
+# de la agenda (ver agenda.versiones_agenda y agenda.version_rango).
+
+TABLAS = frozenset({
+    'users', 'especialidades', 'doctores', 'pacientes',
+    'configuracion_horarios', 'horarios_disponibles', 'excepciones',
+})
+
+_PENDIENTES = 'versiones_tablas_pendientes'
+
+
+def sumar(conexion, tabla, filas, claves, columnas):
+    """Upsert de ``filas`` en ``tabla`` sumando ``columnas`` si la clave ya existe."""
+    dialecto = conexion.dialect.name
+    if dialecto in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialecto == 'postgresql' else sqlite).insert(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(claves),
+            set_={c: tabla.c[c] + stmt.excluded[c] for c in columnas}
+        )
+        conexion.execute(stmt, filas)
+        return
+    # Otros motores: update y, si no existía la fila, insert
+    for fila in filas:
+        resultado = conexion.execute(
+            tabla.update().where(*(tabla.c[c] == fila[c] for c in claves))
+            .values({c: tabla.c[c] + fila[c] for c in columnas})
+        )
+        if resultado.rowcount == 0:
+            conexion.execute(tabla.insert().values(**fila))
+
+
+def incrementar(conexion, tablas):
+    """Suma 1 a la versión de ``tablas`` (crea la fila si no existía)."""
+    tablas = sorted(set(tablas) & TABLAS)
+    if tablas:
+        filas = [{'tabla': nombre, 'version': 1} for nombre in tablas]
+        sumar(conexion, VersionTabla.__table__, filas, ['tabla'], ['version'])
+
+
+def versiones(tablas):
+    """{tabla: versión} leído en una sola consulta (0 si nunca cambió)."""
+    tablas = sorted(tablas)
+    filas = dict(db.session.execute(
+        select(VersionTabla.tabla, VersionTabla.version).where(VersionTabla.tabla.in_(tablas))
+    ).all())
+    return {nombre: filas.get(nombre, 0) for nombre in tablas}
+
+
+def etag(*partes):
+    """ETag fuerte a partir de valores que determinan el contenido."""
+    return hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()
+
+
+def etag_de_request(tablas, *extra):
+    """ETag para el request actual: ruta, parámetros y versión de ``tablas``."""
+    argumentos = sorted(request.args.items(multi=True))
+    return etag(request.path, argumentos, sorted(versiones(tablas).items()), *extra)
+
+
+def respuesta_condicional(valor_etag, generar, cache_control='private, no-cache'):
+    """304 si el cliente ya tiene ``valor_etag``; si no, ``generar()`` con el ETag.
+
+    ``generar`` sólo se llama cuando hace falta armar el cuerpo.
+    """
+    if request.if_none_match.contains(valor_etag):
+        respuesta = current_app.response_class(status=304)
+    else:
+        respuesta = current_app.make_response(generar())
+    respuesta.set_etag(valor_etag)
+    respuesta.headers['Cache-Control'] = cache_control
+    return respuesta
+
+
+# --- Listeners de la sesión ---
+
+def _tabla_de(obj):
+    return getattr(type(obj), '__tablename__', None)
+
+
+def _despues_del_flush(session, flush_context):
+    tablas = {_tabla_de(o) for o in session.new} | {_tabla_de(o) for o in session.deleted}
+    tablas |= {_tabla_de(o) for o in session.dirty if session.is_modified(o, include_collections=False)}
+    tablas &= TABLAS
+    if tablas:
+        incrementar(session.connection(), tablas)
+
+
+def _al_ejecutar(estado):
+    # INSERT/UPDATE/DELETE masivos (insert(User), update(Turno)...) que no
+    # pasan por el flush
+    if not (estado.is_insert or estado.is_update or estado.is_delete):
+        return
+    tabla = getattr(estado.statement, 'table', None)
+    nombre = getattr(tabla, 'name', None)
+    if nombre in TABLAS:
+        incrementar(estado.session.connection(), [nombre])
+
+
+def init_app(app):
+    """Engancha los contadores al ciclo de la sesión (una sola vez)."""
+    if event.contains(Session, 'after_flush', _despues_del_flush):
+        return
+    event.listen(Session, 'after_flush', _despues_del_flush)
+    event.listen(Session, 'do_orm_execute', _al_ejecutar)
@@ -45,6 +45,7 @@ function horariosDoctor(configInicial, diasSemanaInicial) {
         excepciones: [],
         nuevaExcepcion: {
             fecha: '',
+            hasta: '',
             motivo: ''
         },
         
@@ -115,7 +116,7 @@ function horariosDoctor(configInicial, diasSemanaInicial) {
         agregarExcepcion() {
             if (this.nuevaExcepcion.fecha) {
                 this.excepciones.push({ ...this.nuevaExcepcion });
-                this.nuevaExcepcion = { fecha: '', motivo: '' };
+                this.nuevaExcepcion = { fecha: '', hasta: '', motivo: '' };
                 this.guardarExcepciones();
             }
         },
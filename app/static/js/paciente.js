@@ -3,6 +3,9 @@ let doctorSeleccionado = null;
 let fechaSeleccionada = null;
 let horaSeleccionada = null;
 let procesando = false;
+let mesVisible = primerDiaDelMes(new Date());
+let disponibilidadMes = {}; // fecha (YYYY-MM-DD) -> { horarios, total, ocupados, libres }
+let eventosHorarios = null; // EventSource con los slots que se ocupan o liberan en vivo
 
 // Inicializar
 document.addEventListener('DOMContentLoaded', function() {
@@ -12,17 +15,33 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 
+function primerDiaDelMes(fecha) {
+    return new Date(fecha.getFullYear(), fecha.getMonth(), 1);
+}
+
+// YYYY-MM-DD en hora local (toISOString convierte a UTC y puede cambiar el día)
+function formatearFecha(fecha) {
+    const mes = String(fecha.getMonth() + 1).padStart(2, '0');
+    const dia = String(fecha.getDate()).padStart(2, '0');
+    return `${fecha.getFullYear()}-${mes}-${dia}`;
+}
+
 // Generar calendario
-function generarCalendario(diasDisponibles = new Set()) {
+function generarCalendario(diasDisponibles = new Set(), mes = mesVisible) {
     const container = document.getElementById('calendario-dias');
     container.innerHTML = '';
 
-    const fecha = new Date();
+    const fecha = mes;
     const primerDia = new Date(fecha.getFullYear(), fecha.getMonth(), 1);
     const ultimoDia = new Date(fecha.getFullYear(), fecha.getMonth() + 1, 0);
     const monthNames = ["ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO", "JULIO", "AGOSTO", "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE"];
-    document.querySelector('#modal-reserva h4').textContent = monthNames[fecha.getMonth()];
+    document.querySelector('#modal-reserva h4').textContent = monthNames[fecha.getMonth()] + ' ' + fecha.getFullYear();
 
+    // No se puede navegar a meses anteriores al actual
+    const btnMesAnterior = document.getElementById('btn-mes-anterior');
+    if (btnMesAnterior) {
+        btnMesAnterior.disabled = primerDia <= primerDiaDelMes(new Date());
+    }
 
     for (let i = 0; i < primerDia.getDay(); i++) {
         const div = document.createElement('div');
@@ -32,7 +51,7 @@ function generarCalendario(diasDisponibles = new Set()) {
     // Días del mes
     for (let dia = 1; dia <= ultimoDia.getDate(); dia++) {
         const fechaDia = new Date(fecha.getFullYear(), fecha.getMonth(), dia);
-        const fechaStr = fechaDia.toISOString().split('T')[0];
+        const fechaStr = formatearFecha(fechaDia);
         const hoy = new Date();
         hoy.setHours(0,0,0,0);
 
@@ -126,16 +145,72 @@ window.abrirModal = function(doctorId, nombre, especialidad) {
     document.getElementById('sin-horarios').style.display = 'none';
     document.getElementById('botones-accion').style.display = 'none';
 
+    mesVisible = primerDiaDelMes(new Date());
+    disponibilidadMes = {};
     generarCalendario(doctorSeleccionado.diasDisponibles); 
 
     document.getElementById('modal-reserva').style.display = 'flex';
     document.body.style.overflow = 'hidden';
+
+    cargarMes();
+}
+
+// Cargar la disponibilidad de todo el mes visible en una sola llamada
+async function cargarMes() {
+    if (!doctorSeleccionado) return;
+    const doctorId = doctorSeleccionado.id;
+    const mes = mesVisible;
+
+    try {
+        const params = new URLSearchParams({
+            doctor_id: doctorId,
+            mes: formatearFecha(mes).slice(0, 7)
+        });
+        const response = await fetch(window.API_URLS.OBTENER_DISPONIBILIDAD + '?' + params.toString());
+        const data = await response.json();
+
+        if (!response.ok) {
+            throw new Error(data.error || 'Error al cargar disponibilidad');
+        }
+        // Si el usuario cambió de doctor o de mes mientras cargaba, descartamos
+        if (!doctorSeleccionado || doctorSeleccionado.id !== doctorId || mes !== mesVisible) return;
+
+        disponibilidadMes = data.dias || {};
+        const diasConLugar = new Set(
+            Object.entries(disponibilidadMes)
+                .filter(([, dia]) => dia.libres > 0)
+                .map(([fecha]) => String(parseInt(fecha.slice(8), 10)))
+        );
+        generarCalendario(diasConLugar, mes);
+    } catch (error) {
+        console.error('Error:', error);
+    }
+}
+
+// Navegar entre meses (Necesita ser global para el onclick del HTML)
+window.cambiarMes = function(delta) {
+    if (!doctorSeleccionado) return;
+    const nuevoMes = new Date(mesVisible.getFullYear(), mesVisible.getMonth() + delta, 1);
+    if (nuevoMes < primerDiaDelMes(new Date())) return;
+
+    mesVisible = nuevoMes;
+    disponibilidadMes = {};
+    dejarDeEscucharHorarios();
+    fechaSeleccionada = null;
+    horaSeleccionada = null;
+    document.getElementById('disponibilidad-section').style.display = 'none';
+    document.getElementById('sin-horarios').style.display = 'none';
+    document.getElementById('botones-accion').style.display = 'none';
+
+    generarCalendario(new Set(), mesVisible);
+    cargarMes();
 }
 
 // Cerrar modal (Necesita ser global para el onclick del HTML)
 window.cerrarModal = function() {
     document.getElementById('modal-reserva').style.display = 'none';
     document.body.style.overflow = 'auto';
+    dejarDeEscucharHorarios();
     doctorSeleccionado = null;
     fechaSeleccionada = null;
     horaSeleccionada = null;
@@ -167,6 +242,13 @@ async function seleccionarFecha(fecha, buttonElement) {
         buttonElement.className = 'w-8 h-8 rounded-lg text-sm font-medium transition-colors bg-gray-900 text-white';
     }
 
+    // Si ya tenemos el mes cargado no hace falta volver a pedir el día
+    if (disponibilidadMes[fecha]) {
+        mostrarHorarios(disponibilidadMes[fecha].horarios);
+        escucharHorarios(doctorSeleccionado.id, fecha);
+        return;
+    }
+
     // Mostrar loading
     document.getElementById('loading-horarios').style.display = 'block';
     document.getElementById('disponibilidad-section').style.display = 'none';
@@ -187,6 +269,7 @@ async function seleccionarFecha(fecha, buttonElement) {
 
         if (response.ok) {
             mostrarHorarios(data.horarios || []);
+            escucharHorarios(doctorSeleccionado.id, fecha);
         } else {
             // Manejar error 400/500 con mensaje del servidor si existe
             throw new Error(data.message || 'Error al cargar horarios');
@@ -222,6 +305,89 @@ function mostrarHorarios(horarios) {
     document.getElementById('sin-horarios').style.display = 'none';
 }
 
+// --- Horarios en vivo ---
+// Mientras se mira un día, el servidor avisa por SSE qué slots se ocupan o se
+// liberan. Un slot ocupado se saca de la lista; ante uno liberado se vuelve a
+// pedir el día (el servidor decide si de verdad está disponible).
+function escucharHorarios(doctorId, fecha) {
+    dejarDeEscucharHorarios();
+    if (!window.EventSource || !window.API_URLS.EVENTOS_HORARIOS) return;
+
+    const params = new URLSearchParams({ doctor_id: doctorId, fecha: fecha });
+    const fuente = new EventSource(window.API_URLS.EVENTOS_HORARIOS + '?' + params.toString());
+    let reconectando = false;
+
+    fuente.addEventListener('ocupado', (e) => {
+        const evento = JSON.parse(e.data);
+        if (evento.fecha === fechaSeleccionada) quitarHorario(evento.hora);
+    });
+    fuente.addEventListener('liberado', (e) => {
+        const evento = JSON.parse(e.data);
+        if (evento.fecha === fechaSeleccionada) recargarHorarios();
+    });
+    // Tras una reconexión pudo perderse algún aviso: se vuelve a pedir el día
+    fuente.addEventListener('open', () => {
+        if (reconectando) recargarHorarios();
+        reconectando = true;
+    });
+    eventosHorarios = fuente;
+}
+
+function dejarDeEscucharHorarios() {
+    if (eventosHorarios) {
+        eventosHorarios.close();
+        eventosHorarios = null;
+    }
+}
+
+function quitarHorario(hora) {
+    const dia = disponibilidadMes[fechaSeleccionada];
+    if (dia) {
+        dia.horarios = dia.horarios.filter(h => h.hora !== hora);
+        dia.libres = dia.horarios.length;
+    }
+
+    document.querySelectorAll('.hora-btn').forEach(btn => {
+        if (btn.textContent === hora) btn.remove();
+    });
+    if (horaSeleccionada === hora && !procesando) {
+        horaSeleccionada = null;
+        document.getElementById('botones-accion').style.display = 'none';
+        mostrarMensaje(`El horario de las ${hora} acaba de ser reservado por otra persona.`, 'error');
+    }
+    if (!document.querySelector('.hora-btn')) {
+        document.getElementById('disponibilidad-section').style.display = 'none';
+        document.getElementById('sin-horarios').style.display = 'block';
+    }
+}
+
+async function recargarHorarios() {
+    if (!doctorSeleccionado || !fechaSeleccionada) return;
+    const fecha = fechaSeleccionada;
+    try {
+        const params = new URLSearchParams({ doctor_id: doctorSeleccionado.id, fecha: fecha });
+        const response = await fetch(window.API_URLS.OBTENER_HORARIOS + '?' + params.toString());
+        if (!response.ok || fecha !== fechaSeleccionada) return;
+        const data = await response.json();
+        const horarios = data.horarios || [];
+
+        if (disponibilidadMes[fecha]) {
+            disponibilidadMes[fecha].horarios = horarios;
+            disponibilidadMes[fecha].libres = horarios.length;
+        }
+        const seleccionada = horaSeleccionada;
+        mostrarHorarios(horarios);
+        // Se conserva la hora elegida si sigue libre
+        horaSeleccionada = null;
+        document.getElementById('botones-accion').style.display = 'none';
+        document.querySelectorAll('.hora-btn').forEach(btn => {
+            if (btn.textContent === seleccionada) seleccionarHora(seleccionada, btn);
+        });
+    } catch (error) {
+        console.error('Error:', error);
+    }
+}
+
 // Seleccionar hora
 function seleccionarHora(hora, buttonElement) {
     horaSeleccionada = hora;
@@ -0,0 +1,41 @@
+"""Agregar tabla notificaciones
+
+Revision ID: a7d24e8b3c15
+Revises: f1c7a9e2b4d6
+Create Date: 2026-10-18 15:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d24e8b3c15'
+down_revision = 'f1c7a9e2b4d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notificaciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=30), nullable=False),
+    sa.Column('titulo', sa.String(length=150), nullable=False),
+    sa.Column('mensaje', sa.Text(), nullable=True),
+    sa.Column('leida', sa.Boolean(), server_default=sa.false(), nullable=False),
+    sa.Column('creado_en', sa.DateTime(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('turno_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['turno_id'], ['turnos.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notificaciones', schema=None) as batch_op:
+        batch_op.create_index('ix_notificaciones_user_leida_creado', ['user_id', 'leida', 'creado_en'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('notificaciones', schema=None) as batch_op:
+        batch_op.drop_index('ix_notificaciones_user_leida_creado')
+
+    op.drop_table('notificaciones')
@@ -0,0 +1,55 @@
+"""Agregar indices compuestos a turnos y horarios
+
+Revision ID: b3e7c91d4a20
+Revises: 6d6d31f3e474
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e7c91d4a20'
+down_revision = '6d6d31f3e474'
+branch_labels = None
+depends_on = None
+
+ESTADOS_ACTIVOS = sa.text("estado IN ('pendiente', 'confirmado')")
+
+INDICES = [
+    ('ix_turnos_doctor_fecha_estado', 'turnos', ['doctor_id', 'fecha_hora', 'estado'], {}),
+    ('ix_turnos_paciente_fecha', 'turnos', ['paciente_id', 'fecha_hora'], {}),
+    ('ix_turnos_fecha_hora', 'turnos', ['fecha_hora'], {}),
+    ('ix_turnos_doctor_fecha_activos', 'turnos', ['doctor_id', 'fecha_hora'],
+     {'postgresql_where': ESTADOS_ACTIVOS, 'sqlite_where': ESTADOS_ACTIVOS}),
+    ('ix_horarios_disponibles_doctor_dia', 'horarios_disponibles', ['doctor_id', 'dia_semana'], {}),
+]
+
+
+def _es_postgres():
+    return op.get_bind().dialect.name == 'postgresql'
+
+
+def upgrade():
+    if _es_postgres():
+        # CREATE INDEX CONCURRENTLY no bloquea escrituras, pero no puede
+        # correr dentro de una transacción.
+        with op.get_context().autocommit_block():
+            for nombre, tabla, columnas, kwargs in INDICES:
+                op.create_index(nombre, tabla, columnas, unique=False,
+                                postgresql_concurrently=True, if_not_exists=True, **kwargs)
+    else:
+        for nombre, tabla, columnas, kwargs in INDICES:
+            op.create_index(nombre, tabla, columnas, unique=False, **kwargs)
+
+
+def downgrade():
+    if _es_postgres():
+        with op.get_context().autocommit_block():
+            for nombre, tabla, _, _ in reversed(INDICES):
+                op.drop_index(nombre, table_name=tabla,
+                              postgresql_concurrently=True, if_exists=True)
+    else:
+        for nombre, tabla, _, _ in reversed(INDICES):
+            op.drop_index(nombre, table_name=tabla)
@@ -0,0 +1,45 @@
+"""Agregar tabla trabajos
+
+Revision ID: b8e35f9c4d26
+Revises: a7d24e8b3c15
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e35f9c4d26'
+down_revision = 'a7d24e8b3c15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('trabajos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('datos', sa.Text(), nullable=False),
+    sa.Column('clave', sa.String(length=200), nullable=True),
+    sa.Column('estado', sa.String(length=20), nullable=False),
+    sa.Column('intentos', sa.Integer(), nullable=False),
+    sa.Column('max_intentos', sa.Integer(), nullable=False),
+    sa.Column('disponible_en', sa.DateTime(), nullable=False),
+    sa.Column('tomado_por', sa.String(length=100), nullable=True),
+    sa.Column('tomado_en', sa.DateTime(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('creado_en', sa.DateTime(), nullable=False),
+    sa.Column('terminado_en', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('clave')
+    )
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.create_index('ix_trabajos_estado_disponible', ['estado', 'disponible_en'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos', schema=None) as batch_op:
+        batch_op.drop_index('ix_trabajos_estado_disponible')
+
+    op.drop_table('trabajos')
@@ -0,0 +1,51 @@
+"""Agregar tabla estadisticas_diarias
+
+Revision ID: c4f81a2e6b57
+Revises: b3e7c91d4a20
+Create Date: 2026-10-18 11:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f81a2e6b57'
+down_revision = 'b3e7c91d4a20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('estadisticas_diarias',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('estado', sa.String(length=20), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('especialidad_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctores.id'], ),
+    sa.ForeignKeyConstraint(['especialidad_id'], ['especialidades.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('fecha', 'doctor_id', 'estado', name='uq_estadisticas_diarias_fecha_doctor_estado')
+    )
+    with op.batch_alter_table('estadisticas_diarias', schema=None) as batch_op:
+        batch_op.create_index('ix_estadisticas_diarias_estado_fecha', ['estado', 'fecha'], unique=False)
+        batch_op.create_index(batch_op.f('ix_estadisticas_diarias_especialidad_id'), ['especialidad_id'], unique=False)
+
+    # --- Carga inicial desde los turnos existentes ---
+    # (equivalente a `flask estadisticas reconstruir`)
+    op.execute("""
+        INSERT INTO estadisticas_diarias (fecha, doctor_id, especialidad_id, estado, cantidad)
+        SELECT date(t.fecha_hora), t.doctor_id, d.especialidad_id, t.estado, count(t.id)
+        FROM turnos t JOIN doctores d ON d.id = t.doctor_id
+        GROUP BY date(t.fecha_hora), t.doctor_id, d.especialidad_id, t.estado
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('estadisticas_diarias', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_estadisticas_diarias_especialidad_id'))
+        batch_op.drop_index('ix_estadisticas_diarias_estado_fecha')
+
+    op.drop_table('estadisticas_diarias')
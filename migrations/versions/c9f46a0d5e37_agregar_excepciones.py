@@ -0,0 +1,37 @@
+"""Agregar tabla excepciones
+
+Revision ID: c9f46a0d5e37
+Revises: b8e35f9c4d26
+Create Date: 2026-10-18 17:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9f46a0d5e37'
+down_revision = 'b8e35f9c4d26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('excepciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('inicio', sa.DateTime(), nullable=False),
+    sa.Column('fin', sa.DateTime(), nullable=False),
+    sa.Column('motivo', sa.String(length=200), nullable=True),
+    sa.Column('doctor_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['doctor_id'], ['doctores.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('excepciones', schema=None) as batch_op:
+        batch_op.create_index('ix_excepciones_doctor_fin', ['doctor_id', 'fin'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('excepciones', schema=None) as batch_op:
+        batch_op.drop_index('ix_excepciones_doctor_fin')
+
+    op.drop_table('excepciones')
@@ -0,0 +1,36 @@
+"""Agregar creado_en a turnos y anticipación a estadisticas_diarias
+
+Revision ID: d5a92c3f7e18
+Revises: c4f81a2e6b57
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5a92c3f7e18'
+down_revision = 'c4f81a2e6b57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Los turnos existentes quedan con creado_en NULL: no se sabe cuándo se
+    # reservaron y no cuentan para la anticipación.
+    with op.batch_alter_table('turnos', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('creado_en', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('estadisticas_diarias', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('anticipacion_minutos', sa.BigInteger(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('anticipacion_turnos', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('estadisticas_diarias', schema=None) as batch_op:
+        batch_op.drop_column('anticipacion_turnos')
+        batch_op.drop_column('anticipacion_minutos')
+
+    with op.batch_alter_table('turnos', schema=None) as batch_op:
+        batch_op.drop_column('creado_en')
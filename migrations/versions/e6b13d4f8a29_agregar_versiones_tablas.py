@@ -0,0 +1,29 @@
+"""Agregar tabla versiones_tablas
+
+Revision ID: e6b13d4f8a29
+Revises: d5a92c3f7e18
+Create Date: 2026-10-18 13:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b13d4f8a29'
+down_revision = 'd5a92c3f7e18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las filas se crean con el primer cambio de cada tabla
+    op.create_table('versiones_tablas',
+    sa.Column('tabla', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('tabla')
+    )
+
+
+def downgrade():
+    op.drop_table('versiones_tablas')
@@ -0,0 +1,30 @@
+"""Agregar tabla versiones_agenda
+
+Revision ID: f1c7a9e2b4d6
+Revises: e6b13d4f8a29
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c7a9e2b4d6'
+down_revision = 'e6b13d4f8a29'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Las filas se crean con el primer cambio de cada agenda
+    op.create_table('versiones_agenda',
+    sa.Column('doctor_id', sa.Integer(), nullable=False),
+    sa.Column('fecha', sa.Date(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('doctor_id', 'fecha')
+    )
+
+
+def downgrade():
+    op.drop_table('versiones_agenda')